@@ -1,6 +1,15 @@
-import google.generativeai as genai
+import argparse
+import asyncio
+import json
 import os
-import time
+
+from analysis_schema import FIELD_GUIDE, format_analysis_markdown
+from job_manifest import FAILED, JobManifest
+from llm_backends import add_backend_arguments, create_backend
+from pipeline_metrics import add_metrics_arguments, open_metrics
+from prompt_packing import run_packed
+from response_cache import add_cache_arguments, open_cache
+from structured_output import request_analysis
 
 # --- 設定 ---
 # 1. 請將您從 Google AI Studio 取得的 API 金鑰貼在引號中間
@@ -9,107 +18,105 @@ API_KEY = "在這裡貼上您的API金鑰"
 # 2. 設定輸入檔案名稱和存放輸出檔案的"資料夾"名稱
 INPUT_FILENAME = "extracted.txt"
 OUTPUT_DIRECTORY_NAME = "word_analysis_files"
-# ---------------
-
-# 使用您的 API 金鑰來設定 genai
-try:
-    genai.configure(api_key=API_KEY)
-except Exception as e:
-    print(f"API 金鑰設定錯誤，請檢查您的金鑰是否正確。錯誤訊息：{e}")
-    exit()
+MANIFEST_FILENAME = "gemini_manifest.jsonl"
+METRICS_FILENAME = "gemini_metrics.jsonl"  # 每次 API 呼叫的延遲、token 數與估計費用
+STAGE = "analysis"
 
-# 設定要使用的 AI 模型
-model = genai.GenerativeModel('gemini-1.5-flash')
+# 3. 設定要使用的 AI 模型 (provider:model，也可用 --backend 參數指定，例如 openai:gpt-4.1 或 stub:test)
+BACKEND = "gemini:gemini-1.5-flash"
+# ---------------
 
-# 指令範本維持不變，一樣用 "||" 分隔，方便程式解析
+# 指令範本：要求模型回傳符合 analysis_schema 的 JSON (與 words.json 的 analysis 結構相同)，
+# 不再依賴 "||" 與 "|" 分隔符號
 PROMPT_TEMPLATE = """
 你是一位專業的英文詞彙專家「單字庫」。
 請針對英文單字 "{word}" 進行全面且深入的分析。
-請嚴格依照以下格式回傳結果，並使用 "||" 作為主要分隔符號。
-
-1.  **主要意思**：
-    * [詞性]||[中文定義]||[英文例句]||[例句中文翻譯]
+{field_guide}
+請只回傳一個 JSON 物件。
+"""
 
-2.  **次要意思**：
-    * (如果有多個，請用 "|" 分隔每一組)
-    * [詞性1]|[中文定義1]|[英文例句1]|[例句翻譯1]|[詞性2]|[中文定義2]...
+async def analyze_word(backend, word):
+    """使用 AI 模型分析單一單字，回傳驗證過的分析 (失敗時拋出例外，由呼叫端記錄到工作清單)"""
+    print(f"正在分析單字：{word}...")
+    prompt = PROMPT_TEMPLATE.format(word=word, field_guide=FIELD_GUIDE)
+    # 快取、重試與速率限制都由 backend 統一處理；格式不符的欄位只會針對該欄位重新詢問
+    return await request_analysis(backend, word, prompt, output_estimate=1500)
 
-3.  **相關衍生字**：
-    * (如果有多個，請用 "|" 分隔)
-    * [單字1] ([詞性1]): [中文意思1]|[單字2] ([詞性2]): [中文意思2]...
+def format_as_markdown(word, analysis):
+    """將結構化的分析內容格式化為 Markdown 字串"""
+    return format_analysis_markdown(word, analysis)
 
-4.  **相關片語/慣用語**：
-    * (如果有多個，請用 "|" 分隔每一組)
-    * [片語1]|[中文定義1]|[英文例句1]|[例句翻譯1]|[片語2]...
+def save_analysis(manifest, word, analysis):
+    """寫入 Markdown 與 JSON 檔案，結果記錄到工作清單"""
+    markdown_content = format_as_markdown(word, analysis)
 
-如果某個項目沒有內容，請填寫 "無"。
-"""
+    # 設定每個單字的檔案路徑與名稱
+    file_path = os.path.join(OUTPUT_DIRECTORY_NAME, f"{word}.md")
+    json_path = os.path.join(OUTPUT_DIRECTORY_NAME, f"{word}.json")
 
-def analyze_word(word):
-    """使用 AI 模型分析單一單字"""
-    print(f"正在分析單字：{word}...")
+    # 寫入檔案
     try:
-        prompt = PROMPT_TEMPLATE.format(word=word)
-        response = model.generate_content(prompt)
-        time.sleep(1) # 停頓1秒，避免 API 請求過於頻繁
-        return response.text.strip()
+        with open(file_path, 'w', encoding='utf-8') as f_out:
+            f_out.write(markdown_content)
+        with open(json_path, 'w', encoding='utf-8') as f_out:
+            json.dump(analysis, f_out, ensure_ascii=False, indent=1)
+        manifest.done(word, STAGE, markdown_content)
+        print(f" -> 已儲存至 {file_path}")
     except Exception as e:
-        print(f"分析單字 '{word}' 時發生錯誤：{e}")
-        return None
-
-def format_as_markdown(word, parts):
-    """將解析後的內容格式化為 Markdown 字串"""
-    # parts[0]: 主要意思_詞性, parts[1]: 主要意思_定義, etc.
-    content = f"# {word.capitalize()}\n\n"
-
-    # 1. 主要意思
-    content += "## 1. 主要意思 (Most Common Meaning)\n"
-    content += f"- **詞性:** {parts[0]}\n"
-    content += f"- **定義:** {parts[1]}\n"
-    content += f"- **例句:** {parts[2]}\n"
-    content += f"  - (翻譯): {parts[3]}\n\n"
-
-    # 2. 次要意思
-    secondary_meanings_raw = parts[4]
-    if secondary_meanings_raw != "無":
-        content += "## 2. 次要/不常見意思 (Less Common Meanings)\n"
-        items = secondary_meanings_raw.split('|')
-        # 每4個元素為一組 (詞性, 定義, 例句, 翻譯)
-        for i in range(0, len(items), 4):
-            if i+3 < len(items):
-                content += f"- **詞性:** {items[i].strip()}\n"
-                content += f"  - **定義:** {items[i+1].strip()}\n"
-                content += f"  - **例句:** {items[i+2].strip()}\n"
-                content += f"    - (翻譯): {items[i+3].strip()}\n"
-        content += "\n"
-
-    # 3. 相關衍生字
-    word_family_raw = parts[5]
-    if word_family_raw != "無":
-        content += "## 3. 相關衍生字 (Word Family)\n"
-        items = word_family_raw.split('|')
-        for item in items:
-            content += f"- {item.strip()}\n"
-        content += "\n"
-
-    # 4. 相關片語
-    phrases_raw = parts[6]
-    if phrases_raw != "無":
-        content += "## 4. 相關片語/慣用語 (Related Phrases/Idioms)\n"
-        items = phrases_raw.split('|')
-        # 每4個元素為一組 (片語, 定義, 例句, 翻譯)
-        for i in range(0, len(items), 4):
-             if i+3 < len(items):
-                content += f"- **片語:** {items[i].strip()}\n"
-                content += f"  - **定義:** {items[i+1].strip()}\n"
-                content += f"  - **例句:** {items[i+2].strip()}\n"
-                content += f"    - (翻譯): {items[i+3].strip()}\n"
-        content += "\n"
-        
-    return content
+        print(f"寫入檔案 '{file_path}' 時發生錯誤: {e}")
+        manifest.failed(word, STAGE, e)
+
+async def analyze_all(args, words, manifest, cache, metrics):
+    api_key = API_KEY if API_KEY != "在這裡貼上您的API金鑰" else None
+    backend = create_backend(args.backend, cache=cache, concurrency=args.concurrency, rpm=args.rpm,
+                             tpm=args.tpm, api_key=api_key, base_url=args.base_url, latency=args.stub_latency,
+                             metrics=metrics, stage=STAGE)
+
+    def save(word, analysis):
+        save_analysis(manifest, word, analysis)
+        # 進度、速度與預估剩餘時間
+        print(f" -> 進度 {metrics.item_done(STAGE, len(words))}")
+
+    if args.pack:
+        def fail_packed(word, error):
+            print(f" -> 分析單字 '{word}' 失敗：{error}")
+            manifest.failed(word, STAGE, error)
+
+        try:
+            await run_packed(backend, words, save, fail_packed, max_pack=args.pack)
+        finally:
+            print(backend.report())
+            await backend.close()
+        return
+
+    async def analyze_one(word):
+        try:
+            analysis = await analyze_word(backend, word)
+        except Exception as e:
+            print(f" -> 分析單字 '{word}' 時發生錯誤：{e}")
+            manifest.failed(word, STAGE, e)
+            return
+        save(word, analysis)
+
+    try:
+        await asyncio.gather(*(analyze_one(w) for w in words))
+    finally:
+        print(backend.report())
+        await backend.close()
 
 def main():
     """主程式：讀取檔案、分析單字、為每個單字寫入獨立的 .md 檔案"""
+    parser = argparse.ArgumentParser(description="使用 LLM 分析單字並輸出 Markdown 檔案")
+    parser.add_argument('--backend', default=BACKEND, help="provider:model，例如 gemini:gemini-1.5-flash")
+    parser.add_argument('--concurrency', type=int, default=1, help="同時進行的請求數量")
+    parser.add_argument('--pack', type=int, default=0, help="每次請求最多分析 N 個單字 (JSON 輸出，會依模型上限自動調小)")
+    parser.add_argument('--manifest', default=MANIFEST_FILENAME, help="記錄每個單字處理狀態的工作清單")
+    parser.add_argument('--resume', action='store_true', help="跳過已完成的單字，只重試失敗或缺少的單字")
+    add_backend_arguments(parser)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser, METRICS_FILENAME)
+    args = parser.parse_args()
+
     # 建立存放結果的資料夾 (如果不存在)
     os.makedirs(OUTPUT_DIRECTORY_NAME, exist_ok=True)
 
@@ -120,32 +127,32 @@ def main():
         print(f"錯誤：找不到輸入檔案 '{INPUT_FILENAME}'。請確認檔案與程式放在同一個資料夾。")
         return
 
-    print(f"找到 {len(words)} 個單字，即將開始分析並存入 '{OUTPUT_DIRECTORY_NAME}' 資料夾...")
+    manifest = JobManifest(args.manifest)
+    cache = open_cache(args)
+    metrics = open_metrics(args)
+    if args.resume:
+        total = len(words)
+        words = [w for w in words
+                 if not manifest.is_done(w, STAGE, os.path.join(OUTPUT_DIRECTORY_NAME, f"{w}.md"))]
+        print(f"續跑模式：已完成 {total - len(words)} 個單字，剩下 {len(words)} 個。")
 
-    for word in words:
-        analysis_text = analyze_word(word)
-        if analysis_text:
-            parts = analysis_text.split('||')
-            if len(parts) >= 7:
-                # 將解析結果格式化為 Markdown
-                markdown_content = format_as_markdown(word, [p.strip() for p in parts])
-                
-                # 設定每個單字的檔案路徑與名稱
-                file_path = os.path.join(OUTPUT_DIRECTORY_NAME, f"{word}.md")
-                
-                # 寫入檔案
-                try:
-                    with open(file_path, 'w', encoding='utf-8') as f_out:
-                        f_out.write(markdown_content)
-                    print(f" -> 已儲存至 {file_path}")
-                except Exception as e:
-                    print(f"寫入檔案 '{file_path}' 時發生錯誤: {e}")
-            else:
-                print(f" -> 單字 '{word}' 的分析結果格式不符，已跳過。")
-        else:
-            print(f" -> 單字 '{word}' 分析失敗，已跳過。")
+    print(f"找到 {len(words)} 個單字，即將開始分析並存入 '{OUTPUT_DIRECTORY_NAME}' 資料夾...")
 
+    try:
+        asyncio.run(analyze_all(args, words, manifest, cache, metrics))
+    finally:
+        manifest.close()
+        if cache is not None:
+            print(cache.report())
+            cache.close()
+        print(metrics.report())
+        metrics.close()
+
+    # 只計算本次處理的單字 (每個單字以最新一筆紀錄為準)
+    failed = manifest.summary(STAGE, words)[FAILED]
     print(f"\n全部分析完成！所有檔案皆已儲存於 '{OUTPUT_DIRECTORY_NAME}' 資料夾中。")
+    if failed:
+        print(f"共有 {failed} 個單字失敗，已記錄於 '{args.manifest}'，可用 --resume 重試。")
 
 if __name__ == "__main__":
     main()
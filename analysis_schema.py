@@ -0,0 +1,148 @@
+import json
+
+# The structured word analysis shared by the LLM analyzers and the flashcard app.
+#
+# This is the same shape as the "analysis" object in
+# vocabulary-flashcards/data/words.json (see generate_full_data.process_word),
+# so LLM output can be merged into the app's dataset without conversion.
+
+MEANING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "part_of_speech": {"type": "string"},
+        "definition": {"type": "string"},
+        "example": {"type": "string"},
+    },
+    "required": ["part_of_speech", "definition", "example"],
+    "additionalProperties": False,
+}
+
+FAMILY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "word": {"type": "string"},
+        "part_of_speech": {"type": "string"},
+        "definition": {"type": "string"},
+    },
+    "required": ["word", "part_of_speech", "definition"],
+    "additionalProperties": False,
+}
+
+PHRASE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "phrase": {"type": "string"},
+        "definition": {"type": "string"},
+        "example": {"type": "string"},
+    },
+    "required": ["phrase", "definition", "example"],
+    "additionalProperties": False,
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "most_common_meaning": MEANING_SCHEMA,
+        "less_common_meanings": {"type": "array", "items": MEANING_SCHEMA},
+        "word_family": {"type": "array", "items": FAMILY_SCHEMA},
+        "related_phrases": {"type": "array", "items": PHRASE_SCHEMA},
+    },
+    "required": ["most_common_meaning", "less_common_meanings", "word_family", "related_phrases"],
+    "additionalProperties": False,
+}
+
+# 給模型看的欄位說明 (JSON schema 本身不帶語意)
+FIELD_GUIDE = """
+每個單字的分析是一個 JSON 物件，欄位如下：
+- "most_common_meaning": 主要意思，物件 {"part_of_speech": 詞性, "definition": 中文定義, "example": 英文例句，後面以括號附上中文翻譯}
+- "less_common_meanings": 次要/不常見意思，陣列，每個元素格式同 most_common_meaning
+- "word_family": 相同字根的衍生字，陣列，每個元素 {"word": 單字, "part_of_speech": 詞性, "definition": 中文意思}
+- "related_phrases": 常見片語或慣用語，陣列，每個元素 {"phrase": 片語, "definition": 中文定義, "example": 英文例句，後面以括號附上中文翻譯}
+沒有內容的項目請回傳空陣列 []，不要編造。
+"""
+
+def packed_schema(words):
+    """Schema for one response covering several words: {"<word>": analysis, ...}."""
+    return {
+        "type": "object",
+        "properties": {word: ANALYSIS_SCHEMA for word in words},
+        "required": list(words),
+        "additionalProperties": False,
+    }
+
+
+def parse_json_response(text):
+    """json.loads that tolerates a ```json fenced block around the object."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return json.loads(text)
+
+
+def _check_object(value, schema, path, errors):
+    if not isinstance(value, dict):
+        errors.append((path, "must be an object"))
+        return
+    for key in schema["required"]:
+        field = value.get(key)
+        field_path = f"{path}.{key}" if path else key
+        expected = schema["properties"][key]["type"]
+        if expected == "string":
+            if not isinstance(field, str) or not field.strip():
+                errors.append((field_path, "must be a non-empty string"))
+        elif expected == "array":
+            if not isinstance(field, list):
+                errors.append((field_path, "must be an array"))
+                continue
+            item_schema = schema["properties"][key]["items"]
+            for i, item in enumerate(field):
+                _check_object(item, item_schema, f"{field_path}[{i}]", errors)
+        else:
+            _check_object(field, schema["properties"][key], field_path, errors)
+
+
+def validate_analysis(analysis):
+    """Return a list of (field_path, problem) pairs; empty when the analysis is valid."""
+    errors = []
+    _check_object(analysis, ANALYSIS_SCHEMA, "", errors)
+    return errors
+
+
+def format_analysis_markdown(word, analysis, heading=True):
+    """將結構化的分析轉成 Markdown (與 Gemini_analyze_words.format_as_markdown 相同的版面)"""
+    content = f"# {word.capitalize()}\n\n" if heading else ""
+
+    # 1. 主要意思
+    main = analysis["most_common_meaning"]
+    content += "## 1. 主要意思 (Most Common Meaning)\n"
+    content += f"- **詞性:** {main['part_of_speech']}\n"
+    content += f"- **定義:** {main['definition']}\n"
+    content += f"- **例句:** {main['example']}\n\n"
+
+    # 2. 次要意思
+    if analysis["less_common_meanings"]:
+        content += "## 2. 次要/不常見意思 (Less Common Meanings)\n"
+        for item in analysis["less_common_meanings"]:
+            content += f"- **詞性:** {item['part_of_speech']}\n"
+            content += f"  - **定義:** {item['definition']}\n"
+            content += f"  - **例句:** {item['example']}\n"
+        content += "\n"
+
+    # 3. 相關衍生字
+    if analysis["word_family"]:
+        content += "## 3. 相關衍生字 (Word Family)\n"
+        for item in analysis["word_family"]:
+            content += f"- {item['word']} ({item['part_of_speech']}): {item['definition']}\n"
+        content += "\n"
+
+    # 4. 相關片語
+    if analysis["related_phrases"]:
+        content += "## 4. 相關片語/慣用語 (Related Phrases/Idioms)\n"
+        for item in analysis["related_phrases"]:
+            content += f"- **片語:** {item['phrase']}\n"
+            content += f"  - **定義:** {item['definition']}\n"
+            content += f"  - **例句:** {item['example']}\n"
+        content += "\n"
+
+    return content
@@ -0,0 +1,3 @@
+# vocabulary-flashcards/test_nltk.py is a setup script (it downloads WordNet
+# when it runs), not a test module, so pytest must not import it.
+collect_ignore = ["vocabulary-flashcards/test_nltk.py"]
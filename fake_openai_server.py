@@ -0,0 +1,235 @@
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A tiny OpenAI-compatible server for exercising the analysis scripts offline.
+# Supports chat completions plus the Files and Batches endpoints used by --batch.
+# Usage:
+#   python fake_openai_server.py --port 8080 --latency 0.5 --rpm 60
+#   OPENAI_API_KEY=fake python openai_word_analysis.py --async --base-url http://localhost:8080/v1
+#   OPENAI_API_KEY=fake python openai_word_analysis.py --batch --poll-interval 1 --base-url http://localhost:8080/v1
+
+class FakeState:
+    def __init__(self, latency, rpm, batch_fail_rate=0.0, window=60):
+        self.latency = latency
+        self.rpm = rpm
+        self.window = window
+        self.batch_fail_rate = batch_fail_rate
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.served = 0
+        self.rejected = 0
+        self.ids = itertools.count(1)
+        self.files = {}
+        self.batches = {}
+
+    def new_id(self, prefix):
+        with self.lock:
+            return f"{prefix}-fake-{next(self.ids)}"
+
+    def add_file(self, content, filename, purpose):
+        file_id = self.new_id("file")
+        self.files[file_id] = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+            "content": content,
+        }
+        return self.files[file_id]
+
+    def admit(self):
+        """Fixed quota window (a minute by default); returns seconds to wait if over quota, else None."""
+        if not self.rpm:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= self.window:
+                self.window_start = now
+                self.window_count = 0
+            if self.window_count >= self.rpm:
+                self.rejected += 1
+                return self.window - (now - self.window_start)
+            self.window_count += 1
+            return None
+
+def completion(request, served):
+    prompt = "".join(m.get('content', '') for m in request.get('messages', []))
+    content = f"[fake {request.get('model')}] {prompt[:80]}"
+    prompt_tokens = len(prompt.encode('utf-8')) // 3 + 1
+    completion_tokens = len(content.encode('utf-8')) // 3 + 1
+    return {
+        "id": f"chatcmpl-fake-{served}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get('model'),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+def public(obj):
+    return {k: v for k, v in obj.items() if k != "content"}
+
+def process_batch(state, batch):
+    """Run a batch in the background; some requests fail per --batch-fail-rate."""
+    batch["status"] = "in_progress"
+    lines = state.files[batch["input_file_id"]]["content"].decode('utf-8').splitlines()
+    outputs, errors = [], []
+    for line in lines:
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        time.sleep(state.latency / 10)
+        if random.random() < state.batch_fail_rate:
+            errors.append({"id": state.new_id("batch_req"), "custom_id": item["custom_id"], "response": {
+                "status_code": 500, "body": {"error": {"message": "fake server error"}}}, "error": None})
+            batch["request_counts"]["failed"] += 1
+        else:
+            outputs.append({"id": state.new_id("batch_req"), "custom_id": item["custom_id"], "response": {
+                "status_code": 200, "body": completion(item["body"], batch["request_counts"]["completed"])},
+                "error": None})
+            batch["request_counts"]["completed"] += 1
+
+    def to_file(records, name):
+        content = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode('utf-8')
+        return state.add_file(content, name, "batch_output")["id"]
+
+    batch["output_file_id"] = to_file(outputs, "output.jsonl") if outputs else None
+    batch["error_file_id"] = to_file(errors, "errors.jsonl") if errors else None
+    batch["status"] = "completed"
+    batch["completed_at"] = int(time.time())
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_POST(self):
+        path = self.path.rstrip('/')
+        if path.endswith('/chat/completions'):
+            self.handle_chat(self.read_json())
+        elif path.endswith('/files'):
+            self.handle_upload()
+        elif path.endswith('/batches'):
+            self.handle_create_batch(self.read_json())
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_GET(self):
+        parts = self.path.rstrip('/').split('/')
+        if len(parts) >= 3 and parts[-2] == 'batches' and parts[-1] in self.state.batches:
+            self.send_json(200, self.state.batches[parts[-1]])
+        elif len(parts) >= 3 and parts[-1] == 'content' and parts[-2] in self.state.files:
+            content = self.state.files[parts[-2]]["content"]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def handle_upload(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode('utf-8')
+        message = BytesParser(policy=HTTP).parsebytes(header + raw)
+        fields = {}
+        for part in message.iter_parts():
+            fields[part.get_param('name', header='content-disposition')] = part
+        upload = fields.get('file')
+        purpose = fields['purpose'].get_content().strip() if 'purpose' in fields else 'batch'
+        if upload is None:
+            self.send_json(400, {"error": {"message": "missing file"}})
+            return
+        record = self.state.add_file(upload.get_payload(decode=True), upload.get_filename(), purpose)
+        self.send_json(200, public(record))
+
+    def handle_create_batch(self, request):
+        if request.get('input_file_id') not in self.state.files:
+            self.send_json(400, {"error": {"message": "unknown input_file_id"}})
+            return
+        batch_id = self.state.new_id("batch")
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": request.get('endpoint'),
+            "input_file_id": request['input_file_id'],
+            "completion_window": request.get('completion_window', '24h'),
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        batch["request_counts"]["total"] = sum(
+            1 for line in self.state.files[request['input_file_id']]["content"].splitlines() if line.strip())
+        self.state.batches[batch_id] = batch
+        threading.Thread(target=process_batch, args=(self.state, batch), daemon=True).start()
+        self.send_json(200, batch)
+
+    def handle_chat(self, request):
+        wait = self.state.admit()
+        if wait is not None:
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                           headers={'Retry-After': f"{wait:.2f}"})
+            return
+
+        time.sleep(self.state.latency)
+        with self.state.lock:
+            self.state.served += 1
+        self.send_json(200, completion(request, self.state.served))
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible API server for offline runs.")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.2, help="seconds to sleep per completion")
+    parser.add_argument('--rpm', type=int, default=0, help="reject with 429 + Retry-After above this many requests/minute (0 = unlimited)")
+    parser.add_argument('--batch-fail-rate', type=float, default=0.0, help="fraction of batch requests that come back as errors")
+    parser.add_argument('--window', type=float, default=60, help="seconds the --rpm quota applies to (shorter for quick tests)")
+    args = parser.parse_args()
+
+    FakeOpenAIHandler.state = FakeState(args.latency, args.rpm, args.batch_fail_rate, args.window)
+    server = ThreadingHTTPServer(("", args.port), FakeOpenAIHandler)
+    print(f"Fake OpenAI API at http://localhost:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        state = FakeOpenAIHandler.state
+        print(f"\nServed {state.served} completions, rejected {state.rejected} with 429.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import time
+
+# Durable per-word job log for the batch analysis scripts.
+#
+# Every state change is appended as one JSON line and flushed to disk, so a
+# crash loses at most the call that was in flight. On startup the log is
+# replayed and the latest record for each (word, stage) wins.
+
+DONE = "done"
+FAILED = "failed"
+
+
+def output_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class JobManifest:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-write; ignore it
+                        continue
+                    self.entries[(record["word"], record["stage"])] = record
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def get(self, word, stage):
+        return self.entries.get((word, stage))
+
+    def is_done(self, word, stage, output_path=None):
+        """True if the stage succeeded (and, if given, its output file still exists)."""
+        record = self.get(word, stage)
+        if not record or record["status"] != DONE:
+            return False
+        return output_path is None or os.path.exists(output_path)
+
+    def record(self, word, stage, status, error=None, output=None):
+        previous = self.get(word, stage)
+        record = {
+            "word": word,
+            "stage": stage,
+            "status": status,
+            "attempts": (previous["attempts"] if previous else 0) + 1,
+            "error": error,
+            "output_hash": output_hash(output) if output is not None else None,
+            "time": time.time(),
+        }
+        self.entries[(word, stage)] = record
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return record
+
+    def done(self, word, stage, output):
+        return self.record(word, stage, DONE, output=output)
+
+    def failed(self, word, stage, error):
+        return self.record(word, stage, FAILED, error=str(error))
+
+    def summary(self, stage, words=None):
+        """
+        Status counts for `stage` from each word's latest record, over `words`
+        (the run's word list) or, without it, every word in the log.
+        """
+        if words is None:
+            records = [record for (_, s), record in self.entries.items() if s == stage]
+        else:
+            records = [record for record in (self.get(w, stage) for w in set(words)) if record]
+        counts = {DONE: 0, FAILED: 0}
+        for record in records:
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+        return counts
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from rate_limiter import RateLimiter, call_with_retries, estimate_tokens
+from response_cache import CacheMiss, cache_key
+
+# Provider-agnostic LLM backends for the analysis scripts.
+#
+# A backend is chosen per stage with a "provider:model" spec, e.g.
+# "openai:o1-mini", "gemini:gemini-1.5-flash" or "stub:fast". Every backend
+# goes through the same machinery in LLMBackend.generate(): response cache,
+# concurrency limit, RPM/TPM token buckets, 429/5xx retries and call stats
+# (also recorded per call when a pipeline_metrics.MetricsRecorder is passed).
+# Subclasses only implement _call(), which sends one request to the provider.
+
+
+def backend_cache_key(name, prompt, system=None, params=None):
+    return cache_key(name, {"system": system, "prompt": prompt}, params or {})
+
+
+def openai_request_body(model, prompt, system=None, params=None):
+    """Chat Completions request body, shared by live calls and Batch API files."""
+    params = dict(params or {})
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    schema = params.pop("json_schema", None)
+    # o1 models do not accept response_format; the prompt alone asks for JSON there
+    if schema is not None and not model.startswith("o1"):
+        params["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": "word_analysis", "schema": schema},
+        }
+    return {"model": model, "messages": messages, **params}
+
+
+class LLMBackend:
+    provider = None
+
+    def __init__(self, model, cache=None, rpm=None, tpm=None, concurrency=8, max_retries=5, metrics=None,
+                 stage=None):
+        self.model = model
+        self.cache = cache
+        self.metrics = metrics
+        self.stage = stage or "llm"
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._semaphore = None
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "retries": 0,
+            "errors": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "seconds": 0.0,
+        }
+
+    @property
+    def name(self):
+        return f"{self.provider}:{self.model}"
+
+    async def _call(self, prompt, system, params):
+        """Send one request; return (text, prompt_tokens, completion_tokens)."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    async def generate(self, prompt, system=None, output_estimate=2000, **params):
+        key = backend_cache_key(self.name, prompt, system, params)
+        if self.cache is not None:
+            try:
+                cached = self.cache.get(key)
+            except CacheMiss as e:
+                if self.metrics is not None:
+                    self.metrics.record(self.stage, self.name, error=e)
+                raise
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                if self.metrics is not None:
+                    self.metrics.record(self.stage, self.name, cache_hit=True)
+                return cached
+
+        if self._semaphore is None:
+            # Created lazily so it binds to the running event loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        estimated = estimate_tokens((system or "") + prompt) + output_estimate
+
+        retries = 0
+
+        def on_retry(error, delay):
+            nonlocal retries
+            retries += 1
+            self.stats["retries"] += 1
+
+        async with self._semaphore:
+            start = time.monotonic()
+            try:
+                text, prompt_tokens, completion_tokens = await call_with_retries(
+                    lambda: self._call(prompt, system, params), self.limiter, estimated,
+                    max_retries=self.max_retries, on_retry=on_retry)
+            except Exception as e:
+                self.stats["errors"] += 1
+                if self.metrics is not None:
+                    self.metrics.record(self.stage, self.name, time.monotonic() - start, retries=retries, error=e)
+                raise
+            finally:
+                self.stats["seconds"] += time.monotonic() - start
+        if self.metrics is not None:
+            # Latency includes rate-limit waits and retries: it is what the pipeline actually sees
+            self.metrics.record(self.stage, self.name, time.monotonic() - start, prompt_tokens, completion_tokens,
+                                retries)
+
+        self.stats["requests"] += 1
+        self.stats["prompt_tokens"] += prompt_tokens or 0
+        self.stats["completion_tokens"] += completion_tokens or 0
+        if prompt_tokens is not None and completion_tokens is not None:
+            self.limiter.record_usage(estimated, prompt_tokens + completion_tokens)
+
+        text = text.strip()
+        if self.cache is not None:
+            self.cache.put(key, text, self.name)
+        return text
+
+    def report(self):
+        s = self.stats
+        avg = s["seconds"] / s["requests"] if s["requests"] else 0.0
+        return (f"{self.name}: {s['requests']} requests ({avg:.2f}s avg), {s['cache_hits']} cache hits, "
+                f"{s['retries']} retries, {s['errors']} errors, "
+                f"{s['prompt_tokens']} prompt + {s['completion_tokens']} completion tokens")
+
+
+class OpenAIBackend(LLMBackend):
+    provider = "openai"
+
+    def __init__(self, model, api_key=None, base_url=None, **kwargs):
+        super().__init__(model, **kwargs)
+        from openai import AsyncOpenAI
+
+        # Retries are handled by call_with_retries so 429s pause the shared limiter.
+        # In cache-only runs no request is ever sent, so any key will do.
+        self.client = AsyncOpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY') or "cache-only",
+                                  base_url=base_url, max_retries=0)
+
+    async def _call(self, prompt, system, params):
+        body = openai_request_body(self.model, prompt, system, params)
+        response = await self.client.chat.completions.create(**body)
+        usage = response.usage
+        return (response.choices[0].message.content,
+                getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+
+    async def close(self):
+        await self.client.close()
+
+
+class GeminiBackend(LLMBackend):
+    provider = "gemini"
+
+    def __init__(self, model, api_key=None, **kwargs):
+        super().__init__(model, **kwargs)
+        import google.generativeai as genai
+
+        self.genai = genai
+        api_key = api_key or os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+        if api_key:
+            genai.configure(api_key=api_key)
+        self._models = {}
+
+    def _model(self, system):
+        # GenerativeModel takes the system prompt at construction time
+        if system not in self._models:
+            self._models[system] = self.genai.GenerativeModel(self.model, system_instruction=system)
+        return self._models[system]
+
+    async def _call(self, prompt, system, params):
+        config = {}
+        if "max_tokens" in params:
+            config["max_output_tokens"] = params["max_tokens"]
+        if "temperature" in params:
+            config["temperature"] = params["temperature"]
+        if "json_schema" in params:
+            # The schema itself is spelled out in the prompt; Gemini only needs JSON mode
+            config["response_mime_type"] = "application/json"
+        response = await self._model(system).generate_content_async(prompt, generation_config=config or None)
+        usage = getattr(response, "usage_metadata", None)
+        return (response.text,
+                getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None))
+
+
+def example_from_schema(schema, seed):
+    """Smallest instance of a JSON schema with non-empty strings (used by the stub)."""
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: example_from_schema(sub, f"{seed}.{key}") for key, sub in schema["properties"].items()}
+    if kind == "array":
+        return [example_from_schema(schema["items"], f"{seed}[0]")]
+    return f"stub {seed}"
+
+
+class StubBackend(LLMBackend):
+    """Offline backend: deterministic output after an injected latency."""
+
+    provider = "stub"
+
+    def __init__(self, model, latency=0.0, **kwargs):
+        super().__init__(model, **kwargs)
+        self.latency = latency
+
+    async def _call(self, prompt, system, params):
+        await asyncio.sleep(self.latency)
+        if "json_schema" in params:
+            text = json.dumps(example_from_schema(params["json_schema"], self.model), ensure_ascii=False)
+        else:
+            digest = hashlib.sha256(((system or "") + prompt).encode('utf-8')).hexdigest()[:12]
+            text = f"[{self.name} {digest}] {prompt.strip()[:200]}"
+        return text, estimate_tokens((system or "") + prompt), estimate_tokens(text)
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "gemini": GeminiBackend,
+    "stub": StubBackend,
+}
+
+
+def create_backend(spec, **kwargs):
+    """Build a backend from a "provider:model" spec; provider-specific kwargs are dropped for others."""
+    provider, _, model = spec.partition(":")
+    if provider not in BACKENDS or not model:
+        raise ValueError(f"Unknown backend '{spec}', expected one of "
+                         f"{', '.join(p + ':<model>' for p in BACKENDS)}")
+    backend_class = BACKENDS[provider]
+    if backend_class is not OpenAIBackend:
+        kwargs.pop("base_url", None)
+    if backend_class is StubBackend:
+        kwargs.pop("api_key", None)
+    else:
+        kwargs.pop("latency", None)
+    return backend_class(model, **kwargs)
+
+
+def add_backend_arguments(parser):
+    parser.add_argument('--rpm', type=float, default=500, help="requests per minute quota per backend")
+    parser.add_argument('--tpm', type=float, default=200000, help="tokens per minute quota per backend")
+    parser.add_argument('--base-url', default=None,
+                        help="OpenAI-compatible endpoint, e.g. http://localhost:8080/v1 for fake_openai_server.py")
+    parser.add_argument('--stub-latency', type=float, default=0.0, help="seconds each stub backend call takes")
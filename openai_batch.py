@@ -0,0 +1,152 @@
+import json
+import os
+import time
+
+from llm_backends import backend_cache_key, openai_request_body
+
+# OpenAI Batch API support for openai_word_analysis.py.
+#
+# A stage is turned into one or more JSONL request files, each submitted as a
+# batch. Submitted batch ids are kept in a state file, so an interrupted run
+# picks up polling where it stopped instead of paying for the batch again.
+# Results are fanned back out through the Workspace (word_drafts/ or
+# word_analyses/ plus the job manifest); requests that errored or are missing
+# from the output are recorded as failed and resubmitted on the next --resume.
+# Token usage of every collected request goes to the metrics recorder, if any,
+# priced at the batch discount.
+
+ENDPOINT = "/v1/chat/completions"
+FINISHED = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchRunner:
+    def __init__(self, client, model, batch_dir="batches", max_requests=50000,
+                 poll_interval=30, cache=None, metrics=None):
+        self.client = client
+        self.model = model
+        self.batch_dir = batch_dir
+        self.max_requests = max_requests
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self.metrics = metrics
+        self.state_path = os.path.join(batch_dir, "state.json")
+        os.makedirs(batch_dir, exist_ok=True)
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        else:
+            self.state = {"batches": []}
+
+    def save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def build(self, stage, calls):
+        """Write `calls` ({word: call}) as JSONL request files; return their paths."""
+        items = list(calls.items())
+        paths = []
+        for part, start in enumerate(range(0, len(items), self.max_requests)):
+            path = os.path.join(self.batch_dir, f"{stage}_{int(time.time())}_{part}.jsonl")
+            with open(path, 'w', encoding='utf-8') as f:
+                for word, call in items[start:start + self.max_requests]:
+                    line = {
+                        "custom_id": f"{stage}:{word}",
+                        "method": "POST",
+                        "url": ENDPOINT,
+                        "body": openai_request_body(self.model, call["prompt"], call["system"], call["params"]),
+                    }
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            paths.append(path)
+        return paths
+
+    def submit(self, stage, path, words):
+        with open(path, 'rb') as f:
+            upload = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(input_file_id=upload.id, endpoint=ENDPOINT,
+                                           completion_window="24h")
+        entry = {"stage": stage, "batch_id": batch.id, "input_file": path,
+                 "words": words, "collected": False}
+        self.state["batches"].append(entry)
+        self.save_state()
+        print(f"Submitted batch {batch.id} ({len(words)} {stage} requests)")
+        return entry
+
+    def pending(self, stage):
+        return [b for b in self.state["batches"] if b["stage"] == stage and not b["collected"]]
+
+    def wait(self, batch_id):
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            counts = getattr(batch, "request_counts", None)
+            progress = f" {counts.completed + counts.failed}/{counts.total}" if counts else ""
+            print(f"Batch {batch_id}: {batch.status}{progress}")
+            if batch.status in FINISHED:
+                return batch
+            time.sleep(self.poll_interval)
+
+    def read_file(self, file_id):
+        if not file_id:
+            return []
+        content = self.client.files.content(file_id).text
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    def collect(self, entry, calls, on_result, on_error):
+        """
+        Fan one finished batch back out. Every word submitted in the batch ends
+        up in exactly one of on_result / on_error, including words the batch
+        output silently dropped (e.g. an expired batch).
+        """
+        batch = self.wait(entry["batch_id"])
+        seen = set()
+        for line in self.read_file(getattr(batch, "output_file_id", None)) + \
+                self.read_file(getattr(batch, "error_file_id", None)):
+            word = line["custom_id"].split(":", 1)[1]
+            seen.add(word)
+            response = line.get("response") or {}
+            if line.get("error") or response.get("status_code") != 200:
+                error = line.get("error") or response.get("body", {}).get("error") or response
+                if self.metrics is not None:
+                    self.metrics.record(entry["stage"], f"openai:{self.model}", error=error, item=word, batch=True)
+                on_error(word, f"batch request failed: {error}")
+                continue
+            if self.metrics is not None:
+                usage = response["body"].get("usage") or {}
+                self.metrics.record(entry["stage"], f"openai:{self.model}", prompt_tokens=usage.get("prompt_tokens"),
+                                    completion_tokens=usage.get("completion_tokens"), item=word, batch=True)
+            text = response["body"]["choices"][0]["message"]["content"].strip()
+            if self.cache is not None and word in calls:
+                call = calls[word]
+                key = backend_cache_key(f"openai:{self.model}", call["prompt"], call["system"], call["params"])
+                self.cache.put(key, text, f"openai:{self.model}")
+            on_result(word, text)
+
+        for word in entry["words"]:
+            if word not in seen:
+                on_error(word, f"missing from batch {entry['batch_id']} output (status {batch.status})")
+
+        entry["collected"] = True
+        entry["status"] = batch.status
+        self.save_state()
+
+    def run_stage(self, stage, calls, on_result, on_error):
+        """
+        Collect this stage's batches left over from an interrupted run, then
+        submit and collect the `calls` they did not cover.
+        """
+        stale = self.pending(stage)
+        if stale:
+            print(f"Resuming {len(stale)} submitted {stage} batches")
+        for entry in stale:
+            self.collect(entry, calls, on_result, on_error)
+        # Words of a stale batch are settled either way; failed ones go again on the next --resume
+        covered = {word for entry in stale for word in entry["words"]}
+        remaining = {word: call for word, call in calls.items() if word not in covered}
+        entries = []
+        for path in self.build(stage, remaining) if remaining else []:
+            with open(path, 'r', encoding='utf-8') as f:
+                words = [json.loads(line)["custom_id"].split(":", 1)[1] for line in f]
+            entries.append(self.submit(stage, path, words))
+        for entry in entries:
+            self.collect(entry, calls, on_result, on_error)
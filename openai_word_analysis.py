@@ -1,6 +1,16 @@
+import argparse
+import asyncio
+import json
 import os
-import time
-from openai import OpenAI
+
+from analysis_schema import FIELD_GUIDE, format_analysis_markdown
+from job_manifest import FAILED, JobManifest
+from llm_backends import add_backend_arguments, create_backend
+from openai_batch import BatchRunner
+from pipeline_metrics import MetricsRecorder, add_metrics_arguments, open_metrics
+from prompt_packing import run_packed
+from response_cache import add_cache_arguments, open_cache
+from structured_output import request_analysis
 
 # Base prompt template inspired by gemini.md
 PROMPT_TEMPLATE = """
@@ -45,55 +55,327 @@ REFINEMENT_PROMPT = """
 請提供最終的分析版本：
 """
 
-def generate_draft(client, word):
-    system_prompt = "You are a vocabulary expert for Taiwanese college entrance exams."
+# Refinement prompt for --json: same review, answered as a schema-checked JSON object
+JSON_REFINEMENT_PROMPT = """
+以下是單字 "{word}" 的初步分析草稿，請你作為英語詞彙專家，仔細校正並改善這個分析。確保資訊準確、中文翻譯正確、格式一致，不能無中生有的片語 然後去權威的線上字典（如 Merriam-Webster, Oxford Learner's Dictionaries, Longman）查證,如果字典裡完全沒有類似的用法，那要排除。
+
+原始草稿：
+{draft}
+{field_guide}
+請只回傳最終分析的 JSON 物件。
+"""
+
+DRAFT_BACKEND = "openai:o1-mini"  # Use cheaper model for initial drafts
+REFINE_BACKEND = "openai:gpt-4.1"  # Use advanced model for refinement
+
+DRAFT_STAGE = "draft"
+REFINE_STAGE = "refine"
+
+DRAFT_SYSTEM_PROMPT = "You are a vocabulary expert for Taiwanese college entrance exams."
+REFINE_SYSTEM_PROMPT = "You are a senior vocabulary expert for Taiwanese college entrance exams. Your task is to carefully review and improve word analyses for accuracy and quality."
+
+# Rough completion sizes, used to reserve tokens in the TPM bucket before a call
+DRAFT_OUTPUT_ESTIMATE = 3000
+REFINE_OUTPUT_ESTIMATE = 4000
+
+def draft_call(word):
     user_prompt = PROMPT_TEMPLATE.format(word=word)
-    full_prompt = f"{system_prompt}\n\n{user_prompt}"
-    try:
-        response = client.chat.completions.create(
-            model="o1-mini",  # Use cheaper model for initial drafts
-            messages=[
-                {"role": "user", "content": full_prompt}
-            ]
-            # o1 models control output length internally, no max_tokens needed
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"Error generating draft for {word}: {e}")
-        return f"Error: {e}"
-
-def refine_analysis(client, word, draft):
-    prompt = REFINEMENT_PROMPT.format(word=word, draft=draft)
+    # o1 models reject system messages, so the system prompt is folded into the user turn.
+    # o1 models also control output length internally, no max_tokens needed
+    full_prompt = f"{DRAFT_SYSTEM_PROMPT}\n\n{user_prompt}"
+    return {"prompt": full_prompt, "system": None, "params": {}}
+
+def refine_call(word, draft, structured=False):
+    if structured:
+        prompt = JSON_REFINEMENT_PROMPT.format(word=word, draft=draft, field_guide=FIELD_GUIDE)
+    else:
+        prompt = REFINEMENT_PROMPT.format(word=word, draft=draft)
+    return {
+        "prompt": prompt,
+        "system": REFINE_SYSTEM_PROMPT,
+        "params": {
+            "max_tokens": 4000,  # More tokens for refined analysis
+            "temperature": 0.0  # Deterministic output
+        }
+    }
+
+async def generate_draft(backend, word):
+    call = draft_call(word)
+    return await backend.generate(call["prompt"], call["system"], DRAFT_OUTPUT_ESTIMATE, **call["params"])
+
+async def refine_analysis(backend, word, draft, structured=False):
+    """Refined analysis as Markdown text, or as a validated analysis dict when `structured`."""
+    call = refine_call(word, draft, structured)
+    if structured:
+        return await request_analysis(backend, word, call["prompt"], call["system"], REFINE_OUTPUT_ESTIMATE,
+                                      **call["params"])
+    return await backend.generate(call["prompt"], call["system"], REFINE_OUTPUT_ESTIMATE, **call["params"])
+
+class Workspace:
+    """Output folders plus the job manifest that tracks what is already done."""
+
+    def __init__(self, draft_dir, output_dir, manifest, resume=False, metrics=None):
+        self.draft_dir = draft_dir
+        self.output_dir = output_dir
+        self.manifest = manifest
+        self.resume = resume
+        self.metrics = metrics if metrics is not None else MetricsRecorder()
+
+    def draft_path(self, word):
+        return os.path.join(self.draft_dir, f"{word}.md")
+
+    def analysis_path(self, word):
+        return os.path.join(self.output_dir, f"{word}.md")
+
+    def has_draft(self, word):
+        return self.manifest.is_done(word, DRAFT_STAGE, self.draft_path(word))
+
+    def needs_draft(self, word):
+        return not (self.resume and self.has_draft(word))
+
+    def needs_refine(self, word):
+        return not (self.resume and self.manifest.is_done(word, REFINE_STAGE, self.analysis_path(word)))
+
+    def save_draft(self, word, draft):
+        with open(self.draft_path(word), 'w', encoding='utf-8') as f:
+            f.write(draft)
+        self.manifest.done(word, DRAFT_STAGE, draft)
+        self.metrics.item_done(DRAFT_STAGE)
+
+    def read_draft(self, word):
+        with open(self.draft_path(word), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def save_analysis(self, word, analysis):
+        """`analysis` is Markdown text, or a structured analysis dict that also gets a <word>.json sidecar."""
+        if isinstance(analysis, dict):
+            with open(os.path.join(self.output_dir, f"{word}.json"), 'w', encoding='utf-8') as f:
+                json.dump(analysis, f, ensure_ascii=False, indent=1)
+            analysis = format_analysis_markdown(word, analysis, heading=False)
+        with open(self.analysis_path(word), 'w', encoding='utf-8') as f:
+            f.write(f"# {word} 的深度解析\n\n")
+            f.write(analysis)
+        self.manifest.done(word, REFINE_STAGE, analysis)
+        self.metrics.item_done(REFINE_STAGE)
+
+    def fail(self, word, stage, error):
+        # Failures go to the manifest only; nothing is written to the output folders
+        print(f"Error in {stage} stage for {word}: {error}")
+        self.manifest.failed(word, stage, error)
+
+async def run_stages(words, workspace, draft_backend, refine_backend, structured=False):
+    """
+    Draft every word, then refine every draft. How many requests are in
+    flight is set by each backend's concurrency; pacing comes from its
+    RPM/TPM token buckets.
+    """
+    async def draft_one(word, total):
+        try:
+            draft = await generate_draft(draft_backend, word)
+        except Exception as e:
+            workspace.fail(word, DRAFT_STAGE, e)
+            return
+        workspace.save_draft(word, draft)
+        print(f"Draft done: {word} [{workspace.metrics.progress(DRAFT_STAGE, total)}]")
+
+    async def refine_one(word, total):
+        try:
+            refined_analysis = await refine_analysis(refine_backend, word, workspace.read_draft(word), structured)
+        except Exception as e:
+            workspace.fail(word, REFINE_STAGE, e)
+            return
+        workspace.save_analysis(word, refined_analysis)
+        print(f"Refined: {word} [{workspace.metrics.progress(REFINE_STAGE, total)}]")
+
+    print(f"=== Step 1: Generating drafts with {draft_backend.name} (concurrency {draft_backend.concurrency}) ===")
+    todo = [w for w in words if workspace.needs_draft(w)]
+    await asyncio.gather(*(draft_one(w, len(todo)) for w in todo))
+    print("Draft generation complete.")
+
+    print(f"=== Step 2: Refining drafts with {refine_backend.name} (concurrency {refine_backend.concurrency}) ===")
+    todo = [w for w in words if workspace.needs_refine(w) and workspace.has_draft(w)]
+    await asyncio.gather(*(refine_one(w, len(todo)) for w in todo))
+
+async def run_pipeline(args, words, workspace, draft_backend, refine_backend):
+    """
+    Streamed draft -> refine: each word is refined as soon as its draft is
+    ready. Drafts travel to the refine workers through a bounded in-memory
+    queue (so a fast draft stage cannot run arbitrarily far ahead), and each
+    stage has its own worker pool sized for its model's quota.
+    """
+    todo = [w for w in words if workspace.needs_refine(w)]
+    pending = asyncio.Queue()
+    for word in todo:
+        pending.put_nowait(word)
+    drafts = asyncio.Queue(maxsize=args.queue_size)
+
+    async def draft_worker():
+        while True:
+            try:
+                word = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if not workspace.needs_draft(word):
+                # Resumed run: the draft survived a previous crash
+                await drafts.put((word, workspace.read_draft(word)))
+                continue
+            try:
+                draft = await generate_draft(draft_backend, word)
+                # Keep the draft on disk for inspection, but hand it over in memory
+                workspace.save_draft(word, draft)
+            except Exception as e:
+                workspace.fail(word, DRAFT_STAGE, e)
+                continue
+            await drafts.put((word, draft))
+
+    async def refine_worker():
+        while True:
+            item = await drafts.get()
+            if item is None:
+                return
+            word, draft = item
+            # A failed save is recorded like a failed request: a refiner that died
+            # here would leave the draft workers blocked on a full queue
+            try:
+                refined_analysis = await refine_analysis(refine_backend, word, draft, args.json)
+                workspace.save_analysis(word, refined_analysis)
+            except Exception as e:
+                workspace.fail(word, REFINE_STAGE, e)
+                continue
+            print(f"Finished: {word} [{workspace.metrics.progress(REFINE_STAGE, len(todo))}]")
+
+    print(f"=== Pipeline: {args.draft_workers} x {draft_backend.name} -> {args.refine_workers} x {refine_backend.name} ===")
+    refiners = [asyncio.create_task(refine_worker()) for _ in range(args.refine_workers)]
+    await asyncio.gather(*(draft_worker() for _ in range(args.draft_workers)))
+    for _ in refiners:
+        await drafts.put(None)
+    await asyncio.gather(*refiners)
+
+def run_batch(args, words, workspace, cache):
+    """
+    Both stages through the Batch API: submit every pending draft, wait, fan
+    the results out to word_drafts/, then do the same for refinements.
+    """
+    from openai import OpenAI
+
+    for spec in (args.draft_backend, args.refine_backend):
+        if not spec.startswith("openai:"):
+            raise SystemExit(f"--batch needs openai: backends, got '{spec}'")
+    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), base_url=args.base_url)
+
+    def fail(stage):
+        return lambda word, error: workspace.fail(word, stage, error)
+
+    print("=== Step 1: Draft batch ===")
+    drafter = BatchRunner(client, args.draft_backend.split(":", 1)[1], args.batch_dir,
+                          poll_interval=args.poll_interval, cache=cache, metrics=workspace.metrics)
+    calls = {w: draft_call(w) for w in words if workspace.needs_refine(w) and workspace.needs_draft(w)}
+    drafter.run_stage(DRAFT_STAGE, calls, workspace.save_draft, fail(DRAFT_STAGE))
+
+    print("=== Step 2: Refine batch ===")
+    refiner = BatchRunner(client, args.refine_backend.split(":", 1)[1], args.batch_dir,
+                          poll_interval=args.poll_interval, cache=cache, metrics=workspace.metrics)
+    calls = {w: refine_call(w, workspace.read_draft(w)) for w in words
+             if workspace.needs_refine(w) and workspace.has_draft(w)}
+    refiner.run_stage(REFINE_STAGE, calls, workspace.save_analysis, fail(REFINE_STAGE))
+
+async def run_stages_packed(args, words, workspace, draft_backend, refine_backend):
+    """Two-step mode with --pack: N words per draft request and N drafts per refine request."""
+    def fail(stage):
+        return lambda word, error: workspace.fail(word, stage, error)
+
+    def save_draft(word, analysis):
+        workspace.save_draft(word, format_analysis_markdown(word, analysis, heading=False))
+
+    print(f"=== Step 1: Generating packed drafts with {draft_backend.name} ===")
+    todo = [w for w in words if workspace.needs_refine(w) and workspace.needs_draft(w)]
+    await run_packed(draft_backend, todo, save_draft, fail(DRAFT_STAGE), max_pack=args.pack)
+
+    print(f"=== Step 2: Refining packed drafts with {refine_backend.name} ===")
+    todo = [w for w in words if workspace.needs_refine(w) and workspace.has_draft(w)]
+    drafts = {w: workspace.read_draft(w) for w in todo}
+    await run_packed(refine_backend, todo, workspace.save_analysis, fail(REFINE_STAGE), drafts=drafts,
+                     max_pack=args.pack)
+
+async def run(args, words, workspace, cache):
+    if args.pipeline:
+        draft_concurrency, refine_concurrency = args.draft_workers, args.refine_workers
+    elif args.use_async:
+        draft_concurrency = refine_concurrency = args.concurrency
+    else:
+        draft_concurrency = refine_concurrency = 1
+
+    # Quotas are per model, so each stage gets its own backend and token buckets
+    options = dict(cache=cache, rpm=args.rpm, tpm=args.tpm, base_url=args.base_url, latency=args.stub_latency,
+                   metrics=workspace.metrics)
+    draft_backend = create_backend(args.draft_backend, concurrency=draft_concurrency, stage=DRAFT_STAGE, **options)
+    refine_backend = create_backend(args.refine_backend, concurrency=refine_concurrency, stage=REFINE_STAGE,
+                                    **options)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1",  # Use advanced model for refinement
-            messages=[
-                {"role": "system", "content": "You are a senior vocabulary expert for Taiwanese college entrance exams. Your task is to carefully review and improve word analyses for accuracy and quality."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=4000,  # More tokens for refined analysis
-            temperature=0.0  # Deterministic output
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"Error refining analysis for {word}: {e}")
-        return f"Error: {e}"
+        if args.pipeline:
+            await run_pipeline(args, words, workspace, draft_backend, refine_backend)
+        elif args.pack:
+            await run_stages_packed(args, words, workspace, draft_backend, refine_backend)
+        else:
+            await run_stages(words, workspace, draft_backend, refine_backend, args.json)
+    finally:
+        for backend in (draft_backend, refine_backend):
+            print(backend.report())
+            await backend.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate and refine word analyses with LLM backends.")
+    parser.add_argument('--input', default='extracted.txt', help="word list, one word per line")
+    parser.add_argument('--draft-backend', default=DRAFT_BACKEND,
+                        help="provider:model for the draft stage (openai:..., gemini:..., stub:...)")
+    parser.add_argument('--refine-backend', default=REFINE_BACKEND, help="provider:model for the refine stage")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="send up to --concurrency requests at once instead of one at a time")
+    parser.add_argument('--concurrency', type=int, default=8, help="max requests in flight per stage (async mode)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="refine each word as soon as its draft is ready (implies async)")
+    parser.add_argument('--draft-workers', type=int, default=8, help="concurrent draft requests (pipeline mode)")
+    parser.add_argument('--refine-workers', type=int, default=4, help="concurrent refine requests (pipeline mode)")
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help="max drafts waiting for refinement before the draft stage pauses (pipeline mode)")
+    parser.add_argument('--manifest', default='openai_manifest.jsonl', help="job manifest recording per-word stage status")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip words the manifest records as done; retry failed or missing ones")
+    parser.add_argument('--pack', type=int, default=0,
+                        help="analyze up to N words per request with JSON output (shrunk to fit the model's limits)")
+    parser.add_argument('--json', action='store_true',
+                        help="refine into schema-validated JSON (saved as <word>.json next to the Markdown)")
+    parser.add_argument('--batch', action='store_true',
+                        help="submit both stages through the OpenAI Batch API instead of live requests")
+    parser.add_argument('--batch-dir', default='batches', help="where batch request files and batch state are kept")
+    parser.add_argument('--poll-interval', type=float, default=30, help="seconds between batch status checks")
+    add_backend_arguments(parser)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser, 'openai_metrics.jsonl')
+    args = parser.parse_args()
+    if args.pack and (args.pipeline or args.batch):
+        parser.error("--pack works with the two-step mode only, not with --pipeline or --batch")
+    if args.pipeline and args.batch:
+        parser.error("--pipeline streams drafts to live refine requests; --batch runs the stages as batches")
+    if args.json and args.batch:
+        parser.error("--json repairs invalid fields with follow-up requests, which --batch cannot do")
+    return args
 
 def main():
+    args = parse_args()
+
     # Read word list
-    if not os.path.exists('extracted.txt'):
-        print("extracted.txt not found!")
+    if not os.path.exists(args.input):
+        print(f"{args.input} not found!")
         return
 
-    # Check API key
-    if not os.getenv('OPENAI_API_KEY'):
+    # Check API key (not needed when answering purely from the cache)
+    uses_openai = any(spec.startswith("openai:") for spec in (args.draft_backend, args.refine_backend))
+    if uses_openai and not os.getenv('OPENAI_API_KEY') and not args.cache_only:
         print("Please set the OPENAI_API_KEY environment variable.")
         return
 
-    # Set up OpenAI client
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
-    with open('extracted.txt', 'r', encoding='utf-8') as f:
+    with open(args.input, 'r', encoding='utf-8') as f:
         words = [line.strip() for line in f if line.strip()]
 
     draft_dir = 'word_drafts'
@@ -103,46 +385,33 @@ def main():
 
     print(f"Found {len(words)} words to process.")
 
-    # Step 1: Generate drafts with o1-mini
-    print("=== Step 1: Generating drafts with o1-mini ===")
-    for i, word in enumerate(words):
-        print(f"Generating draft {i+1}/{len(words)}: {word}")
-        draft = generate_draft(client, word)
+    manifest = JobManifest(args.manifest)
+    cache = open_cache(args)
+    metrics = open_metrics(args)
+    workspace = Workspace(draft_dir, output_dir, manifest, resume=args.resume, metrics=metrics)
+    if args.resume:
+        remaining = sum(1 for w in words if workspace.needs_refine(w))
+        print(f"Resuming: {len(words) - remaining} words already complete, {remaining} to go.")
 
-        filename = f"{word}.md"
-        filepath = os.path.join(draft_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(draft)
-
-        # Rate limit: wait 1 second between requests
-        time.sleep(1)
-
-    print("Draft generation complete.")
-
-    # Step 2: Refine drafts with GPT-4.1
-    print("=== Step 2: Refining drafts with GPT-4.1 ===")
-    for i, word in enumerate(words):
-        print(f"Refining analysis {i+1}/{len(words)}: {word}")
-
-        draft_file = os.path.join(draft_dir, f"{word}.md")
-        if os.path.exists(draft_file):
-            with open(draft_file, 'r', encoding='utf-8') as f:
-                draft_content = f.read()
+    try:
+        if args.batch:
+            run_batch(args, words, workspace, cache)
         else:
-            draft_content = "Draft not found."
-
-        refined_analysis = refine_analysis(client, word, draft_content)
-
-        filename = f"{word}.md"
-        filepath = os.path.join(output_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"# {word} 的深度解析\n\n")
-            f.write(refined_analysis)
-
-        # Rate limit: wait 2 seconds for the more expensive model
-        time.sleep(2)
+            asyncio.run(run(args, words, workspace, cache))
+    finally:
+        manifest.close()
+        if cache is not None:
+            print(cache.report())
+            cache.close()
+        print(metrics.report())
+        metrics.close()
 
+    # Only words of this list still without a final analysis; a failed draft that was later refined does not count
+    unfinished = [w for w in words if not manifest.is_done(w, REFINE_STAGE)]
+    failed = manifest.summary(DRAFT_STAGE, unfinished)[FAILED] + manifest.summary(REFINE_STAGE, unfinished)[FAILED]
     print("Analysis refinement complete. Final analyses saved in word_analyses/.")
+    if failed:
+        print(f"{failed} stage failures recorded in {args.manifest}; rerun with --resume to retry them.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,240 @@
+import contextlib
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+
+# Per-call metrics for the analysis scripts and the WordNet build.
+#
+# Every LLM call (live, cached or batched) and every timed build step is one
+# event: stage, model, latency, prompt/completion tokens, retries, cache hit,
+# error and estimated cost. Events are appended to a JSONL or CSV file (by
+# extension) as they happen, tagged with a run id, so a crashed run still
+# leaves its numbers behind. At the end a summary with p50/p95/p99 latencies,
+# token totals, cost per model and items finished per minute is printed and
+# written next to the events as <metrics>.summary.json.
+
+# Estimated USD per million (prompt, completion) tokens; check the providers'
+# price pages before trusting the totals. Unknown models get no cost.
+PRICES = {
+    "openai:gpt-4.1": (2.00, 8.00),
+    "openai:gpt-4.1-mini": (0.40, 1.60),
+    "openai:gpt-4o": (2.50, 10.00),
+    "openai:gpt-4o-mini": (0.15, 0.60),
+    "openai:o1-mini": (1.10, 4.40),
+    "gemini:gemini-1.5-flash": (0.075, 0.30),
+    "gemini:gemini-1.5-pro": (1.25, 5.00),
+}
+BATCH_DISCOUNT = 0.5  # Batch API requests are billed at half price
+PERCENTILES = (50, 95, 99)
+THROUGHPUT_BUCKET = 60  # seconds per throughput sample
+ETA_WINDOW = 50  # recent items the rate for the ETA is taken over
+
+FIELDS = ["run", "time", "stage", "model", "item", "latency", "prompt_tokens", "completion_tokens",
+          "retries", "cache_hit", "error", "cost"]
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, batch=False):
+    """USD for one call, or None when the model's price is unknown."""
+    if not prompt_tokens and not completion_tokens or model is None or model.startswith("stub:"):
+        return 0.0
+    price = PRICES.get(model)
+    if price is None:
+        return None
+    cost = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def percentile(values, p):
+    """Linearly interpolated percentile of `values` (sorted), None when empty."""
+    if not values:
+        return None
+    rank = (len(values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def format_latency(seconds):
+    return f"{seconds * 1000:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+def format_duration(seconds):
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+class MetricsRecorder:
+    """Collects metric events for one run; `path` None keeps them in memory only."""
+
+    def __init__(self, path=None, run=None):
+        self.path = path
+        self.run = run or time.strftime("%Y%m%dT%H%M%S")
+        self.start = time.monotonic()
+        self.events = []
+        self.finished = defaultdict(list)  # stage -> seconds into the run each item finished
+        self._file = self._writer = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            self._file = open(path, 'a', encoding='utf-8', newline='')
+            if path.endswith('.csv'):
+                self._writer = csv.DictWriter(self._file, FIELDS)
+                if new_file:
+                    self._writer.writeheader()
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def record(self, stage, model, latency=None, prompt_tokens=0, completion_tokens=0, retries=0,
+               cache_hit=False, error=None, item=None, batch=False):
+        prompt_tokens, completion_tokens = prompt_tokens or 0, completion_tokens or 0
+        event = {
+            "run": self.run,
+            "time": round(self.elapsed(), 3),
+            "stage": stage,
+            "model": model,
+            "item": item,
+            "latency": None if latency is None else round(latency, 4),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "retries": retries,
+            "cache_hit": cache_hit,
+            "error": None if error is None else str(error)[:200],
+            "cost": 0.0 if cache_hit else estimate_cost(model, prompt_tokens, completion_tokens, batch),
+        }
+        self.events.append(event)
+        if self._writer is not None:
+            self._writer.writerow(event)
+            self._file.flush()
+        elif self._file is not None:
+            self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._file.flush()
+        return event
+
+    @contextlib.contextmanager
+    def timed(self, stage, model=None, item=None):
+        """Record the duration of the `with` block as one event (errors included)."""
+        start = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.record(stage, model, time.monotonic() - start, error=error, item=item)
+
+    def item_done(self, stage, total=None):
+        """Count one finished item of `stage`; returns a progress string when `total` is given."""
+        self.finished[stage].append(self.elapsed())
+        return self.progress(stage, total) if total else None
+
+    def progress(self, stage, total):
+        """'120/500 (24%), 31.5/min, ETA 12m' from the recent completion rate."""
+        times = self.finished[stage]
+        done = len(times)
+        text = f"{done}/{total} ({done / total:.0%})" if total else f"{done}"
+        if done > ETA_WINDOW:
+            count, span = ETA_WINDOW, times[-1] - times[-ETA_WINDOW - 1]
+        else:
+            count, span = done, times[-1] if times else 0.0
+        if span > 0:
+            rate = count / span
+            text += f", {rate * 60:.1f}/min"
+            if total and done < total:
+                text += f", ETA {format_duration((total - done) / rate)}"
+        return text
+
+    def summary(self):
+        groups = defaultdict(list)
+        for event in self.events:
+            groups[(event["stage"], event["model"])].append(event)
+        rows = []
+        for (stage, model), events in groups.items():
+            latencies = sorted(e["latency"] for e in events
+                               if e["latency"] is not None and not e["cache_hit"] and not e["error"])
+            costs = [e["cost"] for e in events]
+            rows.append({
+                "stage": stage,
+                "model": model,
+                "calls": len(events),
+                "errors": sum(1 for e in events if e["error"]),
+                "cache_hits": sum(1 for e in events if e["cache_hit"]),
+                "retries": sum(e["retries"] for e in events),
+                "prompt_tokens": sum(e["prompt_tokens"] for e in events),
+                "completion_tokens": sum(e["completion_tokens"] for e in events),
+                "cost": None if None in costs else round(sum(costs), 4),
+                "latency": {
+                    "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+                    **{f"p{p}": round(percentile(latencies, p), 4) if latencies else None for p in PERCENTILES},
+                    "max": latencies[-1] if latencies else None,
+                },
+            })
+        throughput = {}
+        for stage, times in self.finished.items():
+            buckets = defaultdict(int)
+            for t in times:
+                buckets[int(t // THROUGHPUT_BUCKET)] += 1
+            throughput[stage] = [[b * THROUGHPUT_BUCKET, buckets.get(b, 0)] for b in range(max(buckets) + 1)]
+        known = [row["cost"] for row in rows if row["cost"] is not None]
+        return {
+            "run": self.run,
+            "elapsed": round(self.elapsed(), 2),
+            "groups": rows,
+            "items": {stage: len(times) for stage, times in self.finished.items()},
+            "throughput_per_minute": throughput,
+            "total_cost": round(sum(known), 4),
+            "unpriced_models": sorted({row["model"] for row in rows if row["cost"] is None}),
+        }
+
+    def report(self):
+        s = self.summary()
+        lines = [f"Metrics for run {s['run']} ({format_duration(s['elapsed'])}):"]
+        for row in s["groups"]:
+            lat = row["latency"]
+            label = f"{row['stage']} {row['model']}" if row["model"] else row["stage"]
+            if row["calls"] == 1 and not row["model"]:
+                # A timed build step
+                lines.append(f"  {label}: {format_latency(lat['max'] or 0.0)}")
+                continue
+            timing = (" ".join(f"p{p} {format_latency(lat[f'p{p}'])}" for p in PERCENTILES)
+                      if lat["p50"] is not None else "no timed calls")
+            line = f"  {label}: {row['calls']} calls, {timing}, {row['errors']} errors"
+            if row["cache_hits"] or row["retries"] or row["prompt_tokens"] or row["completion_tokens"]:
+                cost = "cost n/a" if row["cost"] is None else f"${row['cost']:.4f}"
+                line += (f", {row['cache_hits']} cached, {row['retries']} retries, "
+                         f"{row['prompt_tokens']}+{row['completion_tokens']} tokens, {cost}")
+            lines.append(line)
+        for stage, count in s["items"].items():
+            rate = f", {count / s['elapsed'] * 60:.1f}/min" if s["elapsed"] >= 1 else ""
+            lines.append(f"  {stage}: {count} items{rate}")
+        lines.append(f"  Estimated cost: ${s['total_cost']:.4f}"
+                     + (f" (no price for {', '.join(s['unpriced_models'])})" if s["unpriced_models"] else ""))
+        return "\n".join(lines)
+
+    def close(self):
+        """Write the summary file (when recording to a file) and close the event log."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        with open(summary_path(self.path), 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+
+def summary_path(path):
+    return os.path.splitext(path)[0] + ".summary.json"
+
+
+def add_metrics_arguments(parser, default):
+    parser.add_argument('--metrics', default=default,
+                        help="append per-call metrics to this .jsonl or .csv file ('' to disable)")
+
+
+def open_metrics(args):
+    return MetricsRecorder(args.metrics or None)
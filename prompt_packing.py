@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+from analysis_schema import FIELD_GUIDE, packed_schema, parse_json_response, validate_analysis
+from rate_limiter import estimate_tokens
+from structured_output import repair_analysis
+
+# Multi-word prompt packing.
+#
+# Instead of one request per word with the whole instruction block repeated,
+# N words share one request and the model answers with a JSON object keyed by
+# word. Each word's analysis is validated on its own: words with a few bad
+# fields get a targeted repair prompt, words missing from the response are
+# queued again, and N shrinks when a whole response fails to parse (usually
+# a sign the output limit was hit).
+
+# (context window, max output tokens) per model; used to size packs
+MODEL_LIMITS = {
+    "gpt-4.1": (1047576, 32768),
+    "gpt-4.1-mini": (1047576, 32768),
+    "gpt-4o": (128000, 16384),
+    "gpt-4o-mini": (128000, 16384),
+    "o1-mini": (128000, 65536),
+    "gemini-1.5-flash": (1048576, 8192),
+    "gemini-1.5-pro": (2097152, 8192),
+    "gemini-2.0-flash": (1048576, 8192),
+}
+DEFAULT_LIMITS = (128000, 4096)
+
+# A full analysis as JSON is roughly this many tokens (mostly Chinese text)
+OUTPUT_TOKENS_PER_WORD = 900
+# Leave headroom: the model's estimate of its own length is not exact
+OUTPUT_SAFETY = 0.75
+
+PACKED_PROMPT_TEMPLATE = """
+你是一位專為大學學測考生設計的英文詞彙專家。請針對以下每一個英文單字，分別提供全面且深入的分析，包含多種詞義、字根衍生字、以及相關片語。
+{field_guide}
+請只回傳一個 JSON 物件，以單字本身為鍵 (key)，值為該單字的分析物件。必須涵蓋以下全部 {count} 個單字，不要多也不要少：
+{word_list}
+"""
+
+PACKED_REFINEMENT_TEMPLATE = """
+以下是 {count} 個單字的初步分析草稿，請你作為英語詞彙專家，逐一仔細校正並改善。確保資訊準確、中文翻譯正確、格式一致，不能無中生有的片語，如果權威的線上字典（如 Merriam-Webster, Oxford Learner's Dictionaries, Longman）裡完全沒有類似的用法，那要排除。
+{field_guide}
+請只回傳一個 JSON 物件，以單字本身為鍵 (key)，值為該單字校正後的分析物件。
+
+{drafts}
+"""
+
+
+def model_pack_limit(model, prompt_tokens_per_word=60, overhead_tokens=800):
+    """Largest pack the model's output and context limits allow."""
+    context, max_output = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+    by_output = int(max_output * OUTPUT_SAFETY) // OUTPUT_TOKENS_PER_WORD
+    by_context = (context - overhead_tokens) // (prompt_tokens_per_word + OUTPUT_TOKENS_PER_WORD)
+    return max(1, min(by_output, by_context))
+
+
+def build_packed_prompt(words, drafts=None):
+    if drafts is None:
+        return PACKED_PROMPT_TEMPLATE.format(field_guide=FIELD_GUIDE, count=len(words),
+                                             word_list="\n".join(f"- {w}" for w in words))
+    blocks = "\n\n".join(f'=== 單字 "{w}" 的草稿 ===\n{drafts[w]}' for w in words)
+    return PACKED_REFINEMENT_TEMPLATE.format(field_guide=FIELD_GUIDE, count=len(words), drafts=blocks)
+
+
+def split_packed_response(text, words):
+    """
+    Return (results, invalid, errors) for one packed response: valid analyses,
+    {word: (analysis, problems)} for analyses with bad fields that can be
+    repaired in place, and {word: error} for words that must be re-queued.
+    """
+    try:
+        data = parse_json_response(text)
+    except json.JSONDecodeError as e:
+        return {}, {}, {w: f"response is not valid JSON: {e}" for w in words}
+    if not isinstance(data, dict):
+        return {}, {}, {w: "response is not a JSON object" for w in words}
+
+    # Models sometimes change the key's case; match case-insensitively
+    by_lower = {str(k).strip().lower(): v for k, v in data.items()}
+    results, invalid, errors = {}, {}, {}
+    for word in words:
+        analysis = data.get(word, by_lower.get(word.lower()))
+        if not isinstance(analysis, dict):
+            errors[word] = "missing from packed response"
+            continue
+        problems = validate_analysis(analysis)
+        if problems:
+            invalid[word] = (analysis, problems)
+        else:
+            results[word] = analysis
+    return results, invalid, errors
+
+
+class PackSizer:
+    """Adaptive pack size: halve when a whole response fails, grow back on success."""
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self.size = self.limit
+
+    def success(self):
+        self.size = min(self.limit, self.size + 1)
+
+    def failure(self):
+        self.size = max(1, self.size // 2)
+
+
+async def run_packed(backend, words, on_result, on_error, drafts=None, max_pack=20,
+                     max_attempts=3, workers=None):
+    """
+    Analyze `words` N at a time with `backend`, calling on_result(word,
+    analysis) for each valid analysis and on_error(word, error) for words that
+    still fail after `max_attempts`.
+    """
+    prompt_per_word = 60 if drafts is None else 60 + max((estimate_tokens(d) for d in drafts.values()), default=0)
+    sizer = PackSizer(min(max_pack, model_pack_limit(backend.model, prompt_per_word)))
+    queue = list(words)
+    attempts = {w: 0 for w in words}
+    workers = workers or backend.concurrency
+    stats = {"requests": 0, "requeued": 0, "in_flight": 0}
+
+    async def process(pack, prompt):
+        try:
+            text = await backend.generate(prompt, output_estimate=OUTPUT_TOKENS_PER_WORD * len(pack),
+                                          json_schema=packed_schema(pack))
+        except Exception as e:
+            for word in pack:
+                on_error(word, e)
+            return
+        stats["requests"] += 1
+        results, invalid, errors = split_packed_response(text, pack)
+        if len(errors) == len(pack) and len(pack) > 1:
+            sizer.failure()
+        elif not errors:
+            sizer.success()
+        for word, analysis in results.items():
+            on_result(word, analysis)
+        for word, (analysis, problems) in invalid.items():
+            # Only the broken fields are asked for again, not the whole word
+            try:
+                on_result(word, await repair_analysis(backend, word, analysis, problems))
+            except Exception as e:
+                errors[word] = str(e)
+        for word, error in errors.items():
+            attempts[word] += 1
+            if attempts[word] >= max_attempts:
+                on_error(word, error)
+            else:
+                stats["requeued"] += 1
+                queue.append(word)
+
+    async def worker():
+        # Keep polling while other workers are in flight: they may re-queue words
+        while queue or stats["in_flight"]:
+            if not queue:
+                await asyncio.sleep(0.05)
+                continue
+            pack = queue[:sizer.size]
+            del queue[:len(pack)]
+            prompt = build_packed_prompt(pack, drafts)
+            # The slot is held until the pack's repairs are done and its failures
+            # re-queued, so idle workers keep polling instead of exiting early
+            stats["in_flight"] += 1
+            try:
+                await process(pack, prompt)
+            finally:
+                stats["in_flight"] -= 1
+
+    print(f"Packing up to {sizer.limit} words per request for {backend.name}")
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    print(f"Packed {len(words)} words into {stats['requests']} requests ({stats['requeued']} words re-queued)")
@@ -0,0 +1,149 @@
+import asyncio
+import random
+import time
+
+# Token-bucket rate limiting shared by the LLM analysis scripts.
+# Quotas are expressed the way the providers publish them: requests per
+# minute (RPM) and tokens per minute (TPM).
+
+
+def estimate_tokens(text):
+    """Rough token count: ~4 chars per token for English, ~1 per CJK character."""
+    return len(text.encode('utf-8')) // 3 + 1
+
+
+class TokenBucket:
+    """A bucket that refills continuously at `rate_per_minute` up to `capacity`."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill()
+        # A single request larger than the bucket would never fit; let it
+        # through once the bucket is full instead of deadlocking.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """RPM + TPM limiter for one model, with a shared pause for 429 responses."""
+
+    def __init__(self, rpm=None, tpm=None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=0):
+        async with self._lock:
+            while True:
+                delay = self.paused_until - time.monotonic()
+                if self.requests:
+                    delay = max(delay, self.requests.wait_time(1))
+                if self.tokens and tokens:
+                    delay = max(delay, self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens and tokens:
+                self.tokens.take(tokens)
+
+    def record_usage(self, estimated, actual):
+        """Correct the TPM bucket once the real usage of a call is known."""
+        if not self.tokens or actual is None:
+            return
+        if actual > estimated:
+            self.tokens.take(actual - estimated)
+        else:
+            self.tokens.give_back(estimated - actual)
+
+    def pause(self, seconds):
+        """Stop every caller of this limiter for `seconds` (used on 429)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def retry_after_seconds(error):
+    """Read Retry-After / retry-after-ms from an API error's HTTP response."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def error_status(error):
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        code = getattr(error, 'code', None)
+        status = code if isinstance(code, int) else None
+    return status
+
+
+def is_retryable(error):
+    status = error_status(error)
+    if status is None:
+        # Connection errors and timeouts have no status code.
+        return type(error).__name__ in ('APIConnectionError', 'APITimeoutError', 'TimeoutError')
+    return status == 429 or status == 408 or status >= 500
+
+
+async def call_with_retries(func, limiter, estimated_tokens, max_retries=5, base_delay=1.0, on_retry=None):
+    """
+    Await `func()` under `limiter`, retrying 429 / 5xx / connection errors.
+
+    On 429 the whole limiter is paused for the server's Retry-After (or an
+    exponential backoff when the header is missing), so every in-flight worker
+    for that model backs off together instead of hammering the quota.
+    """
+    attempt = 0
+    while True:
+        await limiter.acquire(estimated_tokens)
+        try:
+            return await func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = retry_after_seconds(e)
+            if delay is None:
+                delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+            if on_retry is not None:
+                on_retry(e, delay)
+            if error_status(e) == 429:
+                limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+            attempt += 1
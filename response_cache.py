@@ -0,0 +1,118 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# Content-addressed cache of LLM responses for the analysis scripts.
+#
+# The key is a hash of everything that determines the output: model name,
+# the fully rendered prompt/messages and the generation parameters. Editing
+# PROMPT_TEMPLATE therefore only misses for the words whose prompt changed,
+# and re-running with an unchanged prompt costs no API calls at all.
+
+DEFAULT_CACHE_PATH = ".llm_cache.sqlite"
+
+
+class CacheMiss(Exception):
+    """Raised in cache-only mode when a response is not cached."""
+
+
+def cache_key(model, prompt, params=None):
+    payload = json.dumps({"model": model, "prompt": prompt, "params": params or {}},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache bounded by total stored bytes."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=500 * 1024 * 1024, offline=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.db.commit()
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Return the cached text or None; raises CacheMiss in offline mode."""
+        row = self.db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            if self.offline:
+                raise CacheMiss(f"response {key[:12]} not cached (cache-only mode)")
+            return None
+        self.hits += 1
+        self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return row[0]
+
+    def put(self, key, value, model=None):
+        size = len(value.encode('utf-8'))
+        old = self.db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if old:
+            self.total_bytes -= old[0]
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses (key, model, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, model, value, size, time.time()))
+        self.total_bytes += size
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            rows = self.db.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= size
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0],
+            "bytes": self.total_bytes,
+        }
+
+    def report(self):
+        s = self.stats()
+        return (f"Cache: {s['hits']} hits / {s['misses']} misses ({s['hit_rate']:.0%}), "
+                f"{s['entries']} entries, {s['bytes'] / 1024 / 1024:.1f} MB, {s['evictions']} evicted")
+
+    def close(self):
+        self.db.close()
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="on-disk response cache (SQLite)")
+    parser.add_argument('--cache-max-mb', type=float, default=500, help="evict least recently used responses above this size")
+    parser.add_argument('--no-cache', action='store_true', help="always call the API and do not store responses")
+    parser.add_argument('--cache-only', action='store_true', help="offline: serve from cache, fail words that are not cached")
+
+
+def open_cache(args):
+    if args.no_cache:
+        return None
+    return ResponseCache(args.cache, max_bytes=int(args.cache_max_mb * 1024 * 1024), offline=args.cache_only)
@@ -0,0 +1,97 @@
+import json
+
+from analysis_schema import ANALYSIS_SCHEMA, FIELD_GUIDE, parse_json_response, validate_analysis
+
+# Schema-constrained analysis requests with targeted repair.
+#
+# A response is parsed and validated field by field. When some sections are
+# missing or malformed, only those sections are asked for again (a much
+# smaller request than the whole analysis) and patched into the result, so a
+# single bad field no longer throws away a paid call.
+
+REPAIR_PROMPT_TEMPLATE = """
+以下是英文單字 "{word}" 的分析 JSON，其中部分欄位不符合格式：
+{problems}
+
+目前的內容：
+{current}
+{field_guide}
+請只重新產生以下欄位：{sections}。
+回傳一個只包含這些欄位的 JSON 物件，不要包含其他欄位。
+"""
+
+# A repair of one section is much shorter than a full analysis
+REPAIR_OUTPUT_ESTIMATE = 400
+
+
+class InvalidAnalysis(Exception):
+    def __init__(self, word, problems):
+        self.word = word
+        self.problems = problems
+        super().__init__(f"invalid analysis for {word}: " +
+                         "; ".join(f"{path}: {msg}" for path, msg in problems[:5]))
+
+
+def parse_analysis(text):
+    """Return (analysis, problems). Unparseable output yields an empty analysis with every section flagged."""
+    try:
+        analysis = parse_json_response(text)
+    except json.JSONDecodeError:
+        analysis = {}
+    if not isinstance(analysis, dict):
+        analysis = {}
+    return analysis, validate_analysis(analysis)
+
+
+def problem_sections(problems):
+    """Top-level sections touched by a list of (field_path, problem) pairs."""
+    sections = []
+    for path, _ in problems:
+        section = path.split(".")[0].split("[")[0]
+        if section and section not in sections:
+            sections.append(section)
+    return sections
+
+
+def repair_schema(sections):
+    return {
+        "type": "object",
+        "properties": {s: ANALYSIS_SCHEMA["properties"][s] for s in sections},
+        "required": list(sections),
+        "additionalProperties": False,
+    }
+
+
+async def repair_analysis(backend, word, analysis, problems, max_repairs=2):
+    """Re-prompt for the invalid sections only; return the patched analysis or raise InvalidAnalysis."""
+    analysis = dict(analysis)
+    for _ in range(max_repairs):
+        sections = problem_sections(problems)
+        prompt = REPAIR_PROMPT_TEMPLATE.format(
+            word=word,
+            problems="\n".join(f"- {path}: {msg}" for path, msg in problems),
+            current=json.dumps({k: v for k, v in analysis.items() if k not in sections},
+                               ensure_ascii=False, indent=1),
+            field_guide=FIELD_GUIDE,
+            sections=", ".join(sections))
+        text = await backend.generate(prompt, output_estimate=REPAIR_OUTPUT_ESTIMATE * len(sections),
+                                      json_schema=repair_schema(sections))
+        try:
+            patch = parse_json_response(text)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(patch, dict):
+            analysis.update({k: patch[k] for k in sections if k in patch})
+        problems = validate_analysis(analysis)
+        if not problems:
+            return analysis
+    raise InvalidAnalysis(word, problems)
+
+
+async def request_analysis(backend, word, prompt, system=None, output_estimate=1500, max_repairs=2, **params):
+    """Ask `backend` for one schema-constrained analysis of `word`, repairing invalid fields."""
+    text = await backend.generate(prompt, system, output_estimate, json_schema=ANALYSIS_SCHEMA, **params)
+    analysis, problems = parse_analysis(text)
+    if not problems:
+        return analysis
+    return await repair_analysis(backend, word, analysis, problems, max_repairs)
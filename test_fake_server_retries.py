@@ -0,0 +1,54 @@
+import os
+import re
+import subprocess
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from fake_openai_server import FakeOpenAIHandler, FakeState
+
+# End-to-end check of the 429 handling: openai_word_analysis.py --async runs
+# against fake_openai_server.py with a quota well below what it asks for, so
+# requests are rejected with Retry-After and have to be retried after the
+# shared limiter pause. Every word must still end up with an analysis.
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+WORDS = [f"word{i}" for i in range(12)]
+
+
+@pytest.fixture
+def fake_server():
+    # 5 requests per 1-second window: 24 calls at concurrency 4 overrun it quickly
+    FakeOpenAIHandler.state = FakeState(latency=0.01, rpm=5, window=1.0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_async_run_retries_through_quota(fake_server, tmp_path):
+    (tmp_path / 'extracted.txt').write_text("\n".join(WORDS) + "\n", encoding='utf-8')
+    base_url = f"http://127.0.0.1:{fake_server.server_address[1]}/v1"
+    command = [sys.executable, os.path.join(ROOT_DIR, 'openai_word_analysis.py'), '--async',
+               '--concurrency', '4', '--base-url', base_url, '--no-cache', '--metrics', '']
+    result = subprocess.run(command, cwd=tmp_path, env=dict(os.environ, OPENAI_API_KEY='fake'),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+    for word in WORDS:
+        assert (tmp_path / 'word_drafts' / f"{word}.md").exists()
+        assert (tmp_path / 'word_analyses' / f"{word}.md").exists()
+    assert "stage failures" not in result.stdout
+
+    state = FakeOpenAIHandler.state
+    assert state.rejected > 0
+    assert state.served == 2 * len(WORDS)
+    # Both backend reports ("N retries, 0 errors"): every 429 was retried, none gave up
+    reports = re.findall(r"(\d+) retries, (\d+) errors", result.stdout)
+    assert len(reports) == 2
+    assert sum(int(retries) for retries, _ in reports) == state.rejected
+    assert all(errors == '0' for _, errors in reports)
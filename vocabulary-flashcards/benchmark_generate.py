@@ -0,0 +1,50 @@
+import argparse
+import os
+import time
+
+from generate_full_data import CACHE, INPUT_FILE, analyze_words
+
+# Compare serial, process-pool and warm-cache WordNet enrichment on the same word list.
+# Usage:
+#   python benchmark_generate.py                  # full extracted.txt, all cores
+#   python benchmark_generate.py --limit 500 --workers 4
+
+def timed(words, workers, chunksize, warm=False):
+    if not warm:
+        CACHE.entries.clear()
+    start = time.perf_counter()
+    results = analyze_words(words, workers, chunksize)
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel generate_full_data.")
+    parser.add_argument('--input', default=INPUT_FILE)
+    parser.add_argument('--limit', type=int, default=0, help="only use the first N words (0 = all)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunksize', type=int, default=50)
+    args = parser.parse_args()
+
+    with open(args.input, 'r') as f:
+        words = [line.strip() for line in f if line.strip()]
+    if args.limit:
+        words = words[:args.limit]
+
+    print(f"Serial run over {len(words)} words...")
+    serial_time, serial_results = timed(words, 1, args.chunksize)
+    print(f"Parallel run with {args.workers} workers (chunksize {args.chunksize})...")
+    parallel_time, parallel_results = timed(words, args.workers, args.chunksize)
+
+    print("Serial rerun with the lookup cache filled by the parallel run...")
+    cached_time, cached_results = timed(words, 1, args.chunksize, warm=True)
+
+    if not serial_results == parallel_results == cached_results:
+        print("WARNING: serial and parallel outputs differ!")
+
+    print(f"\n{'mode':<10}{'seconds':>10}{'words/s':>10}")
+    print(f"{'serial':<10}{serial_time:>10.2f}{len(words) / serial_time:>10.1f}")
+    print(f"{'parallel':<10}{parallel_time:>10.2f}{len(words) / parallel_time:>10.1f}")
+    print(f"{'cached':<10}{cached_time:>10.2f}{len(words) / cached_time:>10.1f}")
+    print(f"Speedup: {serial_time / parallel_time:.2f}x with {args.workers} workers")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from dataset import WORDS_FILE, load_json, read_word_list, write_json_atomic, write_json_list_atomic
+from export_shards import dump_compact
+from parse_pdf_words import INPUT_FILE as LIST_TEXT_FILE, PDF_FILE, iter_list_lines, iter_records, merge_record, \
+    read_pdf_lines, read_text_lines
+from wordnet_snapshot import MISSING
+
+# Offline benchmarks for the hot paths of the data pipeline, with a history.
+#
+#   python benchmark_pipeline.py                      # every case, 3 repeats
+#   python benchmark_pipeline.py --cases parse_text,serialize --repeat 5
+#
+# Nothing here touches the network: the WordNet case reads the WordNet
+# snapshot (wordnet_snapshot.py) when there is one, limited to the words it
+# covers unless the NLTK data is installed, and is skipped when there is
+# neither, so it never downloads WordNet; the LLM scripts run against their
+# stub backend with a fixed injected latency. Each run
+# appends one line per case to the history file; a case whose median is
+# more than --threshold slower than the best recent run on the same machine
+# and input is reported as a regression (exit status 1 with --strict).
+# benchmark_generate.py compares serial and parallel WordNet runs instead.
+
+HISTORY_FILE = 'benchmark_history.jsonl'
+WORD_LIST = '../extracted.txt'
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+REGRESSION_THRESHOLD = 0.2  # 20% slower than the best recent median
+HISTORY_WINDOW = 5          # recent comparable runs a case is compared with
+
+def wordnet_available():
+    try:
+        import nltk
+    except ImportError:
+        return False
+
+    for resource in ('corpora/wordnet', 'corpora/omw-1.4'):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            return False
+    return True
+
+def parse_lines(lines):
+    records, rejected = {}, []
+    for record in iter_records(iter_list_lines(lines), rejected):
+        if record["word"] and not record["word"].isdigit() and record["level"]:
+            merge_record(records, record)
+    return records
+
+def case_parse_text(args):
+    if not os.path.exists(LIST_TEXT_FILE):
+        return None
+    return {"items": None, "input": LIST_TEXT_FILE, "run": lambda: parse_lines(read_text_lines(LIST_TEXT_FILE))}
+
+def case_parse_pdf(args):
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return None
+    if not os.path.exists(PDF_FILE):
+        return None
+    return {"items": None, "input": PDF_FILE, "run": lambda: parse_lines(read_pdf_lines(PDF_FILE))}
+
+def case_process_word(args):
+    import generate_full_data as g
+
+    # Reads the WordNet snapshot when there is one, NLTK otherwise
+    has_nltk = wordnet_available()
+    if g.SNAPSHOT.version is None and not has_nltk:
+        return None
+    words = read_word_list(args.words)[:args.limit or None]
+    if not has_nltk:
+        # A word the snapshot lacks would make process_word load NLTK and download WordNet
+        words = [w for w in words if g.SNAPSHOT.get(f"analysis:{w}") is not MISSING]
+        if not words:
+            return None
+    g.use_wordnet_version()
+    if g.SNAPSHOT.version is None:
+        g.PHRASES.load()
+    source = "snapshot" if g.SNAPSHOT.version is not None else "nltk"
+    if not has_nltk:
+        source += " (covered words only)"
+
+    def run():
+        # Cold lookup cache every time: this measures WordNet work, not the memo
+        g.CACHE.entries.clear()
+        for word in words:
+            g.process_word(word)
+    return {"items": len(words), "input": f"{args.words}[:{len(words)}] via {source}", "run": run}
+
+def synthetic_items(words):
+    """Deterministic words.json-shaped items, for machines without a built data/words.json."""
+    meaning = {"part_of_speech": "noun", "definition": "a thing that is used as an example 例子",
+               "example": "This is an example sentence. (這是一個例句。)"}
+    return [{"word": word, "level": i % 6 + 1,
+             "analysis": {"most_common_meaning": dict(meaning), "less_common_meanings": [dict(meaning)] * 2,
+                          "word_family": [{"word": word + "s", "part_of_speech": "noun", "definition": "例子"}],
+                          "related_phrases": [{"phrase": f"{word} up", "definition": "片語",
+                                               "example": "Use it up."}]}}
+            for i, word in enumerate(words)]
+
+def case_serialize(args):
+    items = load_json(WORDS_FILE, None)
+    source = WORDS_FILE
+    if items is None:
+        items = synthetic_items(read_word_list(args.words))
+        source = f"synthetic({args.words})"
+    tmp_dir = tempfile.mkdtemp(prefix='bench_json_')
+
+    def run():
+        write_json_atomic(os.path.join(tmp_dir, 'words.json'), items)
+        write_json_list_atomic(os.path.join(tmp_dir, 'words_stream.json'), iter(items))
+        dump_compact(os.path.join(tmp_dir, 'words.min.json'), items)
+    return {"items": len(items), "input": source, "run": run, "cleanup": tmp_dir}
+
+def llm_case(script, extra_args):
+    def case(args):
+        words = read_word_list(args.words)[:args.llm_words]
+        tmp_dir = tempfile.mkdtemp(prefix='bench_llm_')
+        with open(os.path.join(tmp_dir, 'extracted.txt'), 'w', encoding='utf-8') as f:
+            f.write("\n".join(words) + "\n")
+        command = [sys.executable, os.path.join(ROOT_DIR, script), *extra_args,
+                   '--stub-latency', str(args.llm_latency), '--no-cache', '--metrics', '']
+
+        def run():
+            # A fresh manifest each time, so every repeat does the full job
+            for name in os.listdir(tmp_dir):
+                if name.endswith('_manifest.jsonl'):
+                    os.remove(os.path.join(tmp_dir, name))
+            subprocess.run(command, cwd=tmp_dir, check=True, stdout=subprocess.DEVNULL)
+        return {"items": len(words), "input": f"{len(words)} words @ {args.llm_latency}s stub latency",
+                "run": run, "cleanup": tmp_dir}
+    return case
+
+STUB_STAGES = ['--draft-backend', 'stub:draft', '--refine-backend', 'stub:refine']
+CASES = {
+    "parse_text": case_parse_text,
+    "parse_pdf": case_parse_pdf,
+    "process_word": case_process_word,
+    "serialize": case_serialize,
+    "llm_openai_async": llm_case('openai_word_analysis.py', STUB_STAGES + ['--async', '--concurrency', '8']),
+    "llm_openai_pipeline": llm_case('openai_word_analysis.py', STUB_STAGES + ['--pipeline']),
+    "llm_openai_packed": llm_case('openai_word_analysis.py', STUB_STAGES + ['--async', '--pack', '10']),
+    "llm_gemini": llm_case('Gemini_analyze_words.py', ['--backend', 'stub:gemini', '--concurrency', '8']),
+}
+
+def machine():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(spec, repeat):
+    output = spec["run"]()  # warm-up: imports, file cache
+    if spec["items"] is None and output is not None:
+        spec["items"] = len(output)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spec["run"]()
+        times.append(time.perf_counter() - start)
+    return times
+
+def read_history(path):
+    history = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    history.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return history
+
+def baseline(history, result, window=HISTORY_WINDOW):
+    """Best median of the last `window` runs of the same case, machine and input, or None."""
+    same = [h for h in history if h["case"] == result["case"] and h["machine"] == result["machine"]
+            and h["input"] == result["input"] and h["items"] == result["items"]]
+    return min((h["median"] for h in same[-window:]), default=None)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time the data pipeline offline and keep a history of the results.")
+    parser.add_argument('--cases', default=','.join(CASES), help=f"comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case (after one warm-up run)")
+    parser.add_argument('--words', default=WORD_LIST, help="word list for the WordNet, JSON and LLM cases")
+    parser.add_argument('--limit', type=int, default=0, help="only process the first N words with WordNet (0 = all)")
+    parser.add_argument('--llm-words', type=int, default=40, help="words sent through each LLM script")
+    parser.add_argument('--llm-latency', type=float, default=0.01, help="seconds each stub LLM call takes")
+    parser.add_argument('--history', default=HISTORY_FILE, help="JSONL file results are appended to ('' to skip)")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="fraction slower than the recent best that counts as a regression")
+    parser.add_argument('--strict', action='store_true', help="exit with status 1 when a case regressed")
+    args = parser.parse_args()
+    args.cases = [c.strip() for c in args.cases.split(',') if c.strip()]
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    return args
+
+def main():
+    args = parse_args()
+    history = read_history(args.history) if args.history else []
+    commit, host = git_commit(), machine()
+    results, regressions = [], []
+
+    print(f"{'case':<22}{'items':>8}{'median s':>11}{'min s':>9}{'items/s':>10}  vs best")
+    for name in args.cases:
+        spec = CASES[name](args)
+        if spec is None:
+            print(f"{name:<22}  skipped (input or optional dependency not available offline)")
+            continue
+        try:
+            times = measure(spec, args.repeat)
+        finally:
+            if spec.get("cleanup"):
+                shutil.rmtree(spec["cleanup"], ignore_errors=True)
+        median = statistics.median(times)
+        result = {"case": name, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "machine": host,
+                  "input": spec["input"], "items": spec["items"], "repeat": args.repeat,
+                  "median": round(median, 4), "min": round(min(times), 4),
+                  "times": [round(t, 4) for t in times]}
+        best = baseline(history, result)
+        change = ""
+        if best:
+            ratio = median / best - 1
+            change = f"{ratio:+.0%}"
+            if ratio > args.threshold:
+                change += "  REGRESSION"
+                regressions.append(name)
+        rate = f"{spec['items'] / median:>10.1f}" if spec["items"] and median else f"{'-':>10}"
+        print(f"{name:<22}{spec['items'] or '-':>8}{median:>11.3f}{min(times):>9.3f}{rate}  {change}")
+        results.append(result)
+
+    if args.history and results:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        print(f"Appended {len(results)} results to {args.history}")
+    if regressions:
+        print(f"Slower than the recent best by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        if args.strict:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
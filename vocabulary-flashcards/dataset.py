@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+
+from markdown_analysis import parse_markdown_analysis
+
+# Shared helpers for reading and writing data/words.json.
+#
+# words.json stays a plain list of {"word", "analysis", ...} items, written
+# minified (indent=None): the frontends load data/index.json and the shards,
+# and the scripts only parse it. Build bookkeeping lives next to it in words.meta.json: one
+# fingerprint per word, so an incremental build only recomputes words whose
+# inputs changed.
+
+WORDS_FILE = 'data/words.json'
+META_FILE = 'data/words.meta.json'
+
+# Where the LLM analyzers save analyses (<word>.json, or <word>.md from older runs), in order of precedence
+LLM_ANALYSIS_DIRS = ['../word_analyses', '../word_analysis_files']
+
+ANALYSIS_SECTIONS = ["most_common_meaning", "less_common_meanings", "word_family", "related_phrases"]
+
+def read_word_list(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def parse_levels(spec):
+    """'1-3' or '1,2,5' -> {1, 2, 3} / {1, 2, 5}."""
+    levels = set()
+    for part in spec.split(','):
+        low, _, high = part.partition('-')
+        levels.update(range(int(low), int(high or low) + 1))
+    return levels
+
+def load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def write_json_atomic(path, data, indent=2):
+    """
+    Write to a temp file and rename, so readers never see a half-written
+    file. indent=None writes minified JSON.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False, separators=(',', ':') if indent is None else None)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def write_json_list_atomic(path, items, indent=2):
+    """
+    Stream a list to `path` one item at a time (same layout as
+    write_json_atomic with the same indent), so `items` can be a generator.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i, item in enumerate(items):
+            if indent is None:
+                f.write((',' if i else '') + json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+                continue
+            pad = '\n' + ' ' * indent
+            text = json.dumps(item, indent=indent, ensure_ascii=False).replace('\n', pad)
+            f.write((pad if i == 0 else ',' + pad) + text)
+        f.write('\n]' if indent is not None and f.tell() > 1 else ']')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def fingerprint(*parts):
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode('utf-8')).hexdigest()[:16]
+
+def parse_llm_file(path, raw):
+    """The analysis in a <word>.json or <word>.md file's bytes, or None if it has none."""
+    if path.endswith('.md'):
+        return parse_markdown_analysis(raw.decode('utf-8', 'replace'))
+    try:
+        analysis = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(analysis, dict) or "most_common_meaning" not in analysis:
+        return None
+    return analysis
+
+def content_hash(raw):
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+def scan_llm_files(dirs=LLM_ANALYSIS_DIRS):
+    """{word: (path, mtime_ns, size)} for the file that wins each word: earlier dirs first, .json before .md."""
+    found = {}
+    for rank, directory in enumerate(dirs):
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            word, ext = os.path.splitext(entry.name)
+            if ext not in ('.json', '.md') or not entry.is_file():
+                continue
+            key = (rank, ext != '.json')
+            if word not in found or key < found[word][0]:
+                stat = entry.stat()
+                found[word] = (key, entry.path, stat.st_mtime_ns, stat.st_size)
+    return {word: value[1:] for word, value in found.items()}
+
+def load_llm_analysis(word, dirs=LLM_ANALYSIS_DIRS):
+    """
+    (analysis, content hash) from the first directory holding <word>.json or
+    <word>.md (JSON first), or (None, None).
+    """
+    for directory in dirs:
+        for ext in ('.json', '.md'):
+            path = os.path.join(directory, word + ext)
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+            except FileNotFoundError:
+                continue
+            analysis = parse_llm_file(path, raw)
+            if analysis is None:
+                print(f"Skipping LLM analysis {path}: no analysis found")
+                continue
+            return analysis, content_hash(raw)
+    return None, None
+
+def merge_analysis(wordnet, llm):
+    """
+    Combine a WordNet and an LLM analysis of the same word. Precedence, per section:
+      1. the LLM value, when present and non-empty;
+      2. otherwise the WordNet value.
+    So an LLM analysis with no phrases still shows WordNet's phrases, and a
+    word WordNet does not know keeps the LLM analysis alone.
+    """
+    if llm is None:
+        return wordnet
+    if wordnet is None:
+        return {section: llm.get(section, [] if section != "most_common_meaning" else None)
+                for section in ANALYSIS_SECTIONS}
+    return {section: llm.get(section) or wordnet.get(section) for section in ANALYSIS_SECTIONS}
+
+def analysis_source(wordnet, llm):
+    if wordnet is not None and llm is not None:
+        return "llm+wordnet"
+    if llm is not None:
+        return "llm"
+    return "wordnet" if wordnet is not None else None
+
+def llm_sections(wordnet, llm):
+    """
+    {section: WordNet value} for the sections merge_analysis(wordnet, llm)
+    takes from `llm`; stored as the word's "wordnet_sections" in words.meta.json.
+    """
+    if wordnet is None or llm is None:
+        return {}
+    return {section: wordnet.get(section) for section in ANALYSIS_SECTIONS if llm.get(section)}
+
+def wordnet_analysis(analysis, info):
+    """
+    The WordNet-only analysis behind a words.json `analysis`, given the word's
+    words.meta.json entry ({"source", "wordnet_sections"}), so a newer LLM
+    analysis can be merged over it instead of over the old LLM sections.
+    """
+    source = info.get("source")
+    if source == "llm":
+        return None
+    if source == "llm+wordnet" and analysis is not None:
+        return dict(analysis, **info.get("wordnet_sections", {}))
+    return analysis
@@ -0,0 +1,194 @@
+import argparse
+import json
+import urllib.parse
+from html.parser import HTMLParser
+
+# Pull the definition/example blocks out of Cambridge and Merriam-Webster
+# pages on the server, so the app receives a few KB of JSON per word instead
+# of the whole page. Mirrors what script.js used to keep client-side: the
+# first .di-body on Cambridge (without run-ons) and the dictionary-entry-N
+# blocks on Merriam-Webster (without their defined run-ons, .dro).
+#
+#   {"headword": "apple", "pos": ["noun"],
+#    "senses": [{"definition": "...", "translation": "...",
+#                "examples": [{"text": "...", "translation": "..."}]}]}
+#
+# Only the standard library is used (html.parser), so server.py keeps
+# running without extra packages.
+
+# Bump when the output changes, so cached extractions are redone
+EXTRACT_VERSION = 2
+MAX_SENSES = 12
+MAX_EXAMPLES = 3
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+             'source', 'track', 'wbr'}
+SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+
+class Node:
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs)
+        self.classes = set((self.attrs.get('class') or '').split())
+        self.children = []
+        self.parent = parent
+
+    def iter(self):
+        for child in self.children:
+            if isinstance(child, Node):
+                yield child
+                yield from child.iter()
+
+    def find_all(self, cls=None, tag=None):
+        return [n for n in self.iter() if (cls is None or cls in n.classes) and (tag is None or n.tag == tag)]
+
+    def find(self, cls=None, tag=None):
+        return next((n for n in self.iter() if (cls is None or cls in n.classes) and (tag is None or n.tag == tag)),
+                    None)
+
+    def inside(self, cls, stop=None):
+        node = self.parent
+        while node is not None and node is not stop:
+            if cls in node.classes:
+                return True
+            node = node.parent
+        return False
+
+    def text(self):
+        parts = []
+        def walk(node):
+            for child in node.children:
+                if isinstance(child, str):
+                    parts.append(child)
+                elif child.tag not in SKIP_TAGS:
+                    walk(child)
+        walk(self)
+        return ' '.join(''.join(parts).split())
+
+class TreeBuilder(HTMLParser):
+    """Forgiving DOM builder: unknown end tags are ignored and unclosed tags close with their parent."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node('#document', [])
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, attrs, self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1].children.append(Node(tag, attrs, self.stack[-1]))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+def parse_html(html):
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+def unique(values):
+    return list(dict.fromkeys(v for v in values if v))
+
+def extract_cambridge(root, base_url):
+    body = root.find('di-body') or root
+    blocks = body.find_all('entry-body__el') or [body]
+    entries = []
+    for block in blocks:
+        header = block.find('pos-header')
+        senses = []
+        for def_block in block.find_all('def-block'):
+            if def_block.inside('runon-body', block) or len(senses) >= MAX_SENSES:
+                continue
+            definition = def_block.find('def')
+            translation = next((t for t in def_block.find_all('trans') if not t.inside('examp', def_block)), None)
+            examples = []
+            for examp in def_block.find_all('examp')[:MAX_EXAMPLES]:
+                eg, trans = examp.find('eg'), examp.find('trans')
+                examples.append({"text": eg.text() if eg else examp.text(),
+                                 "translation": trans.text() if trans else None})
+            senses.append({
+                "definition": definition.text().rstrip(':').strip() if definition else None,
+                "translation": translation.text() if translation else None,
+                "examples": examples,
+            })
+        if not senses:
+            continue
+        headword = (header or block).find('headword')
+        entries.append({
+            "headword": headword.text() if headword else None,
+            "pos": unique(p.text() for p in (header or block).find_all('pos')),
+            "senses": senses,
+        })
+
+    # Idiom and phrasal verb links are the only ones the card keeps clickable
+    idioms = []
+    for a in body.find_all(tag='a'):
+        title = (a.attrs.get('title') or '').lower()
+        if a.inside('runon-body', body):
+            continue
+        if title.endswith(('idiom', 'phrasal verb')) or title.startswith('meaning of') or a.find('idiom'):
+            link = {"text": a.text(), "url": urllib.parse.urljoin(base_url, a.attrs.get('href') or '')}
+            if link["text"] and link not in idioms:
+                idioms.append(link)
+    return {"entries": entries, "idioms": idioms}
+
+def extract_mw(root, base_url):
+    entries = []
+    for block in root.iter():
+        if not block.attrs.get('id', '').startswith('dictionary-entry-'):
+            continue
+        senses = []
+        for dt in block.find_all('dt'):
+            if len(senses) >= MAX_SENSES:
+                break
+            if dt.inside('dro', block):
+                continue
+            definition = ' '.join(t.text().lstrip(': ').strip() for t in dt.find_all('dtText'))
+            if not definition:
+                continue
+            senses.append({
+                "definition": definition,
+                "translation": None,
+                "examples": [{"text": ex.text(), "translation": None}
+                             for ex in dt.find_all('ex-sent')[:MAX_EXAMPLES]],
+            })
+        if not senses:
+            continue
+        headword = block.find('hword')
+        pos = block.find_all('parts-of-speech') or block.find_all('fl')
+        entries.append({
+            "headword": headword.text() if headword else None,
+            "pos": unique(p.text() for p in pos),
+            "senses": senses,
+        })
+    return {"entries": entries, "idioms": []}
+
+EXTRACTORS = {'cambridge': extract_cambridge, 'mw': extract_mw}
+
+def extract(source, html, url):
+    """Compact {"entries", "idioms"} for one page; `url` resolves relative links."""
+    return EXTRACTORS[source](parse_html(html), url)
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the extracted JSON for a saved dictionary page.")
+    parser.add_argument('source', choices=sorted(EXTRACTORS))
+    parser.add_argument('html_file')
+    parser.add_argument('--url', default='', help="page URL, for resolving relative links")
+    args = parser.parse_args()
+    with open(args.html_file, 'r', encoding='utf-8', errors='replace') as f:
+        html = f.read()
+    print(json.dumps(extract(args.source, html, args.url), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import math
+import random
+import re
+from collections import defaultdict
+
+from dataset import WORDS_FILE, load_json
+from export_shards import dump_compact
+
+# Ranked quiz distractors for every word, precomputed at build time.
+#
+#   data/distractors.json  {"k": 8, "words": N, "distractors": [[3, 17, ...], ...]}
+#
+# Row i lists the best distractors for words.json item i (the same order as
+# the rows of data/index.json), as item positions. Candidates have the same
+# part of speech and are ranked by how close their gloss is to the word's
+# (TF-IDF cosine), with bonuses for the same or a neighbouring level and for
+# WordNet sister terms (words sharing a hypernym). Words that could also be
+# right answers are left out: the word's own family (agree/agreement),
+# WordNet synonyms and near-identical glosses.
+
+DISTRACTORS_FILE = 'data/distractors.json'
+TOP_K = 8
+MAX_SIMILARITY = 0.8    # glosses this close probably mean the same thing
+MAX_DOC_FREQ = 200      # tokens in more glosses than this say nothing about a word
+SAME_LEVEL_BONUS = 0.3
+NEAR_LEVEL_BONUS = 0.15
+SISTER_BONUS = 0.4
+
+STOPWORDS = set("""a an the of to in on at by for with from into as or and but not no is are be been being
+that this these those it its which who whom whose what when where how than then so such something someone
+somebody one ones any some your his her their our my you he she they we i very more most used use""".split())
+
+POS_NAMES = [('n', ('noun', '名詞')), ('v', ('verb', '動詞')), ('a', ('adj', '形容詞')), ('r', ('adv', '副詞'))]
+
+def normalize_pos(pos):
+    """'Noun', 'n.', '名詞 (noun)' -> 'n'; None when unknown."""
+    text = (pos or '').lower().strip()
+    for short, names in POS_NAMES:
+        if text.rstrip('.') == short or any(name in text for name in names):
+            return short
+    return None
+
+def gloss_tokens(item):
+    analysis = item.get('analysis') or {}
+    main = analysis.get('most_common_meaning') or {}
+    text = main.get('definition') or item.get('gloss') or ''
+    return [t.rstrip('s') if len(t) > 4 else t
+            for t in re.findall(r'[a-z]+', text.lower()) if t not in STOPWORDS and len(t) > 2]
+
+def word_pos(item):
+    main = (item.get('analysis') or {}).get('most_common_meaning') or {}
+    return normalize_pos(main.get('part_of_speech') or item.get('pos'))
+
+def same_family(a, b):
+    a, b = a.lower(), b.lower()
+    if len(a) >= 5 and len(b) >= 5:
+        return a[:5] == b[:5]
+    short, long = sorted((a, b), key=len)
+    return len(short) >= 3 and long.startswith(short)
+
+def tfidf_vectors(token_lists):
+    doc_freq = defaultdict(int)
+    for tokens in token_lists:
+        for token in set(tokens):
+            doc_freq[token] += 1
+    count = len(token_lists)
+    vectors = []
+    for tokens in token_lists:
+        weights = defaultdict(float)
+        for token in tokens:
+            if doc_freq[token] <= MAX_DOC_FREQ:
+                weights[token] += math.log(count / doc_freq[token])
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        vectors.append({t: w / norm for t, w in weights.items()})
+    return vectors
+
+def build(items, relations=None, k=TOP_K):
+    """
+    Ranked distractor positions for each of `items` (the words.json list).
+    `relations` optionally maps a word to {"sisters": [...], "synonyms": [...]} from WordNet.
+    """
+    relations = relations or {}
+    words = [item['word'] for item in items]
+    position = {word: i for i, word in enumerate(words)}
+    pos = [word_pos(item) for item in items]
+    levels = [item.get('level') for item in items]
+    vectors = tfidf_vectors([gloss_tokens(item) for item in items])
+    families = [{f.get('word', '').lower() for f in (item.get('analysis') or {}).get('word_family') or []}
+                for item in items]
+
+    postings = defaultdict(list)
+    for i, vector in enumerate(vectors):
+        for token, weight in vector.items():
+            postings[token].append((i, weight))
+    by_pos, by_level = defaultdict(list), defaultdict(list)
+    for i, p in enumerate(pos):
+        by_pos[p].append(i)
+        by_level[(p, levels[i])].append(i)
+
+    def allowed(i, j, synonyms):
+        return j != i and (pos[i] is None or pos[j] == pos[i]) and words[j].lower() not in synonyms \
+            and words[j].lower() not in families[i] and not same_family(words[i], words[j])
+
+    table = []
+    for i, word in enumerate(words):
+        related = relations.get(word) or {}
+        synonyms = {s.lower() for s in related.get('synonyms', [])}
+        similarity = defaultdict(float)
+        for token, weight in vectors[i].items():
+            for j, other in postings[token]:
+                similarity[j] += weight * other
+        for sister in related.get('sisters', []):
+            if sister in position:
+                similarity.setdefault(position[sister], 0.0)
+
+        sisters = {position[s] for s in related.get('sisters', []) if s in position}
+        scored = []
+        for j, sim in similarity.items():
+            if sim > MAX_SIMILARITY or not allowed(i, j, synonyms):
+                continue
+            score = sim + (SISTER_BONUS if j in sisters else 0.0)
+            if levels[i] and levels[j]:
+                gap = abs(levels[i] - levels[j])
+                score += SAME_LEVEL_BONUS if gap == 0 else NEAR_LEVEL_BONUS if gap == 1 else 0.0
+            scored.append((-score, j))
+        ranked = [j for _, j in sorted(scored)[:k]]
+
+        if len(ranked) < k:
+            # Too few related glosses: same POS words, same level first, in a stable per-word order
+            rng = random.Random(word)
+            group = by_pos[pos[i]] if pos[i] else list(range(len(words)))
+            for pool in (by_level[(pos[i], levels[i])] if pos[i] else [], group):
+                for _ in range(4 * k if pool else 0):
+                    if len(ranked) >= k:
+                        break
+                    j = pool[rng.randrange(len(pool))]
+                    if j not in ranked and allowed(i, j, synonyms):
+                        ranked.append(j)
+        table.append(ranked)
+    return table
+
+def write(items, relations=None, path=DISTRACTORS_FILE, k=TOP_K, compress=()):
+    table = build(items, relations, k)
+    size = dump_compact(path, {"k": k, "words": len(items), "distractors": table}, compress)
+    print(f"Wrote {path}: {k} distractors for {len(items)} words ({size / 1e3:.0f} KB)")
+    return table
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute quiz distractors from words.json (without WordNet; "
+                                                 "generate_full_data.py adds WordNet sister terms).")
+    parser.add_argument('--input', default=WORDS_FILE)
+    parser.add_argument('--output', default=DISTRACTORS_FILE)
+    parser.add_argument('-k', type=int, default=TOP_K, help="distractors kept per word")
+    parser.add_argument('--compress', action='append', choices=['gzip', 'br'], default=[])
+    args = parser.parse_args()
+    write(load_json(args.input, []), path=args.output, k=args.k, compress=args.compress)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import gzip
+import json
+import os
+import shutil
+
+from dataset import WORDS_FILE, load_json
+
+# Compact, sharded copy of words.json for the flashcard frontends.
+#
+#   data/index.json          every word with its level, POS and short gloss
+#   data/shards/<key>.json   full analyses, one shard per first letter (or level)
+#
+# The index is all a frontend needs for the first card and for quiz
+# distractors; a shard is fetched only when one of its words is shown.
+# Everything is minified, and --compress writes precompressed .gz (and .br
+# when the brotli package is installed) next to each file for servers that
+# can serve them.
+
+INDEX_FILE = 'data/index.json'
+SHARD_DIR = 'data/shards'
+INDEX_FIELDS = ["word", "level", "pos", "gloss", "shard"]
+
+def shard_key(item, by='letter'):
+    if by == 'level':
+        return f"level{item.get('level') or 0}"
+    first = item['word'][:1].lower()
+    return first if first.isalpha() and first.isascii() else '_'
+
+def index_row(item, shard):
+    main = (item.get('analysis') or {}).get('most_common_meaning') or {}
+    return [item['word'], item.get('level'), main.get('part_of_speech'), main.get('definition'), shard]
+
+def dump_compact(path, data, compress=()):
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    raw = text.encode('utf-8')
+    if 'gzip' in compress:
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(raw, 9))
+    if 'br' in compress:
+        try:
+            import brotli
+        except ImportError:
+            print("brotli is not installed, skipping .br files")
+        else:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(raw))
+    return len(raw)
+
+def export(items, index_path=INDEX_FILE, shard_dir=SHARD_DIR, by='letter', compress=()):
+    """Write the index and shards for `items` (the words.json list); returns total bytes written."""
+    shards, rows = {}, []
+    for item in items:
+        key = shard_key(item, by)
+        rows.append(index_row(item, key))
+        if item.get('analysis'):
+            shards.setdefault(key, {})[item['word']] = item['analysis']
+
+    # Shards are rewritten as a set; stale ones from an earlier layout are removed
+    if os.path.isdir(shard_dir):
+        shutil.rmtree(shard_dir)
+    os.makedirs(shard_dir)
+    total = 0
+    for key, analyses in shards.items():
+        total += dump_compact(os.path.join(shard_dir, f"{key}.json"), analyses, compress)
+
+    index = {
+        "fields": INDEX_FIELDS,
+        "shard_dir": os.path.relpath(shard_dir, os.path.dirname(index_path)).replace(os.sep, '/'),
+        "words": rows,
+    }
+    total += dump_compact(index_path, index, compress)
+    print(f"Wrote {index_path} ({len(rows)} words) and {len(shards)} shards by {by}: {total / 1e6:.1f} MB")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the compact index and analysis shards from words.json.")
+    parser.add_argument('--input', default=WORDS_FILE)
+    parser.add_argument('--index', default=INDEX_FILE)
+    parser.add_argument('--shard-dir', default=SHARD_DIR)
+    parser.add_argument('--by', choices=['letter', 'level'], default='letter')
+    parser.add_argument('--compress', action='append', choices=['gzip', 'br'], default=[],
+                        help="also write precompressed copies (repeatable)")
+    args = parser.parse_args()
+    export(load_json(args.input, []), args.index, args.shard_dir, args.by, args.compress)
+
+if __name__ == "__main__":
+    main()
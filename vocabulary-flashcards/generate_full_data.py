@@ -1,84 +1,160 @@
-import json
-import nltk
-from nltk.corpus import wordnet as wn
+import argparse
+import multiprocessing
+import os
 import re
+import sys
+import time
 
-# Ensure data is downloaded
-try:
-    wn.synsets('dog')
-except LookupError:
-    nltk.download('wordnet')
-    nltk.download('omw-1.4')
+from dataset import (LLM_ANALYSIS_DIRS, META_FILE, analysis_source, content_hash, fingerprint, load_json,
+                     llm_sections, load_llm_analysis, merge_analysis, parse_levels, read_word_list,
+                     scan_llm_files, write_json_atomic)
+import distractors
+from export_shards import export
+from lookup_cache import LOOKUP_CACHE_FILE, LookupCache
+from parse_pdf_words import RECORDS_FILE
+from phrase_index import PHRASE_INDEX_FILE, PhraseIndex
+import search_index
+from wordnet_snapshot import SNAPSHOT_FILE, WordNetSnapshot
+
+# pipeline_metrics is shared with the LLM scripts in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipeline_metrics import MetricsRecorder, add_metrics_arguments, open_metrics
 
 INPUT_FILE = '../extracted.txt'
 OUTPUT_FILE = 'data/words.json'
+METRICS_FILE = 'data/build_metrics.jsonl'
+# Bump when process_word's output changes, so incremental builds recompute every word
+# (and the WordNet snapshot, which stores the lookups below, is rebuilt)
+GENERATOR_VERSION = 2
+
+# Memo of WordNet lookups keyed by word / synset name. The same synsets (e.g.
+# the nouns shared by agree/agreement) come up again and again across the
+# vocabulary, and a saved cache makes a rerun skip WordNet almost entirely.
+# Lookups the cache does not have are read from the WordNet snapshot when
+# there is one; NLTK is only imported for lookups neither has.
+SNAPSHOT = WordNetSnapshot(SNAPSHOT_FILE, generator=GENERATOR_VERSION)
+CACHE = LookupCache(fallback=SNAPSHOT)
+PHRASES = PhraseIndex(PHRASE_INDEX_FILE)
+
+_wordnet = None
+
+def wordnet():
+    """NLTK's WordNet reader, imported (and downloaded if missing) on first use."""
+    global _wordnet
+    if _wordnet is None:
+        import nltk
+        from nltk.corpus import wordnet as wn
+
+        try:
+            wn.synsets('dog')
+        except LookupError:
+            nltk.download('wordnet')
+            nltk.download('omw-1.4')
+        if CACHE.version and wn.get_version() != CACHE.version:
+            print(f"Warning: building for WordNet {CACHE.version} (the snapshot's or the last build's), "
+                  f"but NLTK has {wn.get_version()}; run a full build to switch")
+        _wordnet = wn
+    return _wordnet
+
+def use_wordnet_version(known=None):
+    """
+    Tag the caches with the WordNet version and return it: the snapshot's,
+    else `known` (the last build's), else NLTK's. Only the last loads NLTK.
+    """
+    version = SNAPSHOT.version or known or wordnet().get_version()
+    CACHE.version = PHRASES.version = version
+    return version
+
+def word_synsets(word):
+    """Names of the synsets for `word`, most common first."""
+    return CACHE.get(f"word:{word}", lambda: [s.name() for s in wordnet().synsets(word)])
+
+def describe_synset(synset):
+    return {
+        "pos": synset.pos(),
+        "definition": synset.definition(),
+        "examples": synset.examples(),
+        "chinese": sorted(set(l.name() for l in synset.lemmas(lang='cmn'))),
+        # [lemma, derived lemma, derived synset] for every derivationally related form
+        "derivations": [[lemma.name(), form.name(), form.synset().name()]
+                        for lemma in synset.lemmas() for form in lemma.derivationally_related_forms()],
+    }
 
-def get_chinese_definition(synset):
-    lemmas = synset.lemmas(lang='cmn')
-    english_def = synset.definition()
-    if lemmas:
-        chinese_words = sorted(list(set(l.name() for l in lemmas)))
-        return f"{', '.join(chinese_words)} ({english_def})"
+def synset_info(name):
+    return CACHE.get(f"synset:{name}", lambda: describe_synset(wordnet().synset(name)))
+
+def get_chinese_definition(name):
+    info = synset_info(name)
+    english_def = info["definition"]
+    if info["chinese"]:
+        return f"{', '.join(info['chinese'])} ({english_def})"
     else:
         return english_def
 
-def get_word_family(synset):
+def get_word_family(name):
     family = []
     seen = set()
-    for lemma in synset.lemmas():
-        for form in lemma.derivationally_related_forms():
-            word_name = form.name()
-            if word_name not in seen and word_name.lower() != lemma.name().lower():
-                seen.add(word_name)
-                # Simple POS mapping
-                pos_map = {'n': 'Noun', 'v': 'Verb', 'a': 'Adj', 'r': 'Adv', 's': 'Adj'}
-                pos = pos_map.get(form.synset().pos(), 'Unknown')
-                
-                # Get Chinese meaning for the derived word if possible
-                derived_synset = form.synset()
-                chinese_def = get_chinese_definition(derived_synset).split('(')[0].strip() # Try to get just Chinese
-                if not chinese_def or chinese_def == derived_synset.definition():
-                     chinese_def = derived_synset.definition()
-
-                family.append({
-                    "word": word_name,
-                    "part_of_speech": pos,
-                    "definition": chinese_def
-                })
+    for lemma_name, word_name, derived_name in synset_info(name)["derivations"]:
+        if word_name not in seen and word_name.lower() != lemma_name.lower():
+            seen.add(word_name)
+            # Simple POS mapping
+            pos_map = {'n': 'Noun', 'v': 'Verb', 'a': 'Adj', 'r': 'Adv', 's': 'Adj'}
+            derived = synset_info(derived_name)
+            pos = pos_map.get(derived["pos"], 'Unknown')
+            
+            # Get Chinese meaning for the derived word if possible
+            chinese_def = get_chinese_definition(derived_name).split('(')[0].strip() # Try to get just Chinese
+            if not chinese_def or chinese_def == derived["definition"]:
+                 chinese_def = derived["definition"]
+
+            family.append({
+                "word": word_name,
+                "part_of_speech": pos,
+                "definition": chinese_def
+            })
     return family[:5]
 
-def get_related_phrases(word):
-    # Find synsets where the lemma contains the word but is not the word itself
-    # This is a heuristic for "phrases"
+def lookup_phrases(word):
+    if PHRASES.version is None:
+        # The phrase index file is tagged with the WordNet version it came from
+        use_wordnet_version(CACHE.version)
+    return PHRASES.lookup(word)
+
+def get_related_phrases(word, limit=5):
+    # WordNet has no "phrases containing X" lookup, so a precomputed index maps
+    # each token to the multi-word lemmas that contain it (make -> make_up).
+    # Phrases starting with the word come first, then shorter ones.
+    phrases = CACHE.get(f"phrases:{word.lower()}", lambda: lookup_phrases(word))
+    candidates = [p for p in phrases if p.lower() != word.lower()]
+    candidates.sort(key=lambda p: (p.split('_')[0] != word.lower(), p.count('_'), p))
+
     phrases = []
-    seen_phrases = set()
-    
-    # This might be slow if we search EVERYTHING. 
-    # Instead, let's try to guess common phrases or rely on WordNet's structure if possible.
-    # WordNet doesn't have a direct "phrases containing X" index.
-    # Workaround: Check if the word is part of multi-word lemmas in the same or related synsets? 
-    # Or just skip for now as "no API" limits us.
-    # Actually, we can check lemmas of the synsets we found.
-    
-    # Better approach for "Phrases":
-    # Look for lemmas in ALL synsets that contain the word + space or space + word
-    # This is too heavy.
-    # Let's restrict to: check lemmas of the word's synsets and their neighbors?
-    
-    # Alternative: Just use the collocations? NLTK has collocations but they are statistical, not defined.
-    
-    # Let's try a simple approach: 
-    # If the word is 'make', 'make_up' is a lemma in some synset.
-    # But 'make_up' synset won't be found by wn.synsets('make').
-    
-    # We will skip complex phrase extraction to avoid massive slowdowns/hallucinations 
-    # and stick to what we can reliably get: Word Family and Definitions.
-    # If the user strictly wants phrases, we might need a phrase list. 
-    # I will leave it empty but formatted correctly.
-    return []
+    for name in candidates[:limit]:
+        synsets = word_synsets(name)
+        if not synsets:
+            continue
+        info = synset_info(synsets[0])
+        phrases.append({
+            "phrase": name.replace('_', ' '),
+            "definition": get_chinese_definition(synsets[0]),
+            "example": info["examples"][0] if info["examples"] else ""
+        })
+    return phrases
+
+def get_relations(word):
+    """WordNet synonyms and sister terms (co-hyponyms of its main synset), for picking quiz distractors."""
+    def compute():
+        synsets = [wordnet().synset(name) for name in word_synsets(word)]
+        if not synsets:
+            return {"synonyms": [], "sisters": []}
+        synonyms = {l.name() for s in synsets[:3] for l in s.lemmas()}
+        sisters = {l.name() for h in synsets[0].hypernyms() for s in h.hyponyms() if s != synsets[0]
+                   for l in s.lemmas() if '_' not in l.name()}
+        return {"synonyms": sorted(synonyms), "sisters": sorted(sisters - synonyms)[:50]}
+    return CACHE.get(f"relations:{word}", compute)
 
 def process_word(word):
-    synsets = wn.synsets(word)
+    synsets = word_synsets(word)
     if not synsets:
         return None
 
@@ -86,19 +162,21 @@ def process_word(word):
 
     # 1. Most Common Meaning
     primary = synsets[0]
+    info = synset_info(primary)
     most_common = {
-        "part_of_speech": pos_map.get(primary.pos(), 'Unknown'),
+        "part_of_speech": pos_map.get(info["pos"], 'Unknown'),
         "definition": get_chinese_definition(primary),
-        "example": primary.examples()[0] if primary.examples() else ""
+        "example": info["examples"][0] if info["examples"] else ""
     }
 
     # 2. Less Common Meanings
     less_common = []
     for s in synsets[1:4]:
+        info = synset_info(s)
         less_common.append({
-            "part_of_speech": pos_map.get(s.pos(), 'Unknown'),
+            "part_of_speech": pos_map.get(info["pos"], 'Unknown'),
             "definition": get_chinese_definition(s),
-            "example": s.examples()[0] if s.examples() else ""
+            "example": info["examples"][0] if info["examples"] else ""
         })
 
     # 3. Word Family
@@ -114,34 +192,230 @@ def process_word(word):
         "related_phrases": related_phrases
     }
 
-def main():
-    print("Reading words...")
-    with open(INPUT_FILE, 'r') as f:
-        words = [line.strip() for line in f if line.strip()]
+def init_worker(cache_path=None, snapshot_path=SNAPSHOT_FILE):
+    """Open the snapshot, or load the WordNet and OMW readers once per worker process instead of lazily per word."""
+    if SNAPSHOT.path != (snapshot_path or None):
+        SNAPSHOT.open(snapshot_path)
+    if SNAPSHOT.version is None:
+        wn = wordnet()
+        wn.ensure_loaded()
+        wn.synsets('dog')[0].lemmas(lang='cmn')
+    use_wordnet_version(CACHE.version)
+    # A forked worker inherits the parent's entries, but not its counters to report back
+    CACHE.drain()
+    if not len(CACHE):
+        # Spawned workers start without the parent's cache
+        CACHE.load(cache_path)
+
+def timed_word(word):
+    """(analysis, seconds) for one word."""
+    start = time.perf_counter()
+    analysis = process_word(word)
+    return analysis, time.perf_counter() - start
 
-    print(f"Processing {len(words)} words...")
-    
+def process_chunk(words):
+    """Pool task: timed analyses for a chunk of words plus the lookups this worker computed for them."""
+    analyses = [timed_word(word) for word in words]
+    return analyses, CACHE.drain()
+
+def analyze_words(words, workers=1, chunksize=50, cache_path=None, metrics=None, snapshot_path=SNAPSHOT_FILE):
+    """
+    Run process_word over `words` and return [{"word", "analysis"}] in input
+    order. With workers > 1 the words are split into chunks for a process
+    pool; imap keeps results in the original order, and every chunk sends
+    back its new lookups so the parent's cache (and the saved file) has them.
+    Each word's processing time goes to `metrics`.
+    """
+    metrics = metrics if metrics is not None else MetricsRecorder()
     results = []
-    for i, word in enumerate(words):
-        if i % 100 == 0:
-            print(f"Processed {i}/{len(words)}")
-        
-        analysis = process_word(word)
-        
-        if analysis:
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(cache_path, snapshot_path))
+        chunks = [words[i:i + chunksize] for i in range(0, len(words), chunksize)]
+
+        def merged():
+            for analyses, (entries, hits, misses) in pool.imap(process_chunk, chunks):
+                CACHE.merge(entries, hits, misses)
+                yield from analyses
+        analyses = merged()
+    else:
+        pool = None
+        analyses = map(timed_word, words)
+    try:
+        for i, (word, (analysis, seconds)) in enumerate(zip(words, analyses)):
+            metrics.record("wordnet", None, seconds, item=word)
+            progress = metrics.item_done("wordnet", len(words))
+            if i % 100 == 0:
+                print(f"Processed {progress}")
             results.append({
                 "word": word,
                 "analysis": analysis
             })
-        else:
-            results.append({
-                "word": word,
-                "analysis": None
-            })
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return results
+
+def llm_file_digests(words, dirs, meta):
+    """
+    {word: [path, mtime_ns, size, content hash]} for the LLM file of each word
+    that has one. A file whose path, mtime and size match the last build's is
+    not opened; others are hashed, but only parsed when the word is recomputed.
+    """
+    files = scan_llm_files(dirs)
+    digests = {}
+    for word in words:
+        if word not in files:
+            continue
+        path, mtime_ns, size = files[word]
+        known = meta.get(word, {}).get("llm_file")
+        if known and known[:3] == [path, mtime_ns, size]:
+            digests[word] = known
+            continue
+        with open(path, 'rb') as f:
+            digests[word] = [path, mtime_ns, size, content_hash(f.read())]
+    return digests
+
+def build(words, args, metrics=None, stored=None):
+    """
+    Build the words.json items for `words`, reusing unchanged items from the
+    previous build (`stored`, its words.meta.json) when args.incremental is
+    set. A word is recomputed when it is new or its fingerprint (WordNet
+    version, generator version, LLM file content) changed; words no longer
+    in the list are dropped. Extra keys on existing items are carried over
+    untouched. Returns (items, meta, changed).
+    """
+    previous = {item['word']: item for item in load_json(args.output, [])}
+    meta = (stored or {}).get("words", {}) if args.incremental else {}
+    base = fingerprint(CACHE.version, GENERATOR_VERSION)
+
+    llm_files = llm_file_digests(words, args.llm_dir, meta)
+    fingerprints = {word: fingerprint(base, word, llm_files[word][3] if word in llm_files else None)
+                    for word in words}
+
+    todo = [w for w in dict.fromkeys(words)
+            if not (w in previous and meta.get(w, {}).get("fingerprint") == fingerprints[w])]
+    removed = set(previous) - set(words)
+    print(f"{len(todo)} words to (re)compute, {len(set(words)) - len(todo)} unchanged, {len(removed)} removed")
+
+    fresh = {}
+    if todo:
+        CACHE.load(args.lookup_cache)
+        if SNAPSHOT.version is None:
+            # Load (or build) the phrase index before forking so workers share it
+            PHRASES.load()
+        llm = {}
+        for word in todo:
+            if word in llm_files:
+                analysis, _ = load_llm_analysis(word, args.llm_dir)
+                if analysis is not None:
+                    llm[word] = analysis
+        for item in analyze_words(todo, args.workers, args.chunksize, args.lookup_cache, metrics, args.snapshot):
+            word = item["word"]
+            fresh[word] = dict(previous.get(word, {}), word=word,
+                               analysis=merge_analysis(item["analysis"], llm.get(word)))
+            meta[word] = {"fingerprint": fingerprints[word],
+                          "source": analysis_source(item["analysis"], llm.get(word))}
+            # What the LLM replaced, so ingest_analyses.py can merge a newer analysis over WordNet alone
+            overridden = llm_sections(item["analysis"], llm.get(word))
+            if overridden:
+                meta[word]["wordnet_sections"] = overridden
+
+    results = [fresh.get(word) or previous[word] for word in words]
+    meta = {word: meta[word] for word in dict.fromkeys(words)}
+    for word, info in meta.items():
+        # Remember the file stats, so an unchanged file is not hashed again next time
+        info.pop("llm_file", None)
+        if word in llm_files:
+            info["llm_file"] = llm_files[word]
+    changed = bool(todo) or list(previous) != words
+    return results, meta, changed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build data/words.json from WordNet.")
+    parser.add_argument('--input', default=INPUT_FILE)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (1 = serial)")
+    parser.add_argument('--chunksize', type=int, default=50, help="words handed to a worker at a time")
+    parser.add_argument('--lookup-cache', default=LOOKUP_CACHE_FILE,
+                        help="file the WordNet lookup memo is loaded from and saved to ('' to disable)")
+    parser.add_argument('--lookup-cache-size', type=int, default=100000, help="max memoized lookups kept")
+    parser.add_argument('--meta', default=META_FILE, help="per-word fingerprints stored with the dataset")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only recompute words that were added or whose inputs changed since the last build")
+    parser.add_argument('--llm-dir', action='append',
+                        help="directory of LLM <word>.json analyses merged over WordNet (repeatable, first wins)")
+    parser.add_argument('--records', default=RECORDS_FILE,
+                        help="word records from parse_pdf_words.py, used for each word's level")
+    parser.add_argument('--levels', type=parse_levels,
+                        help="only build words of these levels, e.g. 1-3 (needs --records)")
+    parser.add_argument('--shard-by', choices=['letter', 'level'], default='letter',
+                        help="how the analyses are split into shards for the frontends")
+    parser.add_argument('--compress', action='append', choices=['gzip', 'br'], default=[],
+                        help="also write precompressed index/shard files (repeatable)")
+    parser.add_argument('--no-shards', action='store_true',
+                        help="only write words.json (no index, shards, distractors or search index)")
+    parser.add_argument('--snapshot', default=SNAPSHOT_FILE,
+                        help="WordNet snapshot from wordnet_snapshot.py, used instead of loading NLTK ('' to disable)")
+    add_metrics_arguments(parser, METRICS_FILE)
+    args = parser.parse_args()
+    if args.llm_dir is None:
+        args.llm_dir = LLM_ANALYSIS_DIRS
+    return args
+
+def main():
+    args = parse_args()
+    print("Reading words...")
+    words = read_word_list(args.input)
+    levels = {r["word"]: r["level"] for r in load_json(args.records, [])}
+    if args.levels:
+        words = [w for w in words if levels.get(w) in args.levels]
+        print(f"Keeping {len(words)} words of levels {sorted(args.levels)}")
+
+    print(f"Processing {len(words)} words with {args.workers} worker(s)...")
+    CACHE.max_entries = args.lookup_cache_size
+    metrics = open_metrics(args)
+    SNAPSHOT.open(args.snapshot)
+    # An incremental build takes the WordNet version from the snapshot or the
+    # last build, so NLTK is only loaded when a word has to be recomputed
+    stored = load_json(args.meta, {}) if args.incremental else {}
+    use_wordnet_version(stored.get("wordnet"))
+    with metrics.timed("build"):
+        results, meta, changed = build(words, args, metrics, stored)
+    if levels:
+        changed = changed or any(item.get("level") != levels.get(item["word"]) for item in results)
+        for item in results:
+            item["level"] = levels.get(item["word"])
+    exports = {"shard_by": args.shard_by, "compress": sorted(args.compress), "shards": not args.no_shards}
+    new_meta = {"generator": GENERATOR_VERSION, "wordnet": CACHE.version, "exports": exports, "words": meta}
+
+    if not changed and stored.get("exports") == exports:
+        print(f"{args.output} and its exports are up to date")
+        if new_meta != stored:
+            write_json_atomic(args.meta, new_meta)
+    else:
+        if not len(CACHE):
+            CACHE.load(args.lookup_cache)
+        # WordNet neighbours for the quiz distractors (memoized with the other lookups)
+        with metrics.timed("relations"):
+            relations = {} if args.no_shards else {item["word"]: get_relations(item["word"]) for item in results}
+        print(CACHE.report())
+        CACHE.save(args.lookup_cache)
 
-    print("Saving to JSON...")
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+        print("Saving to JSON...")
+        with metrics.timed("save"):
+            write_json_atomic(args.output, results, indent=None)
+            write_json_atomic(args.meta, new_meta)
+        if not args.no_shards:
+            with metrics.timed("export"):
+                export(results, by=args.shard_by, compress=args.compress)
+            with metrics.timed("distractors"):
+                distractors.write(results, relations, compress=args.compress)
+            with metrics.timed("search_index"):
+                search_index.write(results, compress=args.compress)
+    print(metrics.report())
+    metrics.close()
     print("Done!")
 
 if __name__ == "__main__":
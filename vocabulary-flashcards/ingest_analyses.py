@@ -0,0 +1,188 @@
+import argparse
+import concurrent.futures
+import os
+import time
+
+from dataset import (LLM_ANALYSIS_DIRS, META_FILE, WORDS_FILE, analysis_source, content_hash, llm_sections,
+                     load_json, merge_analysis, parse_llm_file, scan_llm_files, wordnet_analysis,
+                     write_json_atomic, write_json_list_atomic)
+import distractors
+from export_shards import export
+from lookup_cache import LOOKUP_CACHE_FILE, LookupCache
+from markdown_analysis import PARSER_VERSION
+import search_index
+from wordnet_snapshot import SNAPSHOT_FILE, WordNetSnapshot
+
+# Bulk-compile the LLM analyses (word_analyses/*.md|json, word_analysis_files/*)
+# into data/words.json without a WordNet rebuild.
+#
+# Each file's mtime, size and content hash are kept in data/ingest_state.json
+# together with its parsed analysis: a file whose mtime and size did not
+# change is not opened, one that was only touched is hashed but not parsed,
+# and only new or edited files are parsed (in a process pool when there are
+# many). The LLM analyses are then merged over the WordNet part of the
+# existing items (LLM wins per section, see dataset.merge_analysis and
+# dataset.wordnet_analysis), and words.json, the shards, the distractor
+# table and the search index are rewritten with the options of the last
+# generate_full_data.py build (words.meta.json "exports"). When no file and
+# not words.json changed since the last run, nothing is written at all.
+#
+# generate_full_data.py reads the same files (dataset.load_llm_analysis), so
+# a later full or incremental build keeps the ingested analyses.
+
+STATE_FILE = 'data/ingest_state.json'
+PARALLEL_THRESHOLD = 200  # fewer changed files than this are parsed in-process
+
+def parse_files(paths):
+    """Pool task: (path, hash, analysis) for each path."""
+    results = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        results.append((path, content_hash(raw), parse_llm_file(path, raw)))
+    return results
+
+def refresh(files, state, workers):
+    """Update `state["files"]` for the scanned `files`; returns (unchanged, rehashed, parsed, removed) counts."""
+    known = state["files"]
+    unchanged = rehashed = 0
+    to_parse = []
+    for word, (path, mtime_ns, size) in files.items():
+        record = known.get(path)
+        if record and record["mtime_ns"] == mtime_ns and record["size"] == size:
+            unchanged += 1
+            continue
+        if record:
+            with open(path, 'rb') as f:
+                digest = content_hash(f.read())
+            if digest == record["hash"]:
+                record["mtime_ns"] = mtime_ns
+                rehashed += 1
+                continue
+        to_parse.append(path)
+
+    if len(to_parse) >= PARALLEL_THRESHOLD and workers > 1:
+        chunks = [to_parse[i:i + 100] for i in range(0, len(to_parse), 100)]
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            parsed = [r for chunk in pool.map(parse_files, chunks) for r in chunk]
+    else:
+        parsed = parse_files(to_parse)
+
+    paths = {path: (mtime_ns, size) for path, mtime_ns, size in files.values()}
+    for path, digest, analysis in parsed:
+        mtime_ns, size = paths[path]
+        known[path] = {"mtime_ns": mtime_ns, "size": size, "hash": digest, "analysis": analysis}
+    # Forget files that were deleted or are now shadowed by a higher-precedence one
+    removed = set(known) - set(paths)
+    for path in removed:
+        del known[path]
+    return unchanged, rehashed, len(parsed), len(removed)
+
+def merged_items(items, llm, meta, counts):
+    """
+    Merge each word's LLM analysis over its WordNet-only analysis, so a
+    section the new analysis leaves empty falls back to WordNet rather than
+    to an older LLM text; the words' `meta` entries are updated to match.
+    """
+    for item in items:
+        word = item["word"]
+        analysis = llm.get(word)
+        if analysis is not None:
+            info = meta.setdefault(word, {})
+            base = wordnet_analysis(item.get("analysis"), info)
+            new = merge_analysis(base, analysis)
+            if new != item.get("analysis"):
+                item = dict(item, analysis=new)
+                counts["updated"] += 1
+            info["source"] = analysis_source(base, analysis)
+            info.pop("wordnet_sections", None)
+            overridden = llm_sections(base, analysis)
+            if overridden:
+                info["wordnet_sections"] = overridden
+        yield item
+
+def cached_relations(items, version):
+    """
+    The WordNet relations generate_full_data.py memoized for the distractors
+    (lookup cache, then snapshot). NLTK is never loaded: a word with none
+    cached gets its distractors from the glosses alone.
+    """
+    cache = LookupCache(version=version, fallback=WordNetSnapshot(SNAPSHOT_FILE))
+    cache.load(LOOKUP_CACHE_FILE)
+    relations = {}
+    for item in items:
+        related = cache.get(f"relations:{item['word']}", lambda: None)
+        if related is not None:
+            relations[item["word"]] = related
+    return relations
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Merge the LLM Markdown/JSON analyses into words.json.")
+    parser.add_argument('--words', default=WORDS_FILE)
+    parser.add_argument('--meta', default=META_FILE)
+    parser.add_argument('--llm-dir', action='append',
+                        help="analysis directory (repeatable, first wins; default: the LLM scripts' output dirs)")
+    parser.add_argument('--state', default=STATE_FILE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--force', action='store_true', help="parse every file again")
+    parser.add_argument('--search-index', default=search_index.SEARCH_INDEX_FILE,
+                        help="search index to rebuild from the new words.json ('' to skip)")
+    parser.add_argument('--no-shards', action='store_true',
+                        help="only write words.json and the search index (no index, shards or distractors)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    dirs = args.llm_dir or LLM_ANALYSIS_DIRS
+    start = time.time()
+
+    state = load_json(args.state, {})
+    if args.force or state.get("parser") != PARSER_VERSION or state.get("dirs") != dirs:
+        state = {"parser": PARSER_VERSION, "dirs": dirs, "files": {}}
+    files = scan_llm_files(dirs)
+    unchanged, rehashed, parsed, removed = refresh(files, state, args.workers)
+    print(f"{len(files)} analysis files: {parsed} parsed, {rehashed} touched but unchanged, "
+          f"{unchanged} skipped, {removed} gone")
+
+    llm, failed = {}, []
+    for word, (path, _, _) in files.items():
+        analysis = state["files"][path]["analysis"]
+        if analysis is None:
+            failed.append(path)
+        else:
+            llm[word] = analysis
+    if failed:
+        print(f"{len(failed)} files had no usable analysis, e.g. {', '.join(failed[:3])}")
+
+    try:
+        words_mtime = os.stat(args.words).st_mtime_ns
+    except FileNotFoundError:
+        raise SystemExit(f"{args.words} not found; build it first (generate_full_data.py or populate_words.py)")
+    if not parsed and not removed and words_mtime == state.get("words_mtime_ns"):
+        write_json_atomic(args.state, state, indent=None)
+        print(f"Nothing changed since the last ingest ({time.time() - start:.1f}s)")
+        return
+
+    items = load_json(args.words, [])
+    missing = len(set(llm) - {item["word"] for item in items})
+    meta = load_json(args.meta, {})
+    counts = {"updated": 0}
+    items = list(merged_items(items, llm, meta.setdefault("words", {}), counts))
+    write_json_list_atomic(args.words, items, indent=None)
+    write_json_atomic(args.meta, meta)
+    state["words_mtime_ns"] = os.stat(args.words).st_mtime_ns
+    write_json_atomic(args.state, state, indent=None)
+
+    exports = meta.get("exports", {})
+    compress = exports.get("compress", [])
+    if exports.get("shards", True) and not args.no_shards:
+        export(items, by=exports.get("shard_by", 'letter'), compress=compress)
+        distractors.write(items, cached_relations(items, meta.get("wordnet")), compress=compress)
+    if args.search_index:
+        search_index.write(items, args.search_index, compress=compress)
+
+    print(f"{counts['updated']} of {len(items)} words updated from {len(llm)} LLM analyses "
+          f"({missing} analysed words are not in {args.words}) in {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import os
+from collections import OrderedDict
+
+from wordnet_snapshot import MISSING
+
+# Bounded memo for WordNet lookups, shared by generate_full_data.py.
+#
+# Keys are strings ("synset:agree.v.01", "word:agree"), values are plain
+# JSON data, so the whole cache can be saved next to words.json and reused
+# by the next run. The file records the WordNet version it was built from
+# and is ignored if that changes. A `fallback` (the WordNet snapshot) is
+# asked before a miss is computed; its answers are not copied into the
+# cache, since the snapshot already keeps them on disk.
+
+LOOKUP_CACHE_FILE = 'data/wordnet_cache.json'
+
+class LookupCache:
+    def __init__(self, max_entries=100000, version=None, fallback=None):
+        self.max_entries = max_entries
+        self.version = version
+        self.fallback = fallback
+        self.entries = OrderedDict()
+        self.new = {}  # entries computed since the last drain(), for merging worker caches
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, compute):
+        """Return the cached value for `key`, calling compute() on a miss."""
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.fallback is not None:
+            value = self.fallback.get(key)
+            if value is not MISSING:
+                return value
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        self.new[key] = value
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def drain(self):
+        """Hand over (new entries, hits, misses) and reset them; used to report back from pool workers."""
+        new, hits, misses = self.new, self.hits, self.misses
+        self.new, self.hits, self.misses = {}, 0, 0
+        return new, hits, misses
+
+    def merge(self, entries, hits=0, misses=0):
+        for key, value in entries.items():
+            self.put(key, value)
+        self.hits += hits
+        self.misses += misses
+
+    def load(self, path):
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable lookup cache {path}: {e}")
+            return
+        if data.get("version") != self.version:
+            print(f"Lookup cache {path} was built from WordNet {data.get('version')}, rebuilding")
+            return
+        for key, value in data.get("entries", {}).items():
+            self.put(key, value)
+
+    def save(self, path):
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.version, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        snapshot = ""
+        if self.fallback is not None and self.fallback.hits:
+            snapshot = f", {self.fallback.hits} from the snapshot"
+        return (f"Lookup cache: {self.hits} hits / {self.misses} misses ({rate:.0f}%){snapshot}, "
+                f"{len(self.entries)} entries, {self.evictions} evicted")
@@ -0,0 +1,110 @@
+import re
+
+# Parse the Markdown word analyses written by the LLM scripts back into the
+# words.json "analysis" structure. Two layouts are understood:
+#
+#   format_as_markdown() / format_analysis_markdown():
+#       ## 1. 主要意思 (Most Common Meaning)
+#       - **詞性:** noun
+#       - **定義:** ...
+#       - **例句:** ...
+#         - (翻譯): ...            (older Gemini files)
+#
+#   the OpenAI template, as the model writes it:
+#       1. **主要意思 (Most Common Meaning):**
+#           * **詞性:** noun
+#       3. **相關衍生字 (Word Family):**
+#           * `agreement (n.): 協議`
+
+# Bump when the parser's output changes, so ingested files are parsed again
+PARSER_VERSION = 1
+
+SECTIONS = [
+    ("most_common_meaning", ("主要意思", "most common meaning")),
+    ("less_common_meanings", ("次要", "less common meaning")),
+    ("word_family", ("衍生字", "word family")),
+    ("related_phrases", ("慣用語", "片語/", "related phrase")),
+]
+FIELDS = {"詞性": "part_of_speech", "定義": "definition", "例句": "example", "片語": "phrase"}
+
+HEADING = re.compile(r'^\s*(?:#+\s*|\d+\.\s*|\*\*)')
+FIELD = re.compile(r'^\s*(?:(?:[-*+]|\d+\.)\s+)?\*\*(詞性|定義|例句|片語)\s*[:：]?\s*\*\*\s*[:：]?\s*(.*)$')
+TRANSLATION = re.compile(r'^\s*(?:[-*+]\s+)?\(?翻譯\)?\s*[:：]\s*(.*)$')
+BULLET = re.compile(r'^\s*[-*+]\s+(.*)$')
+FAMILY_ITEM = re.compile(r'^(?P<word>[^():：]+?)\s*[（(](?P<part_of_speech>[^)）]*)[)）]\s*[:：]\s*(?P<definition>.+)$')
+EMPTY = {"", "無", "无", "none", "n/a", "-"}
+
+def clean(text):
+    text = text.strip().strip('`').strip()
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    return "" if text.lower() in EMPTY else text
+
+def section_of(line):
+    if not HEADING.match(line) or FIELD.match(line):
+        return None
+    lowered = line.lower()
+    for name, keys in SECTIONS:
+        if any(key in lowered for key in keys):
+            return name
+    return None
+
+def parse_markdown_analysis(text):
+    """The analysis dict for one Markdown file, or None when it has no usable main meaning."""
+    analysis = {"most_common_meaning": {}, "less_common_meanings": [], "word_family": [], "related_phrases": []}
+    section, current, last_field = None, None, None
+
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        name = section_of(line)
+        if name:
+            section, current, last_field = name, None, None
+            if name == "most_common_meaning":
+                current = analysis[name]
+            continue
+        if section is None:
+            continue
+
+        field = FIELD.match(line)
+        if field and section != "word_family":
+            key, value = FIELDS[field.group(1)], clean(field.group(2))
+            if section in ("less_common_meanings", "related_phrases"):
+                first = "part_of_speech" if section == "less_common_meanings" else "phrase"
+                # A new item starts with its first field, or when a field repeats
+                if current is None or key == first or key in current:
+                    current = {}
+                    analysis[section].append(current)
+            if current is not None and value:
+                current[key] = value
+                last_field = key
+            continue
+
+        translation = TRANSLATION.match(line)
+        if translation and current is not None and last_field == "example":
+            value = clean(translation.group(1))
+            if value:
+                current["example"] = f"{current['example']} ({value})"
+            continue
+
+        bullet = BULLET.match(line)
+        if bullet and section == "word_family":
+            item = clean(bullet.group(1))
+            match = FAMILY_ITEM.match(item)
+            if match:
+                analysis["word_family"].append({key: clean(value) for key, value in match.groupdict().items()})
+            elif ':' in item or '：' in item:
+                word, _, definition = re.split(r'([:：])', item, maxsplit=1)
+                if clean(word) and clean(definition):
+                    analysis["word_family"].append({"word": clean(word), "part_of_speech": "",
+                                                    "definition": clean(definition)})
+
+    if not analysis["most_common_meaning"].get("definition"):
+        return None
+    for item in [analysis["most_common_meaning"], *analysis["less_common_meanings"]]:
+        for key in ("part_of_speech", "definition", "example"):
+            item.setdefault(key, "")
+    analysis["less_common_meanings"] = [m for m in analysis["less_common_meanings"] if m["definition"]]
+    analysis["related_phrases"] = [{"phrase": p["phrase"], "definition": p.get("definition", ""),
+                                    "example": p.get("example", "")}
+                                   for p in analysis["related_phrases"] if p.get("phrase")]
+    return analysis
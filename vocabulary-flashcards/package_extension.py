@@ -0,0 +1,66 @@
+import argparse
+import os
+import shutil
+import zipfile
+
+from distractors import DISTRACTORS_FILE
+from export_shards import INDEX_FILE, SHARD_DIR
+
+# Package the browser extension with only what popup.html loads.
+#
+#   python package_extension.py              # dist/vocabulary-flashcards.zip (for the store)
+#   python package_extension.py --dir dist/extension   # an unpacked copy for "Load unpacked"
+#
+# The popup reads data/index.json, the analysis shards and the distractor
+# table, so data/words.json, the build bookkeeping (meta, caches, metrics,
+# WordNet snapshot), the search index (served by server.py only) and the
+# precompressed .gz/.br copies stay out of the package.
+
+OUTPUT_FILE = 'dist/vocabulary-flashcards.zip'
+APP_FILES = ['manifest.json', 'popup.html', 'popup.js', 'style.css']
+IMAGE_DIR = 'images'
+
+def package_files():
+    """Paths (relative to this directory) that go into the extension, in a stable order."""
+    files = list(APP_FILES)
+    files += sorted(os.path.join(IMAGE_DIR, name) for name in os.listdir(IMAGE_DIR) if name.endswith('.png'))
+    for path in (INDEX_FILE, DISTRACTORS_FILE):
+        if os.path.exists(path):
+            files.append(path)
+    if os.path.isdir(SHARD_DIR):
+        files += sorted(os.path.join(SHARD_DIR, name) for name in os.listdir(SHARD_DIR) if name.endswith('.json'))
+    missing = [path for path in files if not os.path.exists(path)]
+    if missing:
+        raise SystemExit(f"Missing: {', '.join(missing)}")
+    if INDEX_FILE not in files:
+        raise SystemExit(f"No {INDEX_FILE}; run generate_full_data.py (or export_shards.py) first")
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description="Package the extension without words.json and the build files.")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="zip file to write")
+    parser.add_argument('--dir', help="write an unpacked copy to this directory instead of a zip")
+    args = parser.parse_args()
+
+    files = package_files()
+    size = sum(os.path.getsize(path) for path in files)
+    if args.dir:
+        shutil.rmtree(args.dir, ignore_errors=True)
+        for path in files:
+            target = os.path.join(args.dir, path)
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            shutil.copyfile(path, target)
+        print(f"Copied {len(files)} files ({size / 1e6:.1f} MB) to {args.dir}")
+        return
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    tmp_path = args.output + ".tmp"
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path in files:
+            archive.write(path, path)
+    os.replace(tmp_path, args.output)
+    print(f"Wrote {args.output}: {len(files)} files, {size / 1e6:.1f} MB unpacked, "
+          f"{os.path.getsize(args.output) / 1e6:.1f} MB zipped")
+
+if __name__ == "__main__":
+    main()
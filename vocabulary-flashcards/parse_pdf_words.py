@@ -1,84 +1,316 @@
+import argparse
+import collections
+import json
+import os
 import re
 
+# temp_words.txt is a text dump of the PDF; --pdf reads the PDF itself
 INPUT_FILE = 'temp_words.txt'
+PDF_FILE = '高中英文參考詞彙表(111學年度起適用).pdf'
 OUTPUT_FILE = 'extracted.txt'
+# One record per word: level, parts of speech and how it relates to its entry's headword
+RECORDS_FILE = 'word_records.json'
+# extracted.txt split by level: levels/level1.txt ... levels/level6.txt
+LEVELS_DIR = 'levels'
+# List lines that look like entries but could not be parsed
+REJECTS_FILE = 'rejected_lines.txt'
 
-def parse_word_token(token):
+LEVEL_NAMES = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6}
+
+# POS tags: n., v., adj., adv., prep., conj., pron., aux., art., num.
+# A parenthesized tag like the (n.) in "agree(ment) v./(n.)" belongs to the derived form.
+# (The PDF text occasionally drops a final dot, as in "calm v./adj./n".)
+POS_TAG = r'\(?(?:n|v|adj|adv|prep|conj|pron|aux|art|num)\.?\)?'
+POS_LIST = rf'{POS_TAG}(?:/{POS_TAG})*'
+ENTRY_LINE = re.compile(rf'^(?P<entry>.+?)\s+(?P<pos>{POS_LIST})(?:\s+(?P<level>[1-6]))?$')
+POS_ONLY = re.compile(rf'^{POS_LIST}(?:\s+[1-6])?$')
+POS_TAIL = re.compile(rf'\s{POS_LIST}/$')
+# An entry whose POS went to the next line (or was lost): "acknowledge(ment)", "he (him, his, himself)"
+BARE_ENTRY = re.compile(r"^[a-zA-Z][a-zA-Z0-9\-'’.()/]*(?: \([^)]*\))?$")
+# "依級別排序", "第一級", "依字母排序", "附錄"; pypdf puts page headers on one line ("依級別排序 第一級", "依字母排序 A"); the table of contents has dot leaders
+SECTION_HEADER = re.compile(r'^(?:依級別排序(?: 第(?P<level1>[一二三四五六])級)?|第(?P<level>[一二三四五六])級|'
+                            r'(?P<alpha>依字母排序)(?: [A-Z])?|(?P<appendix>附錄))$')
+# Page numbers, letter headings and running page titles inside the list
+NOISE = re.compile(r'^(?:\d+|[A-Z]|高中英文參考詞彙表)$')
+# A level that wrapped off an alphabetical entry ("accomplish(ment) v./(n.)" / "4")
+LEVEL_ONLY = re.compile(r'^[1-6]$')
+SUFFIX = re.compile(r'^([a-zA-Z0-9\-\'’.]+)\(([a-zA-Z0-9]+)\)$')
+FORMS = re.compile(r'^(\S+)\s+\(([^)]*)\)$')
+
+def parse_entry(entry, pos_list):
     """
-    Parses a single word token like 'agree(ment)' or 'bicycle' or 'ad'.
-    Returns a list of expanded words.
+    Expand an entry like 'agree(ment)', 'airplane/plane' or 'he (him, his,
+    himself)' into word records. The first word is the headword; the others
+    point back to it with a relation:
+      derived  agree(ment)      -> agreement (takes the parenthesized POS, if any);
+               argue(argument)  -> argument
+      plural   chopstick(s)     -> chopsticks
+      variant  airplane/plane   -> plane
+      form     he (him, ...)    -> him, his, ...
     """
-    words = []
-    
-    # Handle parenthesis expansion: agree(ment) -> agree, agreement
-    # Regex to find (suffix) at the end
-    match = re.search(r'([a-zA-Z0-9\-\'’]+)\(([a-zA-Z0-9]+)\)$', token)
-    if match:
-        base = match.group(1)
-        suffix = match.group(2)
-        words.append(base)
-        words.append(base + suffix)
-    else:
-        # Just a normal word (or one with internal parens we don't handle? usually suffixes are at end)
-        # Remove any other parens if they exist?
-        # The PDF says "argue (argument)". It seems they are space separated in description but in list?
-        # List: "agree(ment)" (no space).
-        # Let's assume clean token.
-        words.append(token.replace('(', '').replace(')', '')) 
-
-    return words
-
-def process_line(line):
-    # Regex to find the word part at the start of the line
-    # It stops before the Part of Speech (n., v., etc.)
-    # POS tags: n., v., adj., adv., prep., conj., pron., aux., art., num.
-    # Note: Sometimes there are multiple POS separated by / like n./v.
-    
-    # Pattern: Start of line, capture characters until we hit a space followed by a POS-like pattern
-    # POS pattern: (?:n|v|adj|adv|prep|conj|pron|aux|art|num)\.
-    
-    match = re.match(r'^\s*([a-zA-Z0-9\-\/\'’()]+)\s+(?:n|v|adj|adv|prep|conj|pron|aux|art|num)', line)
-    if match:
-        raw_token = match.group(1)
-        
-        # Split by slash first: advertise(ment)/ad -> advertise(ment), ad
-        tokens = raw_token.split('/')
-        
-        final_words = []
-        for t in tokens:
-            final_words.extend(parse_word_token(t))
-            
-        return final_words
-    return []
+    base_pos = [p for p in pos_list if not p.startswith('(')]
+    derived_pos = [p.strip('()') for p in pos_list if p.startswith('(')] or base_pos
 
-def main():
-    print(f"Reading {INPUT_FILE}...")
-    all_words = set()
-    
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
+    records = []
+    def add(word, pos, base=None, relation=None):
+        records.append({"word": word, "pos": list(pos), "base": base, "relation": relation})
+
+    forms = FORMS.match(entry)
+    if forms:
+        head = forms.group(1)
+        add(head, base_pos)
+        for form in forms.group(2).split(','):
+            if form.strip():
+                add(form.strip(), base_pos, head, "form")
+        return records
+
+    head = None
+    for token in entry.split('/'):
+        match = SUFFIX.match(token)
+        word = match.group(1) if match else token.replace('(', '').replace(')', '')
+        # "argue(argument)" spells out the derived word instead of giving a suffix
+        suffix = match.group(2) if match else ''
+        derived = suffix if len(suffix) > 4 and suffix[:3] == word[:3] else word + suffix
+        if head is None:
+            head = word
+            add(word, base_pos)
+        else:
+            add(word, base_pos, head, "variant")
+        if match:
+            add(derived, derived_pos, word, "plural" if suffix == 's' else "derived")
+    return records
+
+def is_unfinished(text):
+    """True for the first part of an entry that wraps onto the next line."""
+    if POS_ONLY.match(text):
+        return False
+    return text.endswith('/') or text.count('(') > text.count(')') or \
+        BARE_ENTRY.match(text) is not None
+
+def process_line(line, level):
+    """Records for one list line, or [] if it is not an entry. `level` comes from the section header."""
+    match = ENTRY_LINE.match(line)
+    if not match:
+        return []
+    if match.group('level'):
+        level = int(match.group('level'))
+    pos_list = [p.replace('.', '') for p in match.group('pos').split('/')]
+    records = parse_entry(match.group('entry').strip(), pos_list)
+    for record in records:
+        record["level"] = level
+        record["entry"] = line
+        # The alphabetical list gives each entry's level; the level lists only have page headers
+        record["explicit_level"] = match.group('level') is not None
+    return records
+
+def merge_record(records, record):
+    """
+    A word can appear in several entries: keep all POS and headword status,
+    and the lowest level, with levels stated on the entry beating header ones.
+    The entry kept is the headword entry that gave the level (preferring one
+    that states it), so the result does not depend on the order entries come in.
+    """
+    existing = records.get(record["word"])
+    if existing is None:
+        records[record["word"]] = record
+        return
+    leveled = False
+    if record["explicit_level"] and not existing["explicit_level"]:
+        existing["level"], existing["explicit_level"] = record["level"], True
+        leveled = True
+    elif record["explicit_level"] == existing["explicit_level"] and record["level"] and \
+            (not existing["level"] or record["level"] < existing["level"]):
+        existing["level"] = record["level"]
+        leveled = True
+    existing["pos"] += [p for p in record["pos"] if p not in existing["pos"]]
+    if record["relation"] is None and (existing["relation"] is not None or leveled or
+                                       record["explicit_level"] and record["level"] == existing["level"]):
+        existing["base"], existing["relation"], existing["entry"] = None, None, record["entry"]
+
+def read_text_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
         for line in f:
-            line = line.strip()
-            if not line:
+            yield line
+
+def read_pdf_lines(path):
+    """Text lines of the PDF, one page at a time (needs pypdf)."""
+    from pypdf import PdfReader
+
+    for page in PdfReader(path).pages:
+        yield from (page.extract_text() or '').splitlines()
+
+def iter_list_lines(lines):
+    """
+    Yield (line_number, section, level, line) for the word-list lines only.
+    Front matter before the first list header and the appendix after
+    "附錄" are skipped without any entry pattern being tried.
+    """
+    section, level = None, None
+    for number, line in enumerate(lines, 1):
+        line = ' '.join(line.split())
+        if not line:
+            continue
+        if line.startswith(('依級別排序', '依字母排序', '附錄', '第')):
+            header = SECTION_HEADER.match(line)
+            if header:
+                if header.group('appendix'):
+                    return
+                if header.group('alpha'):
+                    # Alphabetical entries carry their own level
+                    section, level = 'alpha', None
+                else:
+                    section = 'level'
+                    name = header.group('level1') or header.group('level')
+                    if name:
+                        level = LEVEL_NAMES[name]
                 continue
-                
-            extracted = process_line(line)
-            for w in extracted:
-                # Clean up
-                w = w.strip()
-                # Filter out empty or non-word junk
-                if w and not w.isdigit():
-                    all_words.add(w)
-
-    print(f"Extracted {len(all_words)} unique words.")
-    
+        if section is None:
+            continue
+        # iter_records drops the bare levels it cannot attach to an entry
+        if NOISE.match(line) and not (section == 'alpha' and LEVEL_ONLY.match(line)):
+            continue
+        yield number, section, level, line
+
+def iter_records(lines, rejected):
+    """
+    Stream word records from list lines, joining entries that wrap across
+    lines. Lines that look like entries but cannot be parsed are appended to
+    `rejected` as (line_number, reason, text).
+    """
+    pending, pending_number, pending_level = '', None, None
+    # Entries still waiting for their POS line. The text dump is laid out in
+    # columns, so that line can come several entries later ("she (her, hers,
+    # herself)", "someone/somebody", "pron.", ..., "pron./n."); POS lines go
+    # to the waiting entries in order. Levels that wrapped off alphabetical
+    # entries are moved around the same way and wait in `unleveled`.
+    waiting = collections.deque()
+    unleveled = collections.deque()
+    section = None
+
+    def give_up(text, number, level):
+        # An entry whose POS line never came (the level lists drop a few)
+        if POS_TAIL.search(text):
+            # "neither adj./adv./pron./" whose last POS was lost
+            return process_line(text.rstrip('/'), level)
+        extracted = process_line(f"{text} n.", level)
+        for record in extracted:
+            record["pos"], record["entry"] = [], text
+        if extracted:
+            rejected.append((number, "no part of speech (kept the words)", text))
+        else:
+            rejected.append((number, "unfinished entry", text))
+        return extracted
+
+    def entry(text, level):
+        extracted = process_line(text, level)
+        if extracted and section == 'alpha' and not extracted[0]["explicit_level"]:
+            unleveled.append((text, level))
+            return []
+        return extracted
+
+    for number, line_section, level, line in lines:
+        if line_section != section:
+            # POS lines do not cross into another section
+            if pending:
+                waiting.append((pending, pending_number, pending_level))
+                pending = ''
+            while waiting:
+                yield from give_up(*waiting.popleft())
+            while unleveled:
+                yield from process_line(*unleveled.popleft())
+            section = line_section
+
+        # Long entries wrap, e.g. "you (your, yours," / "yourself, yourselves)" / "pron. 1"
+        if pending:
+            head = ENTRY_LINE.match(line)
+            if POS_ONLY.match(line) and not waiting:
+                line = pending + ('' if pending.endswith('/') else ' ') + line
+            elif pending.endswith('/') and not POS_TAIL.search(pending):
+                # Split after a slash: "spokesman/" + "spokeswoman n."
+                line = pending + line
+            elif pending.count('(') > pending.count(')'):
+                line = f"{pending} {line}"
+            elif head and pending[-1].isalpha() and len(head.group('entry')) <= 2:
+                # Split inside a word: "sportsman/sportswoma" + "n n."
+                line = pending + line
+            else:
+                waiting.append((pending, pending_number, pending_level))
+            pending = ''
+
+        if LEVEL_ONLY.match(line):
+            if unleveled:
+                text, entry_level = unleveled.popleft()
+                yield from process_line(f"{text} {line}", entry_level)
+            # Otherwise a page number
+            continue
+        if POS_ONLY.match(line) and waiting:
+            text, _, wait_level = waiting.popleft()
+            yield from entry(text + ('' if text.endswith('/') else ' ') + line, wait_level)
+            continue
+        extracted = process_line(line, level)
+        if extracted:
+            yield from entry(line, level)
+        elif is_unfinished(line) and len(line) < 80:
+            pending, pending_number, pending_level = line, number, level
+        elif POS_ONLY.match(line):
+            rejected.append((number, "part of speech without an entry", line))
+        else:
+            rejected.append((number, "no part of speech", line))
+    if pending:
+        waiting.append((pending, pending_number, pending_level))
+    while waiting:
+        yield from give_up(*waiting.popleft())
+    while unleveled:
+        yield from process_line(*unleveled.popleft())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract the word list (with levels and POS) from the official list.")
+    parser.add_argument('--input', default=INPUT_FILE, help="text dump of the list (default) or, with --pdf, the PDF")
+    parser.add_argument('--pdf', nargs='?', const=PDF_FILE,
+                        help=f"read the PDF directly with pypdf (default {PDF_FILE})")
+    parser.add_argument('--rejects', default=REJECTS_FILE, help="report of list lines that could not be parsed")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    source = args.pdf or args.input
+    print(f"Reading {source}...")
+    lines = read_pdf_lines(args.pdf) if args.pdf else read_text_lines(args.input)
+
+    records = {}
+    rejected = []
+    for record in iter_records(iter_list_lines(lines), rejected):
+        # Filter out empty or non-word junk
+        if record["word"] and not record["word"].isdigit() and record["level"]:
+            merge_record(records, record)
+
+    print(f"Extracted {len(records)} unique words.")
+
     # Sort alphabetically
-    sorted_words = sorted(list(all_words), key=lambda s: s.lower())
-    
-    print(f"Writing to {OUTPUT_FILE}...")
+    sorted_records = sorted(records.values(), key=lambda r: r["word"].lower())
+    for r in sorted_records:
+        del r["explicit_level"]
+
+    print(f"Writing to {OUTPUT_FILE}, {RECORDS_FILE} and {LEVELS_DIR}/...")
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        for w in sorted_words:
-            f.write(w + '\n')
-            
+        for r in sorted_records:
+            f.write(r["word"] + '\n')
+    with open(RECORDS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(sorted_records, f, indent=1, ensure_ascii=False)
+
+    os.makedirs(LEVELS_DIR, exist_ok=True)
+    for n in range(1, 7):
+        words = [r["word"] for r in sorted_records if r["level"] == n]
+        with open(os.path.join(LEVELS_DIR, f"level{n}.txt"), 'w', encoding='utf-8') as f:
+            for w in words:
+                f.write(w + '\n')
+        print(f"  level {n}: {len(words)} words")
+
+    with open(args.rejects, 'w', encoding='utf-8') as f:
+        for number, reason, text in rejected:
+            f.write(f"{number}\t{reason}\t{text}\n")
+    print(f"{len(rejected)} list lines not parsed cleanly, see {args.rejects}")
+
     print("Done.")
 
 if __name__ == "__main__":
@@ -0,0 +1,62 @@
+import gzip
+import os
+from collections import defaultdict
+
+# Inverted index from a token to the multi-word WordNet lemmas containing it
+# (make -> make_do, make_up, ...), used by generate_full_data.get_related_phrases.
+#
+# It is built in one pass over wn.all_lemma_names() and saved as a gzipped
+# text file, one "token<TAB>phrase phrase ..." line per token. The file is
+# read on the first lookup, after which a lookup is a single dict probe.
+
+PHRASE_INDEX_FILE = 'data/phrase_index.tsv.gz'
+
+def build_index(lemma_names):
+    index = defaultdict(list)
+    for name in lemma_names:
+        if '_' not in name:
+            continue
+        for token in set(name.split('_')):
+            if token:
+                index[token].append(name)
+    return {token: sorted(phrases) for token, phrases in index.items()}
+
+class PhraseIndex:
+    def __init__(self, path=PHRASE_INDEX_FILE, version=None):
+        self.path = path
+        self.version = version
+        self.index = None
+
+    def load(self):
+        """Read the index file, or build and save it when missing or from another WordNet version."""
+        if self.index is not None:
+            return self.index
+        if os.path.exists(self.path):
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                header = f.readline().rstrip('\n')
+                if header == f"#wordnet {self.version}":
+                    self.index = {}
+                    for line in f:
+                        token, phrases = line.rstrip('\n').split('\t', 1)
+                        self.index[token] = phrases.split(' ')
+                    return self.index
+        self.rebuild()
+        return self.index
+
+    def rebuild(self):
+        from nltk.corpus import wordnet as wn
+
+        print("Building phrase index from WordNet lemma names...")
+        self.index = build_index(wn.all_lemma_names())
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(f"#wordnet {self.version}\n")
+            for token in sorted(self.index):
+                f.write(f"{token}\t{' '.join(self.index[token])}\n")
+        os.replace(tmp_path, self.path)
+        print(f"Phrase index: {len(self.index)} tokens saved to {self.path}")
+
+    def lookup(self, word):
+        """Multi-word lemmas (underscore-joined) that contain `word` as a token."""
+        return self.load().get(word.lower(), [])
@@ -1,47 +1,47 @@
-import json
 import os
-from PIL import Image, ImageDraw
+
+from dataset import WORDS_FILE, load_json, read_word_list, write_json_atomic
 
 # 1. Populate words.json
 extracted_file = '../extracted.txt'
-json_file = 'data/words.json'
-
-# Read existing JSON
-try:
-    with open(json_file, 'r') as f:
-        existing_data = json.load(f)
-except FileNotFoundError:
-    existing_data = []
+json_file = WORDS_FILE
 
+# Read existing JSON; items are kept exactly as they are (analysis and any other keys)
+existing_data = load_json(json_file, [])
 existing_words = {item['word'] for item in existing_data}
 
 # Read extracted.txt
 new_words = []
-with open(extracted_file, 'r') as f:
-    for line in f:
-        word = line.strip()
-        if word and word not in existing_words:
-            new_words.append({
-                "word": word,
-                "analysis": None # No detailed analysis for these yet
-            })
-
-# Combine and save
+for word in read_word_list(extracted_file):
+    if word not in existing_words:
+        existing_words.add(word)
+        new_words.append({
+            "word": word,
+            "analysis": None # No detailed analysis for these yet
+        })
+
+# Combine and save (only when something was added)
 all_data = existing_data + new_words
-with open(json_file, 'w') as f:
-    json.dump(all_data, f, indent=2)
+if new_words:
+    write_json_atomic(json_file, all_data, indent=None)
 
 print(f"Added {len(new_words)} new words. Total words: {len(all_data)}")
 
-# 2. Generate Icons
+# 2. Generate Icons (only the missing ones; existing icons are left alone)
 icon_sizes = [16, 48, 128]
 if not os.path.exists('images'):
     os.makedirs('images')
 
-for size in icon_sizes:
-    img = Image.new('RGB', (size, size), color = (99, 102, 241)) # Indigo color
-    d = ImageDraw.Draw(img)
-    d.text((size//4, size//4), "V", fill=(255, 255, 255))
-    img.save(f'images/icon{size}.png')
+missing = [size for size in icon_sizes if not os.path.exists(f'images/icon{size}.png')]
+if missing:
+    from PIL import Image, ImageDraw
+
+    for size in missing:
+        img = Image.new('RGB', (size, size), color = (99, 102, 241)) # Indigo color
+        d = ImageDraw.Draw(img)
+        d.text((size//4, size//4), "V", fill=(255, 255, 255))
+        img.save(f'images/icon{size}.png')
 
-print("Icons generated.")
+    print(f"Icons generated: {missing}")
+else:
+    print("Icons already present.")
@@ -28,10 +28,20 @@ document.addEventListener('DOMContentLoaded', () => {
   // Initialize
   loadMistakes();
 
+  // Analyses live in shards next to the compact index (see export_shards.py)
+  // and are fetched the first time one of their words is shown
+  let shardDir = null;
+  const shardRequests = {};
+
+  // Ranked quiz distractors per word (see distractors.py), rows in index order
+  let wordsById = [];
+  let distractorRequest = null;
+
   // Fetch words data
-  fetch('data/words.json')
-    .then(response => response.json())
+  loadWordIndex()
     .then(data => {
+      data.forEach((entry, i) => { entry.id = i; });
+      wordsById = data.slice();
       // Shuffle words for random order
       words = data.sort(() => Math.random() - 0.5);
       totalCountDisplay.textContent = words.length;
@@ -108,7 +118,77 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   });
 
-  function generateQuestion() {
+  function loadWordIndex() {
+    return fetch('data/index.json')
+      .then(response => {
+        if (!response.ok) throw new Error('No compact index');
+        return response.json();
+      })
+      .then(index => {
+        shardDir = `data/${index.shard_dir}`;
+        return index.words.map(row => {
+          const entry = {};
+          index.fields.forEach((field, i) => { entry[field] = row[i]; });
+          return entry;
+        });
+      });
+  }
+
+  // Resolves to the distractor table, or null when the build has none (or an outdated one)
+  function loadDistractors() {
+    if (!distractorRequest) {
+      distractorRequest = fetch('data/distractors.json')
+        .then(response => {
+          if (!response.ok) throw new Error('No distractor table');
+          return response.json();
+        })
+        .then(table => (table.words === wordsById.length ? table.distractors : null))
+        .catch(() => null);
+    }
+    return distractorRequest;
+  }
+
+  async function pickDistractors(targetWord, targetIndex) {
+    const table = await loadDistractors();
+    const ranked = table && table[targetWord.id];
+    if (ranked && ranked.length >= 3) {
+      // Three of the six best candidates, so repeated questions vary
+      return ranked.slice(0, 6).sort(() => Math.random() - 0.5).slice(0, 3).map(id => wordsById[id]);
+    }
+
+    const distractors = [];
+    let attempts = 0;
+    while (distractors.length < 3 && attempts < 50) {
+      const idx = Math.floor(Math.random() * words.length);
+      if (idx !== targetIndex && !distractors.includes(words[idx])) {
+        distractors.push(words[idx]);
+      }
+      attempts++;
+    }
+    return distractors;
+  }
+
+  // Resolves once entry.analysis is known (null if the word has none)
+  function loadAnalysis(entry) {
+    if (entry.analysis !== undefined) return Promise.resolve(entry);
+    if (!shardRequests[entry.shard]) {
+      shardRequests[entry.shard] = fetch(`${shardDir}/${entry.shard}.json`)
+        .then(response => {
+          if (!response.ok) throw new Error(`Shard ${entry.shard} not found`);
+          return response.json();
+        })
+        .catch(error => {
+          delete shardRequests[entry.shard]; // Allow a retry on the next card
+          throw error;
+        });
+    }
+    return shardRequests[entry.shard].then(shard => {
+      entry.analysis = shard[entry.word] || null;
+      return entry;
+    });
+  }
+
+  async function generateQuestion() {
     try {
       if (words.length < 4) return;
 
@@ -125,6 +205,7 @@ document.addEventListener('DOMContentLoaded', () => {
       // Pick target word
       const targetIndex = Math.floor(Math.random() * words.length);
       const targetWord = words[targetIndex];
+      await loadAnalysis(targetWord);
 
       // Select Meaning (Prioritize Less Common)
       let selectedMeaning = null;
@@ -150,15 +231,7 @@ document.addEventListener('DOMContentLoaded', () => {
       }
 
       // Pick 3 distractors
-      const distractors = [];
-      let attempts = 0;
-      while (distractors.length < 3 && attempts < 50) {
-        const idx = Math.floor(Math.random() * words.length);
-        if (idx !== targetIndex && !distractors.includes(words[idx])) {
-          distractors.push(words[idx]);
-        }
-        attempts++;
-      }
+      const distractors = await pickDistractors(targetWord, targetIndex);
 
       // Shuffle options
       const options = [targetWord, ...distractors].sort(() => Math.random() - 0.5);
@@ -206,6 +279,9 @@ document.addEventListener('DOMContentLoaded', () => {
           // For distractors, use their most common meaning (English only)
           if (opt.analysis && opt.analysis.most_common_meaning) {
             defText = extractEnglish(opt.analysis.most_common_meaning.definition);
+          } else if (opt.gloss) {
+            // Distractor shards may not be loaded yet; the index has the short gloss
+            defText = extractEnglish(opt.gloss);
           }
         }
 
@@ -340,8 +416,20 @@ document.addEventListener('DOMContentLoaded', () => {
     // Front
     wordDisplay.textContent = wordData.word;
 
-    // Back
-    renderAnalysis(wordData);
+    // Back (the analysis shard may still be loading)
+    analysisContent.innerHTML = '';
+    const analysisBody = document.createElement('div');
+    analysisBody.id = 'analysis-body';
+    analysisBody.innerHTML = '<p style="color:#666; font-style:italic;">Loading analysis...</p>';
+    analysisContent.appendChild(analysisBody);
+    loadAnalysis(wordData)
+      .then(() => {
+        if (words[currentIndex] === wordData) renderAnalysis(wordData);
+      })
+      .catch(error => {
+        console.error('Error loading analysis:', error);
+        analysisBody.innerHTML = '<p style="text-align:center; margin-top: 20px;">Could not load the analysis for this word.</p>';
+      });
 
     // Update External Link
     const cambridgeLink = document.getElementById('cambridge-link');
@@ -500,10 +588,11 @@ document.addEventListener('DOMContentLoaded', () => {
   }
 
   function renderAnalysis(data) {
-    analysisContent.innerHTML = '';
+    const analysisBody = document.getElementById('analysis-body');
+    analysisBody.innerHTML = '';
 
     if (!data.analysis) {
-      analysisContent.innerHTML = '<p style="text-align:center; margin-top: 20px;">No detailed analysis available for this word.</p>';
+      analysisBody.innerHTML = '<p style="text-align:center; margin-top: 20px;">No detailed analysis available for this word.</p>';
       return;
     }
 
@@ -515,7 +604,7 @@ document.addEventListener('DOMContentLoaded', () => {
       section.appendChild(createDetailItem('詞性', most_common_meaning.part_of_speech));
       section.appendChild(createDetailItem('定義', most_common_meaning.definition));
       section.appendChild(createDetailItem('例句', most_common_meaning.example)); // Note: No Chinese translation for example available in offline mode
-      analysisContent.appendChild(section);
+      analysisBody.appendChild(section);
     }
 
     // 2. 次要/不常見意思 (Less Common Meanings)
@@ -533,7 +622,7 @@ document.addEventListener('DOMContentLoaded', () => {
         ul.appendChild(li);
       });
       section.appendChild(ul);
-      analysisContent.appendChild(section);
+      analysisBody.appendChild(section);
     }
 
     // 3. 相關衍生字 (Word Family)
@@ -548,7 +637,7 @@ document.addEventListener('DOMContentLoaded', () => {
         ul.appendChild(li);
       });
       section.appendChild(ul);
-      analysisContent.appendChild(section);
+      analysisBody.appendChild(section);
     }
 
     // 4. 相關片語/慣用語 (Related Phrases/Idioms)
@@ -566,7 +655,7 @@ document.addEventListener('DOMContentLoaded', () => {
         ul.appendChild(li);
       });
       section.appendChild(ul);
-      analysisContent.appendChild(section);
+      analysisBody.appendChild(section);
     }
   }
 
@@ -0,0 +1,187 @@
+import argparse
+import concurrent.futures
+import itertools
+import threading
+import time
+import urllib.parse
+
+from dataset import load_json, parse_levels, read_word_list, write_json_atomic
+from parse_pdf_words import RECORDS_FILE
+from server import CACHE_DIR, DISK_CACHE_BYTES, EXTRACT_URLS, create_fetcher
+
+# Warm the proxy cache before class: fetch the Cambridge and Merriam-Webster
+# pages of a deck (or a few levels) through server.py's fetcher, so card
+# flips read from the local disk cache. Pages and their extracted JSON land
+# in the same .proxy_cache/ the server reads, also while it is running.
+#
+# Progress is kept in data/prefetch_state.json; a rerun skips words that are
+# still cached and retries the ones that failed.
+
+INPUT_FILE = '../extracted.txt'
+STATE_FILE = 'data/prefetch_state.json'
+SAVE_EVERY = 50  # words between state saves
+JOBS_PER_WORKER = 2  # queued jobs per worker, so Ctrl-C has little to cancel
+
+class HostRateLimiter:
+    """At most `per_second` upstream requests to each host, shared by all threads."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class RateLimitedPool:
+    """Wraps the fetcher's connection pool; cache hits never reach it, so they are not throttled."""
+
+    def __init__(self, pool, limiter):
+        self.pool = pool
+        self.limiter = limiter
+
+    def request(self, url, headers):
+        self.limiter.wait(urllib.parse.urlsplit(url).hostname)
+        return self.pool.request(url, headers)
+
+def select_words(args):
+    words = read_word_list(args.deck or args.input)
+    if args.levels:
+        levels = {r["word"]: r["level"] for r in load_json(args.records, [])}
+        if not levels:
+            raise SystemExit(f"--levels needs {args.records} (run parse_pdf_words.py)")
+        words = [w for w in words if levels.get(w) in args.levels]
+    if args.limit:
+        words = words[:args.limit]
+    return words
+
+def is_cached(fetcher, source, word):
+    key = fetcher.cache.key(EXTRACT_URLS[source].format(word=urllib.parse.quote(word)))
+    return key in fetcher.cache.disk or key in fetcher.cache.memory
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prefetch dictionary pages into the proxy cache.")
+    parser.add_argument('--input', default=INPUT_FILE, help="word list to walk")
+    parser.add_argument('--deck', help="a deck file (one word per line) to prefetch instead of --input")
+    parser.add_argument('--levels', type=parse_levels, help="only words of these levels, e.g. 1-2")
+    parser.add_argument('--records', default=RECORDS_FILE, help="word records with levels (for --levels)")
+    parser.add_argument('--sources', default=','.join(EXTRACT_URLS), help="comma-separated: cambridge,mw")
+    parser.add_argument('--workers', type=int, default=4, help="concurrent fetches")
+    parser.add_argument('--rate', type=float, default=1.0, help="upstream requests per second per host")
+    parser.add_argument('--limit', type=int, help="only the first N words")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--disk-mb', type=int, default=DISK_CACHE_BYTES // 2**20)
+    parser.add_argument('--state', default=STATE_FILE, help="progress file used to resume")
+    parser.add_argument('--retry-missing', action='store_true', help="retry words the dictionaries did not have")
+    parser.add_argument('--fixtures', help="read recorded pages instead of the live sites (see server.py); "
+                                           "use with a scratch --cache-dir and --state")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    sources = [s for s in args.sources.split(',') if s]
+    unknown = [s for s in sources if s not in EXTRACT_URLS]
+    if unknown:
+        raise SystemExit(f"Unknown source(s): {', '.join(unknown)}")
+
+    fetcher = create_fetcher(args.cache_dir, memory_mb=16, disk_mb=args.disk_mb, fixture_dir=args.fixtures)
+    fetcher.pool = RateLimitedPool(fetcher.pool, HostRateLimiter(args.rate))
+    words = select_words(args)
+    state = load_json(args.state, {})
+
+    jobs = []
+    skipped = 0
+    for word in words:
+        for source in sources:
+            status = state.get(f"{source}:{word}")
+            if (status == 'ok' and is_cached(fetcher, source, word)) or \
+                    (status == 'missing' and not args.retry_missing):
+                skipped += 1
+            else:
+                jobs.append((word, source))
+    print(f"{len(words)} words x {len(sources)} sources: {skipped} already done, {len(jobs)} to fetch "
+          f"({args.workers} workers, {args.rate:g} req/s per host)")
+
+    fetched_bytes = 0
+
+    def run(job):
+        word, source = job
+        try:
+            result = fetcher.extract(source, word)
+        except Exception as e:
+            return job, f"error: {e}", 0
+        if result.get('error') or not result.get('entries'):
+            return job, 'missing', 0
+        entry = fetcher.cache.get(result['url'])
+        size = len(entry['body']) if entry and result['cache'] == 'miss' else 0
+        return job, 'ok', size
+
+    start = time.time()
+    done = 0
+
+    def record(job, status, size):
+        nonlocal done, fetched_bytes
+        word, source = job
+        done += 1
+        state[f"{source}:{word}"] = status
+        fetched_bytes += size
+        if status.startswith('error'):
+            print(f"  {word} ({source}): {status}")
+        if done % SAVE_EVERY == 0:
+            write_json_atomic(args.state, state, indent=None)
+            elapsed = time.time() - start
+            eta = elapsed / done * (len(jobs) - done)
+            print(f"  {done}/{len(jobs)} ({fetched_bytes / 1e6:.1f} MB fetched, ~{eta:.0f}s left)")
+
+    # Jobs are submitted a few at a time: the pool never holds the rest of the deck
+    pool = concurrent.futures.ThreadPoolExecutor(max(1, args.workers))
+    window = max(1, args.workers) * JOBS_PER_WORKER
+    remaining = iter(jobs)
+    running = set()
+    interrupted = False
+    try:
+        while True:
+            for job in itertools.islice(remaining, window - len(running)):
+                running.add(pool.submit(run, job))
+            if not running:
+                break
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                record(*future.result())
+                running.discard(future)
+        pool.shutdown()
+    except KeyboardInterrupt:
+        interrupted = True
+        # Drop the queued jobs; the few fetches in flight still land in the page cache
+        pool.shutdown(wait=False, cancel_futures=True)
+        for future in running:
+            if future.done() and not future.cancelled():
+                record(*future.result())
+    finally:
+        write_json_atomic(args.state, state, indent=None)
+    if interrupted:
+        print("\nInterrupted; progress saved, rerun to resume.")
+
+    print(f"\nDone in {time.time() - start:.0f}s: {fetcher.stats['miss']} fetched, "
+          f"{fetcher.stats['revalidated']} revalidated, {fetcher.stats['hit']} already fresh; "
+          f"{fetched_bytes / 1e6:.1f} MB downloaded")
+    print("Coverage (pages in the cache now):")
+    for source in sources:
+        cached = sum(is_cached(fetcher, source, w) for w in words)
+        missing = sum(state.get(f"{source}:{w}") == 'missing' for w in words)
+        errors = sum(state.get(f"{source}:{w}", '').startswith('error') for w in words)
+        print(f"  {source:10s} {cached}/{len(words)} cached ({cached / max(len(words), 1):.0%}), "
+              f"{missing} not in the dictionary, {errors} errors")
+    print(f"Cache {args.cache_dir}: {len(fetcher.cache.disk)} pages, {fetcher.cache.disk_used / 1e6:.1f} MB stored "
+          f"of {args.disk_mb} MB")
+    if fetcher.cache.disk_used > 0.9 * args.disk_mb * 2**20:
+        print("  The cache is nearly full and older pages are being evicted; raise --disk-mb "
+              "(and the server's) to keep the whole deck.")
+
+if __name__ == "__main__":
+    main()
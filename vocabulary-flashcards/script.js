@@ -25,15 +25,35 @@ document.addEventListener('DOMContentLoaded', () => {
   let currentQuestion = null;
   let mistakes = [];
 
+  // Spaced repetition (srs.py via server.py): due words come first in the deck and
+  // are quizzed first; quiz answers are sent back in batches
+  const learnerId = getLearnerId();
+  let srsQueue = [];
+  let pendingReviews = [];
+  const REVIEW_BATCH = 5;
+
   // Initialize
   loadMistakes();
 
+  // Analyses live in shards next to the compact index (see export_shards.py)
+  // and are fetched the first time one of their words is shown
+  let shardDir = null;
+  const shardRequests = {};
+
+  // Ranked quiz distractors per word (see distractors.py), rows in index order
+  let wordsById = [];
+  let distractorRequest = null;
+
   // Fetch words data
-  fetch('data/words.json')
-    .then(response => response.json())
+  loadWordIndex()
     .then(data => {
+      data.forEach((entry, i) => { entry.id = i; });
+      wordsById = data.slice();
       // Shuffle words for random order
       words = data.sort(() => Math.random() - 0.5);
+      return loadDueQueue(true);
+    })
+    .then(() => {
       totalCountDisplay.textContent = words.length;
       loadCard(currentIndex);
     })
@@ -112,7 +132,152 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   });
 
-  function generateQuestion() {
+  // Word search (search_index.py via server.py's /api/search)
+  const searchInput = document.getElementById('word-search-input');
+  const searchCompletions = document.getElementById('word-search-completions');
+  const searchResults = document.getElementById('word-search-results');
+  let searchTimer = null;
+  let searchSeq = 0;
+
+  searchInput.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(runSearch, 80);
+  });
+
+  function runSearch() {
+    const query = searchInput.value;
+    const seq = ++searchSeq;
+    if (!query.trim()) {
+      searchResults.innerHTML = '';
+      searchCompletions.innerHTML = '';
+      return;
+    }
+    fetch(`/api/search?q=${encodeURIComponent(query)}&limit=10`)
+      .then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+      })
+      .then(data => {
+        if (seq !== searchSeq) return; // a newer query is on its way
+        searchCompletions.innerHTML = '';
+        data.completions.forEach(word => {
+          const option = document.createElement('option');
+          option.value = word;
+          searchCompletions.appendChild(option);
+        });
+        renderSearchResults(data.results);
+      })
+      .catch(error => {
+        // Served without server.py (e.g. a static host): search is simply unavailable
+        console.error('Search failed:', error);
+        searchResults.innerHTML = '';
+      });
+  }
+
+  function renderSearchResults(results) {
+    searchResults.innerHTML = '';
+    if (results.length === 0) {
+      searchResults.innerHTML = '<p class="search-empty">No matching words.</p>';
+      return;
+    }
+    results.forEach(result => {
+      const item = document.createElement('button');
+      item.className = 'search-result';
+      const word = document.createElement('strong');
+      word.textContent = result.word;
+      const gloss = document.createElement('span');
+      gloss.textContent = result.gloss || '';
+      item.append(word, gloss);
+      item.addEventListener('click', () => showWord(result.word));
+      searchResults.appendChild(item);
+    });
+  }
+
+  function showWord(wordToFind) {
+    const index = words.findIndex(w => w.word === wordToFind);
+    if (index === -1) return;
+    currentIndex = index;
+    resetCard();
+    loadCard(currentIndex);
+    searchResults.innerHTML = '';
+    searchInput.value = '';
+  }
+
+  function loadWordIndex() {
+    return fetch('data/index.json')
+      .then(response => {
+        if (!response.ok) throw new Error('No compact index');
+        return response.json();
+      })
+      .then(index => {
+        shardDir = `data/${index.shard_dir}`;
+        return index.words.map(row => {
+          const entry = {};
+          index.fields.forEach((field, i) => { entry[field] = row[i]; });
+          return entry;
+        });
+      })
+      .catch(() => {
+        // Builds without an index only have the monolithic words.json
+        return fetch('data/words.json').then(response => response.json());
+      });
+  }
+
+  // Resolves to the distractor table, or null when the build has none (or an outdated one)
+  function loadDistractors() {
+    if (!distractorRequest) {
+      distractorRequest = fetch('data/distractors.json')
+        .then(response => {
+          if (!response.ok) throw new Error('No distractor table');
+          return response.json();
+        })
+        .then(table => (table.words === wordsById.length ? table.distractors : null))
+        .catch(() => null);
+    }
+    return distractorRequest;
+  }
+
+  async function pickDistractors(targetWord, targetIndex) {
+    const table = await loadDistractors();
+    const ranked = table && table[targetWord.id];
+    if (ranked && ranked.length >= 3) {
+      // Three of the six best candidates, so repeated questions vary
+      return ranked.slice(0, 6).sort(() => Math.random() - 0.5).slice(0, 3).map(id => wordsById[id]);
+    }
+
+    const distractors = [];
+    let attempts = 0;
+    while (distractors.length < 3 && attempts < 50) {
+      const idx = Math.floor(Math.random() * words.length);
+      if (idx !== targetIndex && !distractors.includes(words[idx])) {
+        distractors.push(words[idx]);
+      }
+      attempts++;
+    }
+    return distractors;
+  }
+
+  // Resolves once entry.analysis is known (null if the word has none)
+  function loadAnalysis(entry) {
+    if (entry.analysis !== undefined) return Promise.resolve(entry);
+    if (!shardRequests[entry.shard]) {
+      shardRequests[entry.shard] = fetch(`${shardDir}/${entry.shard}.json`)
+        .then(response => {
+          if (!response.ok) throw new Error(`Shard ${entry.shard} not found`);
+          return response.json();
+        })
+        .catch(error => {
+          delete shardRequests[entry.shard]; // Allow a retry on the next card
+          throw error;
+        });
+    }
+    return shardRequests[entry.shard].then(shard => {
+      entry.analysis = shard[entry.word] || null;
+      return entry;
+    });
+  }
+
+  async function generateQuestion() {
     try {
       if (words.length < 4) return;
 
@@ -126,9 +291,10 @@ document.addEventListener('DOMContentLoaded', () => {
       const existingRef = document.getElementById('quiz-reference');
       if (existingRef) existingRef.remove();
 
-      // Pick target word
-      const targetIndex = Math.floor(Math.random() * words.length);
+      // Pick target word (due reviews first)
+      const targetIndex = pickQuizTarget();
       const targetWord = words[targetIndex];
+      await loadAnalysis(targetWord);
 
       // Select Meaning (Prioritize Less Common)
       let selectedMeaning = null;
@@ -154,15 +320,7 @@ document.addEventListener('DOMContentLoaded', () => {
       }
 
       // Pick 3 distractors
-      const distractors = [];
-      let attempts = 0;
-      while (distractors.length < 3 && attempts < 50) {
-        const idx = Math.floor(Math.random() * words.length);
-        if (idx !== targetIndex && !distractors.includes(words[idx])) {
-          distractors.push(words[idx]);
-        }
-        attempts++;
-      }
+      const distractors = await pickDistractors(targetWord, targetIndex);
 
       // Shuffle options
       const options = [targetWord, ...distractors].sort(() => Math.random() - 0.5);
@@ -210,6 +368,9 @@ document.addEventListener('DOMContentLoaded', () => {
           // For distractors, use their most common meaning (English only)
           if (opt.analysis && opt.analysis.most_common_meaning) {
             defText = extractEnglish(opt.analysis.most_common_meaning.definition);
+          } else if (opt.gloss) {
+            // Distractor shards may not be loaded yet; the index has the short gloss
+            defText = extractEnglish(opt.gloss);
           }
         }
 
@@ -274,6 +435,8 @@ document.addEventListener('DOMContentLoaded', () => {
         trackMistake(currentQuestion.target, selectedOption);
       }
 
+      recordReview(currentQuestion.target.word, isCorrect);
+
       quizFeedback.classList.add('show');
       nextQuestionBtn.style.display = 'block';
 
@@ -289,6 +452,69 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   }
 
+  function getLearnerId() {
+    let id = localStorage.getItem('vocabulary_learner');
+    if (!id) {
+      id = `learner-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
+      localStorage.setItem('vocabulary_learner', id);
+    }
+    return id;
+  }
+
+  // Move due and new words to the front of the shuffled deck; without the server
+  // (static hosting) the deck simply stays shuffled
+  function loadDueQueue(reorderDeck = false) {
+    return fetch(`/api/srs/due?learner=${encodeURIComponent(learnerId)}&limit=50&new=20`)
+      .then(response => {
+        if (!response.ok) throw new Error('No scheduler');
+        return response.json();
+      })
+      .then(queue => {
+        srsQueue = [...queue.due.map(card => card.word), ...queue.new];
+        if (!reorderDeck) return;
+        const position = new Map(srsQueue.map((word, i) => [word, i]));
+        const front = words.filter(w => position.has(w.word))
+          .sort((a, b) => position.get(a.word) - position.get(b.word));
+        words = [...front, ...words.filter(w => !position.has(w.word))];
+      })
+      .catch(error => console.log('Spaced repetition unavailable (expected on static host):', error));
+  }
+
+  function pickQuizTarget() {
+    while (srsQueue.length > 0) {
+      const index = words.findIndex(w => w.word === srsQueue[0]);
+      srsQueue.shift();
+      if (index !== -1) return index;
+    }
+    return Math.floor(Math.random() * words.length);
+  }
+
+  function recordReview(word, isCorrect) {
+    // SM-2 grades: 4 = recalled, 1 = forgotten (see srs.py)
+    pendingReviews.push({ word, grade: isCorrect ? 4 : 1, time: Date.now() / 1000 });
+    if (pendingReviews.length >= REVIEW_BATCH) flushReviews();
+  }
+
+  function flushReviews(useBeacon = false) {
+    if (pendingReviews.length === 0) return;
+    const body = JSON.stringify({ learner: learnerId, reviews: pendingReviews });
+    pendingReviews = [];
+    if (useBeacon && navigator.sendBeacon) {
+      navigator.sendBeacon('/api/srs/review', new Blob([body], { type: 'application/json' }));
+      return;
+    }
+    fetch('/api/srs/review', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body })
+      .then(() => {
+        // Refill the quiz queue once it runs out (failed words are due again in a few minutes)
+        if (srsQueue.length === 0) return loadDueQueue();
+      })
+      .catch(error => console.log('Could not save reviews:', error));
+  }
+
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') flushReviews(true);
+  });
+
   function trackMistake(word, wrongChoice) {
     const mistake = {
       word: word.word,
@@ -348,150 +574,178 @@ document.addEventListener('DOMContentLoaded', () => {
     // Front
     wordDisplay.textContent = wordData.word;
 
-    // Back
-    renderAnalysis(wordData);
+    // Back (the analysis shard may still be loading)
+    analysisContent.innerHTML = '';
+    const analysisBody = document.createElement('div');
+    analysisBody.id = 'analysis-body';
+    analysisBody.innerHTML = '<p style="color:#666; font-style:italic;">Loading analysis...</p>';
+    analysisContent.appendChild(analysisBody);
+    loadAnalysis(wordData)
+      .then(() => {
+        if (words[currentIndex] === wordData) renderAnalysis(wordData);
+      })
+      .catch(error => {
+        console.error('Error loading analysis:', error);
+        analysisBody.innerHTML = '<p style="text-align:center; margin-top: 20px;">Could not load the analysis for this word.</p>';
+      });
 
     // Update External Link
     const cambridgeLink = document.getElementById('cambridge-link');
     const url = `https://dictionary.cambridge.org/dictionary/english-chinese-traditional/${wordData.word}`;
     cambridgeLink.href = url;
 
-    // Fetch and Embed Cambridge Content
-    fetchCambridgeData(url);
-
-    // Update MW Link & Fetch
+    // Update MW Link
     const mwLink = document.getElementById('mw-link');
     const mwUrl = `https://www.merriam-webster.com/dictionary/${wordData.word}`;
     mwLink.href = mwUrl;
-    fetchMerriamWebsterData(mwUrl);
+
+    // Fetch and embed both dictionaries in one request; the next cards are fetched along with it
+    const upcoming = words.slice(currentIndex + 1, currentIndex + 1 + DICTIONARY_PREFETCH).map(w => w.word);
+    const [dictionaryData] = fetchDictionaryData([wordData.word, ...upcoming]);
+    showDictionaryData(wordData, dictionaryData);
   }
 
-  async function fetchMerriamWebsterData(url) {
-    const analysisContent = document.getElementById('analysis-content');
+  // Dictionary previews come from /api/extract as compact JSON ({ cambridge, mw } per word),
+  // extracted by server.py; one promise per word is kept so each word is requested once.
+  const DICTIONARY_PREFETCH = 2;
+  const dictionaryCache = new Map();
+
+  function fetchDictionaryData(wordList) {
+    const pending = wordList.filter(w => !dictionaryCache.has(w));
+    if (pending.length > 0) {
+      const query = pending.map(w => `word=${encodeURIComponent(w)}`).join('&');
+      const request = fetch(`/api/extract?${query}`)
+        .then(response => {
+          if (!response.ok) throw new Error('Network response was not ok');
+          return response.json();
+        })
+        .then(data => {
+          const byWord = {};
+          data.results.forEach(result => {
+            byWord[result.word] = byWord[result.word] || {};
+            byWord[result.word][result.source] = result;
+          });
+          return byWord;
+        });
+      pending.forEach(w => {
+        const promise = request.then(byWord => byWord[w] || {});
+        // Forget failures, so the word is tried again next time
+        promise.catch(() => dictionaryCache.delete(w));
+        dictionaryCache.set(w, promise);
+      });
+    }
+    return wordList.map(w => dictionaryCache.get(w));
+  }
 
-    // Create container for MW data if not exists
-    let mwContainer = document.getElementById('mw-content');
-    if (!mwContainer) {
-      mwContainer = document.createElement('div');
-      mwContainer.id = 'mw-content';
-      mwContainer.style.marginTop = '20px';
-      mwContainer.style.paddingTop = '20px';
-      mwContainer.style.borderTop = '2px dashed #ccc';
-      analysisContent.appendChild(mwContainer);
+  function getDictionaryContainer(id) {
+    const analysisContent = document.getElementById('analysis-content');
+    let container = document.getElementById(id);
+    if (!container) {
+      container = document.createElement('div');
+      container.id = id;
+      container.style.marginTop = '20px';
+      container.style.paddingTop = '20px';
+      container.style.borderTop = '2px dashed #ccc';
+      analysisContent.appendChild(container);
     }
+    return container;
+  }
 
-    mwContainer.innerHTML = '<p style="color:#666; font-style:italic;">Loading Merriam-Webster content...</p>';
+  async function showDictionaryData(wordData, dictionaryData) {
+    const dictionaries = [
+      { source: 'cambridge', id: 'cambridge-content', name: 'Cambridge Dictionary', linkColor: '#1d4ed8' },
+      { source: 'mw', id: 'mw-content', name: 'Merriam-Webster', linkColor: '#375f7d' },
+    ];
+    dictionaries.forEach(d => {
+      getDictionaryContainer(d.id).innerHTML = `<p style="color:#666; font-style:italic;">Loading ${d.name} content...</p>`;
+    });
 
+    let results;
     try {
-      // Use local proxy to bypass CORS
-      const proxyUrl = `/api/proxy?url=${encodeURIComponent(url)}`;
-      const response = await fetch(proxyUrl);
-
-      if (!response.ok) throw new Error('Network response was not ok');
-      const text = await response.text();
-
-      const parser = new DOMParser();
-      const doc = parser.parseFromString(text, 'text/html');
-
-      const entries = doc.querySelectorAll('div[id^="dictionary-entry-"]');
-
-      if (entries.length > 0) {
-        mwContainer.innerHTML = '<h3>Merriam-Webster Source:</h3>';
-        const entry = entries[0];
-        const scripts = entry.querySelectorAll('script, style, .widget, .ad, .social-share');
-        scripts.forEach(el => el.remove());
-
-        const links = entry.querySelectorAll('a');
-        links.forEach(a => {
-          if (a.getAttribute('href')?.startsWith('/')) {
-            a.href = 'https://www.merriam-webster.com' + a.getAttribute('href');
-          }
-          a.target = '_blank';
-          a.style.color = '#375f7d';
-          a.style.textDecoration = 'underline';
-        });
-
-        mwContainer.appendChild(entry);
-      } else {
-        mwContainer.innerHTML = '<p>Could not extract content automatically. Please use the link below.</p>';
-      }
+      results = await dictionaryData;
     } catch (error) {
-      console.log('MW Fetch error (expected on static host):', error);
-      mwContainer.innerHTML = '<p style="color:#666; font-size: 0.9rem;">Preview not available in static mode. <br>Please click the button above to view on Merriam-Webster.</p>';
+      console.log('Dictionary fetch error (expected on static host):', error);
+      if (words[currentIndex] !== wordData) return;
+      dictionaries.forEach(d => {
+        getDictionaryContainer(d.id).innerHTML = `<p style="color:#666; font-size: 0.9rem;">Preview not available in static mode. <br>Please click the button above to view on ${d.name}.</p>`;
+      });
+      return;
     }
-  }
 
-  async function fetchCambridgeData(url) {
-    const analysisContent = document.getElementById('analysis-content');
+    // The user may have moved on while the request was in flight
+    if (words[currentIndex] !== wordData) return;
+    dictionaries.forEach(d => renderDictionaryResult(getDictionaryContainer(d.id), d, results[d.source]));
+  }
 
-    let cambridgeContainer = document.getElementById('cambridge-content');
-    if (!cambridgeContainer) {
-      cambridgeContainer = document.createElement('div');
-      cambridgeContainer.id = 'cambridge-content';
-      cambridgeContainer.style.marginTop = '20px';
-      cambridgeContainer.style.paddingTop = '20px';
-      cambridgeContainer.style.borderTop = '2px dashed #ccc';
-      analysisContent.appendChild(cambridgeContainer);
+  function renderDictionaryResult(container, dictionary, result) {
+    if (!result || result.error || !result.entries || result.entries.length === 0) {
+      container.innerHTML = '<p>Could not extract content automatically. Please use the link below.</p>';
+      return;
     }
 
-    cambridgeContainer.innerHTML = '<p style="color:#666; font-style:italic;">Loading Cambridge Dictionary content...</p>';
-
-    try {
-      // Use local proxy to bypass CORS
-      const proxyUrl = `/api/proxy?url=${encodeURIComponent(url)}`;
-      const response = await fetch(proxyUrl);
-
-      if (!response.ok) throw new Error('Network response was not ok');
-      const text = await response.text();
-
-      const parser = new DOMParser();
-      const doc = parser.parseFromString(text, 'text/html');
-
-      const entryBody = doc.querySelector('.di-body') || doc.querySelector('.def-block');
-
-      if (entryBody) {
-        const scripts = entryBody.querySelectorAll('script, style, .runon-title, .runon-body');
-        scripts.forEach(el => el.remove());
-
-        const links = entryBody.querySelectorAll('a');
-        links.forEach(a => {
-          const title = a.title ? a.title.toLowerCase() : '';
-          const isIdiom = title.endsWith('idiom') ||
-            title.endsWith('phrasal verb') ||
-            title.startsWith('meaning of') ||
-            a.querySelector('.idiom');
-
-          if (isIdiom) {
-            if (a.getAttribute('href')?.startsWith('/')) {
-              a.href = 'https://dictionary.cambridge.org' + a.getAttribute('href');
-            }
-            a.target = '_blank';
-            a.style.textDecoration = 'underline';
-            a.style.color = '#1d4ed8';
-          } else {
-            const span = document.createElement('span');
-            span.innerHTML = a.innerHTML;
-            span.className = 'stripped-link';
-            a.replaceWith(span);
-          }
-        });
+    container.innerHTML = '';
+    const title = document.createElement('h3');
+    title.textContent = `${dictionary.name} Source:`;
+    container.appendChild(title);
+
+    result.entries.forEach(entry => {
+      const heading = document.createElement('p');
+      heading.innerHTML = '<strong></strong> <em></em>';
+      heading.querySelector('strong').textContent = entry.headword || result.word;
+      heading.querySelector('em').textContent = entry.pos.join(', ');
+      container.appendChild(heading);
+
+      const ol = document.createElement('ol');
+      ol.style.paddingLeft = '20px';
+      entry.senses.forEach(sense => {
+        const li = document.createElement('li');
+        li.style.marginBottom = '8px';
+        const definition = document.createElement('div');
+        definition.textContent = sense.definition || '';
+        li.appendChild(definition);
+        if (sense.translation) {
+          const translation = document.createElement('div');
+          translation.textContent = sense.translation;
+          li.appendChild(translation);
+        }
+        if (sense.examples.length > 0) {
+          const ul = document.createElement('ul');
+          sense.examples.forEach(example => {
+            const exampleItem = document.createElement('li');
+            exampleItem.style.fontStyle = 'italic';
+            exampleItem.textContent = example.translation ? `${example.text} ${example.translation}` : example.text;
+            ul.appendChild(exampleItem);
+          });
+          li.appendChild(ul);
+        }
+        ol.appendChild(li);
+      });
+      container.appendChild(ol);
+    });
 
-        cambridgeContainer.innerHTML = '<h3>Cambridge Dictionary Source:</h3>';
-        cambridgeContainer.appendChild(entryBody);
-      } else {
-        cambridgeContainer.innerHTML = '<p>Could not extract content automatically. Please use the link below.</p>';
-      }
-    } catch (error) {
-      console.log('Fetch error (expected on static host):', error);
-      cambridgeContainer.innerHTML = '<p style="color:#666; font-size: 0.9rem;">Preview not available in static mode. <br>Please click the button above to view on Cambridge Dictionary.</p>';
+    // Idioms and phrasal verbs stay clickable, as on the dictionary page
+    if (result.idioms && result.idioms.length > 0) {
+      const idioms = document.createElement('p');
+      result.idioms.forEach((idiom, i) => {
+        const a = document.createElement('a');
+        a.href = idiom.url;
+        a.target = '_blank';
+        a.textContent = idiom.text;
+        a.style.textDecoration = 'underline';
+        a.style.color = dictionary.linkColor;
+        if (i > 0) idioms.appendChild(document.createTextNode(' · '));
+        idioms.appendChild(a);
+      });
+      container.appendChild(idioms);
     }
   }
 
   function renderAnalysis(data) {
-    analysisContent.innerHTML = '';
+    const analysisBody = document.getElementById('analysis-body');
+    analysisBody.innerHTML = '';
 
     if (!data.analysis) {
-      analysisContent.innerHTML = '<p style="text-align:center; margin-top: 20px;">No detailed analysis available for this word.</p>';
+      analysisBody.innerHTML = '<p style="text-align:center; margin-top: 20px;">No detailed analysis available for this word.</p>';
       return;
     }
 
@@ -503,7 +757,7 @@ document.addEventListener('DOMContentLoaded', () => {
       section.appendChild(createDetailItem('詞性', most_common_meaning.part_of_speech));
       section.appendChild(createDetailItem('定義', most_common_meaning.definition));
       section.appendChild(createDetailItem('例句', most_common_meaning.example));
-      analysisContent.appendChild(section);
+      analysisBody.appendChild(section);
     }
 
     // 2. 次要/不常見意思 (Less Common Meanings)
@@ -521,7 +775,7 @@ document.addEventListener('DOMContentLoaded', () => {
         ul.appendChild(li);
       });
       section.appendChild(ul);
-      analysisContent.appendChild(section);
+      analysisBody.appendChild(section);
     }
 
     // 3. 相關衍生字 (Word Family)
@@ -536,7 +790,7 @@ document.addEventListener('DOMContentLoaded', () => {
         ul.appendChild(li);
       });
       section.appendChild(ul);
-      analysisContent.appendChild(section);
+      analysisBody.appendChild(section);
     }
 
     // 4. 相關片語/慣用語 (Related Phrases/Idioms)
@@ -554,7 +808,7 @@ document.addEventListener('DOMContentLoaded', () => {
         ul.appendChild(li);
       });
       section.appendChild(ul);
-      analysisContent.appendChild(section);
+      analysisBody.appendChild(section);
     }
   }
 
@@ -0,0 +1,183 @@
+import argparse
+import bisect
+import os
+import re
+import time
+from collections import defaultdict
+
+from dataset import WORDS_FILE, load_json
+from distractors import STOPWORDS
+from export_shards import dump_compact
+
+# Inverted index over words.json for /api/search.
+#
+#   data/search_index.json  {"version", "words": [[word, level, gloss], ...],
+#                            "postings": {term: [word_id, weight, word_id, weight, ...]}}
+#
+# Terms are lower-case English tokens from the headword, definitions,
+# examples, word family and phrases, plus Chinese character bigrams (and
+# single characters, for one-character queries) from the Chinese glosses.
+# Prefix lookups (autocomplete, and the last word of a query being typed)
+# binary-search the sorted term and headword lists, which does the job of a
+# trie with no extra structure to store.
+
+SEARCH_INDEX_FILE = 'data/search_index.json'
+INDEX_VERSION = 1
+MAX_PREFIX_TERMS = 50  # terms a prefix expands to
+
+# Where a term occurs decides how much a match counts
+FIELD_WEIGHTS = {"headword": 10, "family": 4, "definition": 3, "phrase": 2, "other_definition": 2, "example": 1}
+
+ENGLISH = re.compile(r"[a-z][a-z'\-]*")
+CJK_RUN = re.compile(r'[㐀-䶿一-鿿]+')
+
+def english_terms(text):
+    return [t.strip("'-") for t in ENGLISH.findall(text.lower()) if t not in STOPWORDS]
+
+def chinese_terms(text):
+    terms = []
+    for run in CJK_RUN.findall(text):
+        terms.extend(run)
+        terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+def terms(text):
+    return english_terms(text) + chinese_terms(text) if text else []
+
+def item_fields(item):
+    """(field, text) pairs for one words.json item."""
+    analysis = item.get("analysis") or {}
+    main = analysis.get("most_common_meaning") or {}
+    yield "headword", item["word"]
+    yield "definition", main.get("definition")
+    yield "example", main.get("example")
+    for meaning in analysis.get("less_common_meanings") or []:
+        yield "other_definition", meaning.get("definition")
+        yield "example", meaning.get("example")
+    for member in analysis.get("word_family") or []:
+        yield "family", member.get("word")
+        yield "other_definition", member.get("definition")
+    for phrase in analysis.get("related_phrases") or []:
+        yield "phrase", phrase.get("phrase")
+        yield "other_definition", phrase.get("definition")
+        yield "example", phrase.get("example")
+
+def build(items):
+    words, postings = [], defaultdict(dict)
+    for word_id, item in enumerate(items):
+        main = (item.get("analysis") or {}).get("most_common_meaning") or {}
+        words.append([item["word"], item.get("level"), main.get("definition") or item.get("gloss")])
+        for field, text in item_fields(item):
+            weight = FIELD_WEIGHTS[field]
+            for term in set(terms(text)):
+                if postings[term].get(word_id, 0) < weight:
+                    postings[term][word_id] = weight
+    flat = {term: [v for pair in sorted(ids.items()) for v in pair] for term, ids in postings.items()}
+    return {"version": INDEX_VERSION, "words": words, "postings": flat}
+
+def write(items, path=SEARCH_INDEX_FILE, compress=()):
+    index = build(items)
+    size = dump_compact(path, index, compress)
+    print(f"Wrote {path}: {len(index['postings'])} terms over {len(items)} words ({size / 1e6:.1f} MB)")
+    return index
+
+class SearchIndex:
+    """Loaded search index; lookups are dict and bisect operations only."""
+
+    def __init__(self, index):
+        self.words = index["words"]
+        self.postings = {term: dict(zip(flat[::2], flat[1::2])) for term, flat in index["postings"].items()}
+        self.terms = sorted(self.postings)
+        ordered = sorted((w[0].lower(), i) for i, w in enumerate(self.words))
+        self.headwords = [word for word, _ in ordered]
+        self.headword_ids = [i for _, i in ordered]
+
+    @classmethod
+    def load(cls, path=SEARCH_INDEX_FILE, words_path=WORDS_FILE):
+        """The saved index, or one built from words.json when it is missing or older than words.json."""
+        index = load_json(path, None)
+        try:
+            stale = os.path.getmtime(words_path) > os.path.getmtime(path)
+        except OSError:
+            stale = index is None
+        if index is None or stale or index.get("version") != INDEX_VERSION:
+            index = build(load_json(words_path, []))
+        return cls(index)
+
+    def _prefix_range(self, keys, prefix):
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '￿')
+        return start, end
+
+    def _term_matches(self, term, prefix=False):
+        if not prefix:
+            return self.postings.get(term, {})
+        start, end = self._prefix_range(self.terms, term)
+        matches = {}
+        for expanded in self.terms[start:min(end, start + MAX_PREFIX_TERMS)]:
+            for word_id, weight in self.postings[expanded].items():
+                # Completing a term counts a little less than typing it out
+                weight = weight if expanded == term else weight * 0.8
+                if weight > matches.get(word_id, 0):
+                    matches[word_id] = weight
+        return matches
+
+    def search(self, query, limit=20):
+        """Words matching every term of `query` (the last English word may be unfinished), best first."""
+        raw = query.lower()
+        query = raw.strip()
+        english, chinese = english_terms(query), chinese_terms(query)
+        if not english and not chinese:
+            return []
+        # For Chinese, bigrams say it all; single characters only for one-character queries
+        chinese = [t for t in chinese if len(t) == 2] or chinese
+        typing = bool(english) and raw[-1:].isalpha() and query.split()[-1].strip("'-") == english[-1]
+
+        scores = None
+        for i, term in enumerate(english + chinese):
+            matches = self._term_matches(term, prefix=typing and i == len(english) - 1)
+            if scores is None:
+                scores = dict(matches)
+            else:
+                scores = {w: s + matches[w] for w, s in scores.items() if w in matches}
+            if not scores:
+                return []
+        for word_id in scores:
+            if self.words[word_id][0].lower() == query:
+                scores[word_id] += 100
+        best = sorted(scores.items(), key=lambda p: (-p[1], self.words[p[0]][0]))[:limit]
+        return [self.result(word_id, score) for word_id, score in best]
+
+    def complete(self, prefix, limit=10):
+        """Headwords starting with `prefix`, shortest first."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        start, end = self._prefix_range(self.headwords, prefix)
+        matches = sorted(range(start, end), key=lambda i: (len(self.headwords[i]), self.headwords[i]))[:limit]
+        return [self.words[self.headword_ids[i]][0] for i in matches]
+
+    def result(self, word_id, score):
+        word, level, gloss = self.words[word_id]
+        return {"word": word, "level": level, "gloss": gloss, "score": round(score, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the search index from words.json, or try a query.")
+    parser.add_argument('--input', default=WORDS_FILE)
+    parser.add_argument('--output', default=SEARCH_INDEX_FILE)
+    parser.add_argument('--compress', action='append', choices=['gzip', 'br'], default=[])
+    parser.add_argument('--query', help="search the saved index instead of building it")
+    args = parser.parse_args()
+    if args.query:
+        index = SearchIndex.load(args.output, args.input)
+        start = time.perf_counter()
+        results = index.search(args.query)
+        elapsed = (time.perf_counter() - start) * 1000
+        for r in results:
+            print(f"{r['score']:7.1f}  {r['word']}  {r['gloss']}")
+        print(f"{len(results)} results in {elapsed:.2f} ms; completions: {', '.join(index.complete(args.query))}")
+    else:
+        write(load_json(args.input, []), args.output, args.compress)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,386 @@
+import argparse
+import concurrent.futures
+import contextlib
+import gzip
+import hashlib
+import http.client
 import http.server
-import socketserver
-import urllib.request
+import json
+import os
+import queue
+import threading
+import time
 import urllib.parse
-import sys
+from collections import OrderedDict
+
+from dictionary_extract import EXTRACT_VERSION, extract
+from search_index import SEARCH_INDEX_FILE, SearchIndex
+from srs import DB_FILE, Scheduler
+from wordnet_snapshot import MISSING, SNAPSHOT_FILE, WordNetSnapshot
 
 PORT = 8000
 
+# Only the dictionaries the app embeds are proxied (and cached)
+ALLOWED_HOSTS = {'dictionary.cambridge.org', 'www.merriam-webster.com'}
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+UPSTREAM_TIMEOUT = 10      # seconds for connect and for each read
+MAX_REDIRECTS = 5
+CACHE_DIR = '.proxy_cache'
+CACHE_TTL = 7 * 24 * 3600  # dictionary pages rarely change; stale entries are revalidated, not dropped
+MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+DISK_CACHE_BYTES = 512 * 1024 * 1024
+
+# /api/extract: dictionary pages reduced to compact JSON on the server
+EXTRACT_URLS = {
+    'cambridge': 'https://dictionary.cambridge.org/dictionary/english-chinese-traditional/{word}',
+    'mw': 'https://www.merriam-webster.com/dictionary/{word}',
+}
+MAX_BATCH = 20         # (word, source) pairs per request
+EXTRACT_WORKERS = 8
+
+MAX_POST_BYTES = 1024 * 1024
+MAX_LEARNER_LENGTH = 64
+MAX_SEARCH_RESULTS = 100
+MAX_WORD_LENGTH = 64
+
+class UpstreamPool:
+    """Keep-alive HTTPS connections per host, reused across requests and threads."""
+
+    def __init__(self, timeout=UPSTREAM_TIMEOUT, per_host=4):
+        self.timeout = timeout
+        self.per_host = per_host
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def _connection(self, scheme, host):
+        with self.lock:
+            idle = self.idle.setdefault((scheme, host), queue.LifoQueue())
+        try:
+            return idle.get_nowait()
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            return cls(host, timeout=self.timeout)
+
+    def _release(self, scheme, host, conn):
+        idle = self.idle[(scheme, host)]
+        if idle.qsize() < self.per_host:
+            idle.put(conn)
+        else:
+            conn.close()
+
+    def request(self, url, headers):
+        """GET `url`; returns (status, headers dict with lower-case keys, body bytes)."""
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # The host closed an idle keep-alive connection; retry once on a fresh one
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(parts.scheme, parts.netloc, conn)
+            return response.status, response_headers, body
+
+class FixturePool:
+    """
+    Stand-in for UpstreamPool that serves recorded pages from
+    <fixture_dir>/<source>/<word>.html (e.g. fixtures/cambridge/apple.html),
+    so the proxy and /api/extract can run without the live sites.
+    """
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self.sources = {urllib.parse.urlsplit(url).hostname: source for source, url in EXTRACT_URLS.items()}
+
+    def request(self, url, headers):
+        parts = urllib.parse.urlsplit(url)
+        source = self.sources.get(parts.hostname, parts.hostname)
+        word = urllib.parse.unquote(parts.path.rstrip('/').rsplit('/', 1)[-1])
+        path = os.path.join(self.fixture_dir, source, word + '.html')
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return 404, {'content-type': 'text/plain'}, b'no fixture recorded'
+        return 200, {'content-type': 'text/html; charset=utf-8'}, body
+
+class ResponseCache:
+    """
+    Two-level LRU of upstream pages: hot entries in memory, everything on
+    disk under cache_dir, each level held to its own byte budget. Entries
+    are dicts with the (possibly gzip-encoded) body and the headers needed
+    to serve and revalidate it.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_bytes=MEMORY_CACHE_BYTES, disk_bytes=DISK_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        self.lock = threading.Lock()
+        self.disk = OrderedDict()  # key -> size, oldest first
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            files = [f for f in os.listdir(cache_dir) if f.endswith('.json')]
+            files.sort(key=lambda f: os.path.getmtime(os.path.join(cache_dir, f)))
+            for name in files:
+                key = name[:-5]
+                body_path = os.path.join(cache_dir, key + '.body')
+                if os.path.exists(body_path):
+                    self.disk[key] = os.path.getsize(body_path)
+        self.disk_used = sum(self.disk.values())
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, key + '.json'), os.path.join(self.cache_dir, key + '.body')
+
+    def _remember(self, key, entry):
+        size = len(entry['body'])
+        if size > self.memory_bytes:
+            return
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_used -= len(old['body'])
+        self.memory[key] = entry
+        self.memory_used += size
+        while self.memory_used > self.memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_used -= len(evicted['body'])
+
+    def get(self, url):
+        key = self.key(url)
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                return entry
+            known = key in self.disk
+            if known:
+                self.disk.move_to_end(key)
+        if not self.cache_dir:
+            return None
+        meta_path, body_path = self._paths(key)
+        if not known and not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry['body'] = f.read()
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            return None
+        with self.lock:
+            self._remember(key, entry)
+            if key not in self.disk:
+                # Written by another process (prefetch_dictionary.py) since startup
+                self.disk[key] = len(entry['body'])
+                self.disk_used += len(entry['body'])
+        return entry
+
+    def put(self, url, entry, body_changed=True):
+        key = self.key(url)
+        with self.lock:
+            self._remember(key, entry)
+        if not self.cache_dir:
+            return
+        meta_path, body_path = self._paths(key)
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        # Body first, then metadata: a crash in between leaves no entry that points at a missing body
+        if body_changed or not os.path.exists(body_path):
+            with open(body_path + '.tmp', 'wb') as f:
+                f.write(entry['body'])
+            os.replace(body_path + '.tmp', body_path)
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+        with self.lock:
+            self.disk_used -= self.disk.pop(key, 0)
+            self.disk[key] = len(entry['body'])
+            self.disk_used += len(entry['body'])
+            evicted = []
+            while self.disk_used > self.disk_bytes and len(self.disk) > 1:
+                old_key, size = self.disk.popitem(last=False)
+                self.disk_used -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            for path in self._paths(old_key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def touch(self, url, entry):
+        """Record a successful revalidation (304): the cached body is fresh again."""
+        entry['fetched_at'] = time.time()
+        self.put(url, entry, body_changed=False)
+
+class DictionaryFetcher:
+    """Cache-first fetch of dictionary pages, revalidating stale entries with ETag/Last-Modified."""
+
+    def __init__(self, cache, pool, ttl=CACHE_TTL):
+        self.cache = cache
+        self.pool = pool
+        self.ttl = ttl
+        self.stats = {'hit': 0, 'revalidated': 0, 'miss': 0}
+        self.inflight = {}  # url -> [lock, threads using it]
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _url_lock(self, url):
+        # One upstream request per URL: concurrent flips of the same card wait for the first.
+        # The lock is dropped with its last user, so only URLs in use are held here.
+        with self.lock:
+            slot = self.inflight.setdefault(url, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self.lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self.inflight[url]
+
+    def fetch(self, url):
+        """Return (entry, 'hit' | 'revalidated' | 'miss'); raises ValueError for URLs that are not proxied."""
+        with self._url_lock(url):
+            return self._fetch(url)
+
+    def _fetch(self, url):
+        # Called with the URL's lock held
+        host = urllib.parse.urlsplit(url).hostname
+        if host not in ALLOWED_HOSTS:
+            raise ValueError(f"host not allowed: {host}")
+
+        entry = self.cache.get(url)
+        if entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+            return self._count(entry, 'hit')
+
+        headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip'}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self.pool.request(target, headers)
+            if status in (301, 302, 303, 307, 308) and 'location' in response_headers:
+                target = urllib.parse.urljoin(target, response_headers['location'])
+                if urllib.parse.urlsplit(target).hostname not in ALLOWED_HOSTS:
+                    raise ValueError(f"redirected to a host that is not allowed: {target}")
+                continue
+            break
+
+        if status == 304 and entry is not None:
+            self.cache.touch(url, entry)
+            return self._count(entry, 'revalidated')
+
+        entry = {
+            'status': status,
+            'content_type': response_headers.get('content-type', 'text/html'),
+            'content_encoding': response_headers.get('content-encoding'),
+            'etag': response_headers.get('etag'),
+            'last_modified': response_headers.get('last-modified'),
+            'fetched_at': time.time(),
+            'body': body,
+        }
+        if status == 200:
+            self.cache.put(url, entry)
+        return self._count(entry, 'miss')
+
+    def extract(self, source, word):
+        """Compact JSON for `word` from one dictionary; the extraction is cached with the page."""
+        url = EXTRACT_URLS[source].format(word=urllib.parse.quote(word))
+        # Held through the extraction too, so concurrent requests parse and store the page once
+        with self._url_lock(url):
+            entry, outcome = self._fetch(url)
+            result = {'word': word, 'source': source, 'url': url, 'cache': outcome}
+            if entry['status'] != 200:
+                return dict(result, error=f"upstream status {entry['status']}")
+            cached = entry.get('extracted')
+            if cached is None or cached['version'] != EXTRACT_VERSION:
+                body = entry['body']
+                if entry.get('content_encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                cached = {'version': EXTRACT_VERSION, 'data': extract(source, body.decode('utf-8', 'replace'), url)}
+                entry['extracted'] = cached
+                # Saved with the page's metadata, so the page is not parsed again after a restart
+                self.cache.put(url, entry, body_changed=False)
+        return dict(result, **cached['data'])
+
+    def _count(self, entry, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+        return entry, outcome
+
 class ProxyRequestHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep browser connections open between card flips
+    fetcher = None
+    scheduler = None
+    search_index = None
+    wordnet = None
+
     def do_GET(self):
         if self.path.startswith('/api/proxy'):
             self.handle_proxy()
+        elif self.path.startswith('/api/extract'):
+            self.handle_extract()
+        elif self.path.startswith('/api/srs/'):
+            self.handle_srs_get()
+        elif self.path.startswith('/api/search'):
+            self.handle_search()
+        elif self.path.startswith('/api/wordnet'):
+            self.handle_wordnet()
         else:
             super().do_GET()
 
+    def do_POST(self):
+        if self.path.startswith('/api/srs/review'):
+            self.handle_srs_review()
+        else:
+            self.send_error(404)
+
+    def accepts_gzip(self):
+        return 'gzip' in self.headers.get('Accept-Encoding', '')
+
+    def send_body(self, status, body, content_type, encoding=None, extra_headers=None):
+        # Compressed upstream bodies are passed through as-is to clients that accept gzip
+        if encoding == 'gzip' and not self.accepts_gzip():
+            body, encoding = gzip.decompress(body), None
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*') # Allow CORS
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
     def handle_proxy(self):
         try:
             # Parse query parameters
@@ -24,27 +392,185 @@ class ProxyRequestHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_error(400, "Missing 'url' parameter")
                 return
 
-            # Fetch the external URL
-            # Add User-Agent to avoid being blocked by some sites
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            req = urllib.request.Request(target_url, headers=headers)
-            
-            with urllib.request.urlopen(req) as response:
-                content = response.read()
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.send_header('Access-Control-Allow-Origin', '*') # Allow CORS
-                self.end_headers()
-                self.wfile.write(content)
+            entry, outcome = self.fetcher.fetch(target_url)
+            self.send_body(entry['status'], entry['body'], entry['content_type'], entry['content_encoding'],
+                           {'X-Cache': outcome.upper()})
 
+        except ValueError as e:
+            self.send_error(403, str(e))
         except Exception as e:
             print(f"Proxy error: {e}")
-            self.send_error(500, f"Proxy error: {str(e)}")
-
-print(f"Serving at http://localhost:{PORT}")
-with socketserver.TCPServer(("", PORT), ProxyRequestHandler) as httpd:
-    try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\nServer stopped.")
+            self.send_error(502, f"Proxy error: {str(e)}")
+
+    def handle_extract(self):
+        """
+        GET /api/extract?word=apple&word=pear&source=cambridge&source=mw
+        (comma-separated lists work too; source defaults to both). Returns
+        {"results": [...]} with one result per (word, source), fetched in
+        parallel; a failed lookup carries an "error" instead of failing the batch.
+        """
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        words = unique_values(params.get('word', []))
+        sources = unique_values(params.get('source', [])) or list(EXTRACT_URLS)
+        jobs = [(word, source) for word in words for source in sources]
+        if not words:
+            self.send_error(400, "Missing 'word' parameter")
+            return
+        if any(source not in EXTRACT_URLS for source in sources):
+            self.send_error(400, f"'source' must be one of: {', '.join(EXTRACT_URLS)}")
+            return
+        if len(jobs) > MAX_BATCH:
+            self.send_error(400, f"At most {MAX_BATCH} word/source pairs per request")
+            return
+
+        def run(job):
+            word, source = job
+            try:
+                return self.fetcher.extract(source, word)
+            except Exception as e:
+                print(f"Extract error for {word} ({source}): {e}")
+                return {'word': word, 'source': source, 'error': str(e)}
+
+        with concurrent.futures.ThreadPoolExecutor(min(len(jobs), EXTRACT_WORKERS)) as pool:
+            results = list(pool.map(run, jobs))
+        self.send_json({'results': results})
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        encoding = None
+        if self.accepts_gzip() and len(body) > 1024:
+            body, encoding = gzip.compress(body), 'gzip'
+        self.send_body(status, body, 'application/json; charset=utf-8', encoding)
+
+    def learner_param(self, value):
+        learner = (value or '').strip()
+        if not learner or len(learner) > MAX_LEARNER_LENGTH:
+            self.send_error(400, f"'learner' must be 1-{MAX_LEARNER_LENGTH} characters")
+            return None
+        return learner
+
+    def handle_srs_get(self):
+        """
+        GET /api/srs/due?learner=ID&limit=20&new=10   cards due now, then unseen words
+        GET /api/srs/stats?learner=ID                 seen / due / mature / new counts
+        """
+        parts = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(parts.query)
+        learner = self.learner_param(params.get('learner', [None])[0])
+        if learner is None:
+            return
+        try:
+            if parts.path == '/api/srs/due':
+                limit = max(0, min(int(params.get('limit', ['20'])[0]), 500))
+                new_limit = max(0, min(int(params.get('new', ['10'])[0]), 500))
+                self.send_json(dict(self.scheduler.due(learner, limit, new_limit), learner=learner))
+            elif parts.path == '/api/srs/stats':
+                self.send_json(self.scheduler.stats(learner))
+            else:
+                self.send_error(404)
+        except ValueError as e:
+            self.send_error(400, str(e))
+
+    def handle_srs_review(self):
+        """POST /api/srs/review {"learner": ID, "reviews": [{"word", "grade" (0-5), "time"?}, ...]}"""
+        length = int(self.headers.get('Content-Length') or 0)
+        if not 0 < length <= MAX_POST_BYTES:
+            self.send_error(400 if length <= 0 else 413, "Expected a JSON body")
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            learner = self.learner_param(payload.get('learner'))
+            if learner is None:
+                return
+            cards = self.scheduler.review(learner, payload.get('reviews') or [])
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send_error(400, f"Bad review batch: {e}")
+            return
+        self.send_json({'learner': learner, 'cards': cards})
+
+    def handle_search(self):
+        """
+        GET /api/search?q=agre&limit=20   {"query", "results": [{"word", "level", "gloss", "score"}, ...],
+                                           "completions": [headword, ...], "took_ms"}
+        Matches English words (the last one may be unfinished) and Chinese text.
+        """
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        query = params.get('q', [''])[0]
+        try:
+            limit = max(1, min(int(params.get('limit', ['20'])[0]), MAX_SEARCH_RESULTS))
+        except ValueError:
+            self.send_error(400, "'limit' must be a number")
+            return
+        start = time.perf_counter()
+        results = self.search_index.search(query, limit)
+        completions = self.search_index.complete(query)
+        took_ms = (time.perf_counter() - start) * 1000
+        self.send_json({'query': query, 'results': results, 'completions': completions,
+                        'took_ms': round(took_ms, 3)})
+
+    def handle_wordnet(self):
+        """
+        GET /api/wordnet?word=agree   {"word", "analysis"}: the WordNet analysis generate_full_data.py
+        built for the word (null when WordNet does not know it), read from the WordNet snapshot.
+        Words outside the snapshot get a 404; NLTK is never loaded here.
+        """
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        word = params.get('word', [''])[0].strip()
+        if not word or len(word) > MAX_WORD_LENGTH:
+            self.send_error(400, f"'word' must be 1-{MAX_WORD_LENGTH} characters")
+            return
+        if self.wordnet is None or self.wordnet.version is None:
+            self.send_error(503, "No WordNet snapshot (build one with wordnet_snapshot.py)")
+            return
+        analysis = self.wordnet.get(f"analysis:{word}")
+        if analysis is MISSING and word != word.lower():
+            analysis = self.wordnet.get(f"analysis:{word.lower()}")
+        if analysis is MISSING:
+            self.send_error(404, f"'{word}' is not in the WordNet snapshot")
+            return
+        self.send_json({'word': word, 'analysis': analysis})
+
+def unique_values(values):
+    """Repeated and comma-separated query values, in order, without duplicates."""
+    return list(dict.fromkeys(v.strip() for value in values for v in value.split(',') if v.strip()))
+
+def create_fetcher(cache_dir=CACHE_DIR, memory_mb=MEMORY_CACHE_BYTES // 2**20,
+                   disk_mb=DISK_CACHE_BYTES // 2**20, ttl=CACHE_TTL, timeout=UPSTREAM_TIMEOUT, fixture_dir=None):
+    cache = ResponseCache(cache_dir, memory_mb * 2**20, disk_mb * 2**20)
+    pool = FixturePool(fixture_dir) if fixture_dir else UpstreamPool(timeout)
+    return DictionaryFetcher(cache, pool, ttl)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the flashcard app with a caching dictionary proxy.")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="on-disk proxy cache ('' for memory only)")
+    parser.add_argument('--memory-mb', type=int, default=MEMORY_CACHE_BYTES // 2**20)
+    parser.add_argument('--disk-mb', type=int, default=DISK_CACHE_BYTES // 2**20)
+    parser.add_argument('--ttl', type=float, default=CACHE_TTL, help="seconds before a cached page is revalidated")
+    parser.add_argument('--timeout', type=float, default=UPSTREAM_TIMEOUT, help="upstream connect/read timeout")
+    parser.add_argument('--fixtures', help="serve recorded pages from DIR/<source>/<word>.html instead of "
+                                           "the live sites (uses a memory-only cache)")
+    parser.add_argument('--srs-db', default=DB_FILE, help="SQLite file with the learners' review schedules")
+    parser.add_argument('--search-index', default=SEARCH_INDEX_FILE,
+                        help="index built by search_index.py (rebuilt in memory when words.json is newer)")
+    parser.add_argument('--wordnet-snapshot', default=SNAPSHOT_FILE,
+                        help="snapshot built by wordnet_snapshot.py that /api/wordnet is served from")
+    args = parser.parse_args()
+
+    cache_dir = '' if args.fixtures else args.cache_dir
+    ProxyRequestHandler.fetcher = create_fetcher(cache_dir, args.memory_mb, args.disk_mb, args.ttl, args.timeout,
+                                                 args.fixtures)
+    ProxyRequestHandler.scheduler = Scheduler(args.srs_db)
+    ProxyRequestHandler.search_index = SearchIndex.load(args.search_index)
+    ProxyRequestHandler.wordnet = WordNetSnapshot(args.wordnet_snapshot)
+    print(f"Serving at http://localhost:{args.port}")
+    with http.server.ThreadingHTTPServer(("", args.port), ProxyRequestHandler) as httpd:
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            stats = ProxyRequestHandler.fetcher.stats
+            print(f"\nServer stopped. Proxy cache: {stats['hit']} hits, {stats['revalidated']} revalidated, "
+                  f"{stats['miss']} fetched.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from dataset import WORDS_FILE, load_json
+from export_shards import INDEX_FILE
+
+# Spaced-repetition scheduling (SM-2) for the flashcards, served by server.py.
+#
+# One row per (learner, word) that has been reviewed at least once; words a
+# learner has never seen are "new" and come from the deck in level order.
+# The (learner, due) index makes "next N due cards" a range scan, however
+# many learners and words the table holds. Every review is also appended to
+# review_log, so schedules can be recomputed if the algorithm changes.
+#
+# Grades follow SM-2: 0-5, where 3+ means the answer was recalled. The quiz
+# maps a correct answer to GRADE_CORRECT and a wrong one to GRADE_WRONG.
+
+DB_FILE = 'data/srs.sqlite3'
+DAY = 86400
+RELEARN_DELAY = 10 * 60  # a failed card comes back in the same session
+START_EASE = 2.5
+MIN_EASE = 1.3
+GRADE_CORRECT = 4
+GRADE_WRONG = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    learner TEXT NOT NULL,
+    word TEXT NOT NULL,
+    due REAL NOT NULL,
+    interval REAL NOT NULL,      -- days
+    ease REAL NOT NULL,
+    repetitions INTEGER NOT NULL,
+    lapses INTEGER NOT NULL,
+    last_review REAL NOT NULL,
+    PRIMARY KEY (learner, word)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cards_due ON cards (learner, due);
+CREATE TABLE IF NOT EXISTS review_log (
+    learner TEXT NOT NULL,
+    word TEXT NOT NULL,
+    grade INTEGER NOT NULL,
+    reviewed_at REAL NOT NULL
+);
+"""
+
+CARD_FIELDS = ["word", "due", "interval", "ease", "repetitions", "lapses", "last_review"]
+
+def sm2(card, grade, now):
+    """The card state after a review with `grade` (0-5) at `now`; `card` is None for a new word."""
+    interval = card["interval"] if card else 0.0
+    ease = card["ease"] if card else START_EASE
+    repetitions = card["repetitions"] if card else 0
+    lapses = card["lapses"] if card else 0
+
+    if grade < 3:
+        repetitions, interval, lapses = 0, 0.0, lapses + (1 if card and card["repetitions"] else 0)
+        due = now + RELEARN_DELAY
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1.0
+        elif repetitions == 2:
+            interval = 6.0
+        else:
+            interval = round(interval * ease, 1)
+        due = now + interval * DAY
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return {"due": due, "interval": interval, "ease": round(ease, 3), "repetitions": repetitions,
+            "lapses": lapses, "last_review": now}
+
+def load_deck(index_path=INDEX_FILE, words_path=WORDS_FILE):
+    """All words in the order new cards are introduced: by level, then list order."""
+    index = load_json(index_path, None)
+    if index:
+        fields = index["fields"]
+        items = [dict(zip(fields, row)) for row in index["words"]]
+    else:
+        items = load_json(words_path, [])
+    ordered = sorted(enumerate(items), key=lambda p: (p[1].get("level") or 99, p[0]))
+    return [item["word"] for _, item in ordered]
+
+class Scheduler:
+    """SM-2 review state in SQLite; safe to share between the server's threads (one connection each)."""
+
+    def __init__(self, db_path=DB_FILE, deck=None):
+        self.db_path = db_path
+        # data/ is not part of the checkout
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.deck = deck if deck is not None else load_deck()
+        self.local = threading.local()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def due(self, learner, limit=20, new_limit=10, now=None):
+        """{"due": [card, ...], "new": [word, ...]}: cards due by `now`, most overdue first, then unseen words."""
+        now = time.time() if now is None else now
+        conn = self.connection()
+        rows = conn.execute(
+            "SELECT word, due, interval, ease, repetitions, lapses, last_review FROM cards "
+            "WHERE learner = ? AND due <= ? ORDER BY due LIMIT ?", (learner, now, limit)).fetchall()
+        new = []
+        if new_limit > 0:
+            seen = {row[0] for row in conn.execute("SELECT word FROM cards WHERE learner = ?", (learner,))}
+            for word in self.deck:
+                if len(new) >= new_limit:
+                    break
+                if word not in seen:
+                    new.append(word)
+        return {"due": [dict(row) for row in rows], "new": new}
+
+    def review(self, learner, reviews, now=None):
+        """
+        Apply a batch of reviews, [{"word", "grade", "time"?}, ...], in one
+        transaction (in time order, so one word can be reviewed twice).
+        Returns the updated cards.
+        """
+        now = time.time() if now is None else now
+        reviews = sorted(({"word": r["word"], "grade": int(r["grade"]), "time": float(r.get("time") or now)}
+                          for r in reviews), key=lambda r: r["time"])
+        for r in reviews:
+            if not 0 <= r["grade"] <= 5:
+                raise ValueError(f"grade must be 0-5, got {r['grade']} for {r['word']}")
+        words = sorted({r["word"] for r in reviews})
+        if not words:
+            return []
+
+        conn = self.connection()
+        with conn:
+            cards = {}
+            for start in range(0, len(words), 500):
+                chunk = words[start:start + 500]
+                marks = ','.join('?' * len(chunk))
+                for row in conn.execute(f"SELECT {', '.join(CARD_FIELDS)} FROM cards "
+                                        f"WHERE learner = ? AND word IN ({marks})", [learner, *chunk]):
+                    cards[row["word"]] = dict(row)
+            for r in reviews:
+                cards[r["word"]] = dict(sm2(cards.get(r["word"]), r["grade"], r["time"]), word=r["word"])
+            conn.executemany(
+                "INSERT INTO cards (learner, word, due, interval, ease, repetitions, lapses, last_review) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (learner, word) DO UPDATE SET "
+                "due = excluded.due, interval = excluded.interval, ease = excluded.ease, "
+                "repetitions = excluded.repetitions, lapses = excluded.lapses, last_review = excluded.last_review",
+                [(learner, *(cards[w][f] for f in CARD_FIELDS)) for w in words])
+            conn.executemany("INSERT INTO review_log (learner, word, grade, reviewed_at) VALUES (?, ?, ?, ?)",
+                             [(learner, r["word"], r["grade"], r["time"]) for r in reviews])
+        return [cards[w] for w in words]
+
+    def stats(self, learner, now=None):
+        now = time.time() if now is None else now
+        row = self.connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(due <= ?), 0), COALESCE(SUM(interval >= 21), 0) FROM cards "
+            "WHERE learner = ?", (now, learner)).fetchone()
+        return {"learner": learner, "seen": row[0], "due": row[1], "mature": row[2],
+                "new": max(len(self.deck) - row[0], 0)}
+
+if __name__ == "__main__":
+    # Quick look at a learner's queue: python srs.py <learner>
+    scheduler = Scheduler()
+    learner = sys.argv[1] if len(sys.argv) > 1 else 'default'
+    print(json.dumps({"stats": scheduler.stats(learner), **scheduler.due(learner, 10, 5)}, indent=2))
@@ -0,0 +1,58 @@
+import os
+
+from dictionary_extract import extract
+
+# The extractors against one recorded (trimmed) page per dictionary in
+# fixtures/, the same layout server.py --fixtures serves.
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+CAMBRIDGE_URL = 'https://dictionary.cambridge.org/dictionary/english-chinese-traditional/apple'
+MW_URL = 'https://www.merriam-webster.com/dictionary/apple'
+
+
+def read_fixture(source, word):
+    with open(os.path.join(FIXTURE_DIR, source, f"{word}.html"), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_extract_cambridge():
+    result = extract('cambridge', read_fixture('cambridge', 'apple'), CAMBRIDGE_URL)
+
+    [entry] = result["entries"]
+    assert entry["headword"] == "apple"
+    assert entry["pos"] == ["noun"]
+    first, second = entry["senses"]
+    assert first["definition"] == "a round fruit with firm, white flesh and a green, red, or yellow skin"
+    assert first["translation"] == "蘋果"
+    assert first["examples"] == [{"text": "to peel an apple", "translation": "削蘋果皮"},
+                                 {"text": "apple pie/sauce", "translation": "蘋果派／蘋果醬"}]
+    assert second["definition"] == "a tree that produces apples"
+    assert second["translation"] == "蘋果樹"
+    assert second["examples"] == [{"text": "an apple orchard", "translation": None}]
+
+    # The apple-pie order run-on is neither a sense nor an idiom link
+    assert all("tidy" not in sense["definition"] for sense in entry["senses"])
+    assert result["idioms"] == [{
+        "text": "the apple of sb's eye",
+        "url": "https://dictionary.cambridge.org/dictionary/english-chinese-traditional/the-apple-of-sb-s-eye",
+    }]
+
+
+def test_extract_mw():
+    result = extract('mw', read_fixture('mw', 'apple'), MW_URL)
+
+    # dictionary-entry-2 (the trademark) has no definitions and is dropped
+    [entry] = result["entries"]
+    assert entry["headword"] == "apple"
+    assert entry["pos"] == ["noun"]
+    first, second = entry["senses"]
+    assert first["definition"] == ("the fleshy, usually rounded red, yellow, or green edible pome fruit "
+                                   "of a usually cultivated tree")
+    assert first["translation"] is None
+    assert first["examples"] == [{"text": "an apple a day", "translation": None}]
+    assert second["definition"] == "a fruit or other vegetative growth suggestive of an apple"
+    assert second["examples"] == []
+
+    # The defined run-on "apple of one's eye" is skipped
+    assert all("cherished" not in sense["definition"] for sense in entry["senses"])
+    assert result["idioms"] == []
@@ -1,20 +1,17 @@
 import nltk
-import ssl
 
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
-
-print("Downloading WordNet data...")
-try:
-    nltk.download('wordnet', quiet=True)
-    nltk.download('omw-1.4', quiet=True)
-    print("Download complete.")
-except Exception as e:
-    print(f"Error downloading: {e}")
+# Download WordNet and the Open Multilingual Wordnet once; later runs (and
+# benchmark_pipeline.py) work offline. If the download fails with a
+# certificate error, install your Python's CA certificates (on macOS: run
+# "Install Certificates.command" from the Python folder) rather than turning
+# SSL verification off.
+for resource, package in (('corpora/wordnet', 'wordnet'), ('corpora/omw-1.4', 'omw-1.4')):
+    try:
+        nltk.data.find(resource)
+    except LookupError:
+        print(f"Downloading {package}...")
+        if not nltk.download(package, quiet=True):
+            raise SystemExit(f"Could not download {package}; see the note above about certificates.")
 
 from nltk.corpus import wordnet as wn
 
@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Compact read-only WordNet snapshot for generate_full_data.py and server.py.
+#
+# It holds exactly the lookups a build makes for the word list, under the
+# same keys as the lookup cache: "word:<w>" (synset names), "synset:<name>"
+# (definition, examples, Chinese lemmas, derivations), "relations:<w>"
+# (synonyms and sister terms) and "phrases:<w>" (multi-word lemmas), i.e.
+# the target words, the synsets one derivation hop away and their phrases,
+# plus "analysis:<w>", the finished process_word() result that server.py
+# returns for /api/wordnet.
+# Values are JSON in one SQLite table keyed by the lookup key, so opening
+# the snapshot reads a few pages instead of loading WordNet and OMW through
+# NLTK, and a lookup is one indexed read.
+#
+#   python wordnet_snapshot.py            # build data/wordnet_snapshot.sqlite3 (needs NLTK + WordNet once)
+#
+# In generate_full_data.py a lookup the snapshot does not have (a word
+# outside the list) falls through to NLTK, which is then loaded on first
+# use; server.py only ever reads the snapshot.
+
+SNAPSHOT_FILE = 'data/wordnet_snapshot.sqlite3'
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE lookups (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+MISSING = object()
+
+class WordNetSnapshot:
+    """
+    Lookups from a snapshot file; `version` is None when there is no usable
+    snapshot. With a `generator`, snapshots built by another one are ignored.
+    """
+
+    def __init__(self, path=SNAPSHOT_FILE, generator=None):
+        self.generator = generator
+        self.hits = 0
+        self.local = threading.local()
+        self.open(path)
+
+    def open(self, path):
+        """Use the snapshot at `path` (None or '' for none)."""
+        self.path = path or None
+        self.local = threading.local()
+        self.version = None
+        if not self.path or not os.path.exists(self.path):
+            return
+        meta = dict(self.connection().execute("SELECT key, value FROM meta"))
+        if self.generator is not None and meta.get("generator") != str(self.generator):
+            print(f"WordNet snapshot {self.path} was built by generator {meta.get('generator')}, "
+                  f"not {self.generator}; ignoring it (rebuild with wordnet_snapshot.py)")
+            return
+        self.version = meta.get("wordnet")
+
+    def connection(self):
+        # One read-only connection per thread and process (pool workers fork)
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            conn.execute("PRAGMA mmap_size=67108864")
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        """The stored value for `key`, or MISSING."""
+        if self.version is None:
+            return MISSING
+        row = self.connection().execute("SELECT value FROM lookups WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return MISSING
+        self.hits += 1
+        return json.loads(row[0])
+
+def write(path, entries, version, generator):
+    """Write `entries` ({lookup key: value}) as a new snapshot, replacing `path` atomically."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    with conn:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                         [("wordnet", version), ("generator", str(generator)), ("built", time.strftime("%Y-%m-%d"))])
+        conn.executemany("INSERT INTO lookups VALUES (?, ?)",
+                         ((key, json.dumps(value, ensure_ascii=False, separators=(',', ':')))
+                          for key, value in sorted(entries.items())))
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+def main():
+    import generate_full_data as g
+    from dataset import read_word_list
+
+    parser = argparse.ArgumentParser(description="Build the WordNet snapshot for the word list (loads NLTK once).")
+    parser.add_argument('--input', default=g.INPUT_FILE)
+    parser.add_argument('--output', default=SNAPSHOT_FILE)
+    args = parser.parse_args()
+
+    start = time.time()
+    words = read_word_list(args.input)
+    # Compute every lookup from NLTK, recording them all
+    g.SNAPSHOT.open(None)
+    g.CACHE.entries.clear()
+    g.CACHE.max_entries = float('inf')
+    version = g.use_wordnet_version()
+    analyses = {}
+    for i, word in enumerate(words):
+        analyses[f"analysis:{word}"] = g.process_word(word)
+        g.get_relations(word)
+        if i % 500 == 0:
+            print(f"Looked up {i}/{len(words)}")
+    entries = dict(g.CACHE.entries, **analyses)
+    size = write(args.output, entries, version, g.GENERATOR_VERSION)
+    print(f"Wrote {args.output}: {len(entries)} lookups for {len(words)} words "
+          f"({size / 1e6:.1f} MB, WordNet {version}) in {time.time() - start:.0f}s")
+
+if __name__ == "__main__":
+    main()